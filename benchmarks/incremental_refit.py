@@ -0,0 +1,103 @@
+import sys
+import os
+import io
+import time
+import argparse
+import contextlib
+import numpy as np
+import pandas as pd
+
+# Yolları ayarla (depo kökü)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from fatura_hesapla import NeuralPriceEngine, TRAIN_WINDOW_HOURS, UPDATE_EPOCHS
+from src.preprocessor import load_frame
+
+RESULTS_DIR = os.path.join(current_dir, 'results')
+
+def quiet(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+def forecast_error(engine, actual):
+    # Saatlik tahminin gerçekleşen fiyattan ortalama mutlak sapması (TL/MWh) ve tahmin dizisi
+    predicted = engine.predict(pd.DataFrame({
+        'year': actual['tarih'].dt.year, 'month': actual['tarih'].dt.month,
+        'day': actual['tarih'].dt.day, 'hour': actual['hour'],
+    }))
+    return float(np.mean(np.abs(predicted - actual['ptf'].to_numpy()))), predicted
+
+def run(df, days=30, horizon_days=7, epochs=UPDATE_EPOCHS):
+    """
+    Son `days` günü sırayla "yeni gelen veri" gibi oynatır. Her gün için:
+      - artımlı motor: update(o günün saatleri)
+      - tam motor: son TRAIN_WINDOW_HOURS saat üzerinde sıfırdan fit
+    ve ikisinin sonraki `horizon_days` gündeki saatlik tahmin hatasını kıyaslar.
+    Dönüş: Gün başına bir satır (DataFrame)
+    """
+    day = df['tarih'].dt.normalize()
+    all_days = day.unique()
+    # Son günlerin ufku da gerçek veriyle ölçülebilsin
+    replay_days = all_days[-(days + horizon_days):-horizon_days]
+
+    history = df[day < replay_days[0]]
+    incremental = NeuralPriceEngine()
+    quiet(incremental.fit, history.tail(TRAIN_WINDOW_HOURS).reset_index(drop=True))
+
+    rows = []
+    for current in replay_days:
+        new_rows = df[day == current]
+        start = time.perf_counter()
+        incremental.update(new_rows, epochs)
+        update_seconds = time.perf_counter() - start
+
+        full = NeuralPriceEngine()
+        train = df[day <= current].tail(TRAIN_WINDOW_HOURS).reset_index(drop=True)
+        start = time.perf_counter()
+        quiet(full.fit, train)
+        fit_seconds = time.perf_counter() - start
+
+        actual = df[(day > current) & (day <= current + pd.Timedelta(days=horizon_days))]
+        mae_incremental, predicted_incremental = forecast_error(incremental, actual)
+        mae_full, predicted_full = forecast_error(full, actual)
+        rows.append({
+            'day': current,
+            'update_ms': update_seconds * 1000,
+            'full_fit_s': fit_seconds,
+            'mae_incremental': mae_incremental,
+            'mae_full': mae_full,
+            # İki motorun tahminleri arasındaki göreli fark
+            'forecast_gap_pct': float(np.mean(np.abs(predicted_incremental - predicted_full)) / np.mean(predicted_full) * 100),
+        })
+        print(f"  📅 {current:%Y-%m-%d}: güncelleme {rows[-1]['update_ms']:.1f} ms, tam eğitim {fit_seconds:.2f} s | "
+              f"MAE artımlı {mae_incremental:.1f}, tam {mae_full:.1f} TL/MWh")
+    return pd.DataFrame(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Artımlı (sıcak başlangıçlı) fiyat motoru güncellemesi - tam eğitim kıyası")
+    parser.add_argument('--days', type=int, default=30, help="Oynatılacak yeni gün sayısı")
+    parser.add_argument('--horizon', type=int, default=7, help="Hata ölçümü için tahmin ufku (gün)")
+    parser.add_argument('--epochs', type=int, default=UPDATE_EPOCHS, help="Yeni gün başına partial_fit turu")
+    parser.add_argument('--out', default=None, help="Sonuç CSV (varsayılan: benchmarks/results/incremental_refit_<zaman>.csv)")
+    args = parser.parse_args()
+
+    df = load_frame()
+    print(f"🔁 ARTIMLI GÜNCELLEME KIYASI: {args.days} gün, {args.horizon} günlük ufuk, {args.epochs} tur")
+    results = run(df, args.days, args.horizon, args.epochs)
+
+    out_path = args.out or os.path.join(RESULTS_DIR, f"incremental_refit_{time.strftime('%Y%m%d-%H%M%S')}.csv")
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    results.to_csv(out_path, index=False)
+
+    update_ms = results['update_ms'].median()
+    fit_s = results['full_fit_s'].median()
+    print(f"\n⏱️ Medyan güncelleme {update_ms:.1f} ms, tam eğitim {fit_s:.2f} s "
+          f"(güncelleme tam eğitimin %{update_ms / 1000 / fit_s * 100:.2f}'i)")
+    print(f"🎯 Ortalama MAE: artımlı {results['mae_incremental'].mean():.1f}, tam {results['mae_full'].mean():.1f} TL/MWh "
+          f"| tahmin farkı %{results['forecast_gap_pct'].mean():.2f}")
+    print(f"💾 Sonuçlar: {out_path}")
+
+if __name__ == "__main__":
+    main()
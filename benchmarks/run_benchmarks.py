@@ -0,0 +1,364 @@
+import sys
+import os
+import io
+import json
+import time
+import random
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+import contextlib
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# Yolları ayarla (depo kökü, src ve data klasörleri)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+sys.path.append(os.path.join(parent_dir, 'src'))
+sys.path.append(os.path.join(parent_dir, 'data'))
+
+from market_env import EnergyMarketEnv
+from agent import QLearningAgent, BatchQLearningAgent
+from features import add_technical_indicators
+from preprocessor import load_frame
+from train_bot import train_agent
+from fix_merge import robust_import
+
+RESULTS_DIR = os.path.join(current_dir, 'results')
+BASELINE_PATH = os.path.join(current_dir, 'baseline.json')
+
+# Saat cinsinden girdi boyutları (karmaşıklık eğrisi için)
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+QUICK_SIZES = [10_000, 100_000]
+HOURS_PER_FILE = 720 # ETL ölçümünde dosya başına ~1 ay
+TRAIN_EPISODES = 3 # Eğitim ölçümlerinde tur sayısı (epsilon düşüşü ve tampon boşaltmaları dahil)
+
+def synthetic_frame(n_hours, seed=0):
+    """
+    load_frame biçiminde yapay PTF serisi: günlük/haftalık döngü + yavaş trend + gürültü.
+    Gerçek veriden uzun serilerde ölçeklemeyi görmek için.
+    """
+    rng = np.random.default_rng(seed)
+    tarih = pd.date_range('2017-01-01', periods=n_hours, freq='h')
+    hour = tarih.hour.to_numpy()
+    daily = 1 + 0.25 * np.sin((hour - 6) / 24 * 2 * np.pi)
+    level = 300 * np.exp(np.cumsum(rng.normal(0.00002, 0.002, n_hours)))
+    ptf = np.maximum(level * daily * rng.lognormal(0, 0.1, n_hours), 0)
+    return pd.DataFrame({
+        'tarih': tarih,
+        'ptf': ptf,
+        'hour': hour.astype(np.int8),
+        'day_of_week': tarih.dayofweek.to_numpy().astype(np.int8),
+        'month': tarih.month.to_numpy().astype(np.int8),
+    })
+
+def real_frame(n_hours):
+    # merged_data.csv'nin son n_hours saati (veri yoksa veya yetmiyorsa None)
+    try:
+        df = load_frame()
+    except FileNotFoundError:
+        return None
+    if len(df) < n_hours:
+        return None
+    return df.tail(n_hours).reset_index(drop=True)
+
+def best_time(fn, repeat):
+    # En iyi süre (saniye): gürültüye karşı en az bozulan ölçü
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+# --- Ölçümler: her biri (df, size, repeat) alır, (değer, birim, büyük_iyi_mi) döndürür ---
+
+def bench_env_step(df, size, repeat):
+    env = EnergyMarketEnv(add_technical_indicators(df))
+    actions = np.random.default_rng(0).integers(0, 3, env.max_steps).tolist()
+
+    def run():
+        env.reset()
+        for action in actions:
+            env.step(action)
+    return env.max_steps / best_time(run, repeat), 'steps/s', True
+
+def bench_agent_act_learn(df, size, repeat, dense=True):
+    # Durumlar önceden üretilir: sadece act + learn ölçülür
+    env = EnergyMarketEnv(add_technical_indicators(df))
+    state = env.reset()
+    transitions = []
+    rng = np.random.default_rng(0)
+    done = False
+    while not done:
+        action = int(rng.integers(3))
+        next_state, reward, done, _ = env.step(action)
+        transitions.append((state.copy(), action, reward, next_state.copy(), done))
+        state = next_state
+
+    def run():
+        random.seed(0)
+        np.random.seed(0)
+        agent = QLearningAgent(dense=dense)
+        for state, action, reward, next_state, done in transitions:
+            agent.act(state)
+            agent.learn(state, action, reward, next_state, done)
+    return len(transitions) / best_time(run, repeat), 'updates/s', True
+
+def bench_agent_act_learn_dict(df, size, repeat):
+    return bench_agent_act_learn(df, size, repeat, dense=False)
+
+def make_learner(learner):
+    # train_bot.py --learner seçenekleri + yoğun tablodan önceki sözlük tabanlı ajan ('dict')
+    if learner == 'dict':
+        return QLearningAgent(dense=False)
+    if learner == 'online':
+        return QLearningAgent(dense=True)
+    return BatchQLearningAgent(update_mode=learner)
+
+def bench_train(df, size, repeat, learner='online'):
+    """
+    train_bot.py'deki eğitim döngüsünün tamamı (ortam + ajan, TRAIN_EPISODES tur).
+    Adım/sn: 500 tur x 15.000 saatlik (7,5M adım) eğitimin süresi = 7,5M / bu değer.
+    """
+    env = EnergyMarketEnv(add_technical_indicators(df))
+    steps = 0
+    def run():
+        nonlocal steps
+        random.seed(0)
+        np.random.seed(0)
+        steps, _ = train_agent(make_learner(learner), env, TRAIN_EPISODES, [])
+    seconds = best_time(run, repeat)
+    return steps / seconds, 'steps/s', True
+
+def bench_train_dict(df, size, repeat):
+    return bench_train(df, size, repeat, 'dict')
+
+def bench_train_exact(df, size, repeat):
+    return bench_train(df, size, repeat, 'exact')
+
+def bench_train_batched(df, size, repeat):
+    return bench_train(df, size, repeat, 'batched')
+
+def bench_indicators(df, size, repeat):
+    return len(df) / best_time(lambda: add_technical_indicators(df), repeat), 'rows/s', True
+
+def bench_robust_import(df, size, repeat):
+    """
+    Yapay veriyi ~1 aylık CSV dosyalarına bölüp geçici klasörde robust_import çalıştırır.
+    Soğuk çalıştırma (tüm dosyalar ayrıştırılır) ölçülür; önbellek her tekrarda silinir.
+    """
+    tmp_dir = tempfile.mkdtemp(prefix='ptf_bench_')
+    try:
+        n_files = 0
+        for start in range(0, len(df), HOURS_PER_FILE):
+            part = df.iloc[start:start + HOURS_PER_FILE]
+            # EPİAŞ dışa aktarım biçimi: Tarih;Saat;PTF (TL/MWh), ondalık virgül
+            export = pd.DataFrame({
+                'Tarih': part['tarih'].dt.strftime('%d.%m.%Y'),
+                'Saat': part['tarih'].dt.strftime('%H:%M'),
+                'PTF (TL/MWh)': part['ptf'].map(lambda v: f"{v:.2f}".replace('.', ',')),
+            })
+            export.to_csv(os.path.join(tmp_dir, f"ptf_{n_files:05d}.csv"), sep=';', index=False)
+            n_files += 1
+
+        def run():
+            shutil.rmtree(os.path.join(tmp_dir, '.cache'), ignore_errors=True)
+            with contextlib.redirect_stdout(io.StringIO()):
+                robust_import(data_dir=tmp_dir)
+        return n_files / best_time(run, repeat), 'files/s', True
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def bench_engine_fit(df, size, repeat):
+    # fatura_hesapla içe aktarılınca uyarıları süreç genelinde kapatır: sadece motor ölçümlerinde yüklenir
+    from fatura_hesapla import NeuralPriceEngine
+    def run():
+        engine = NeuralPriceEngine()
+        with contextlib.redirect_stdout(io.StringIO()):
+            engine.fit(df.copy())
+    return best_time(run, repeat), 's', False
+
+def bench_engine_predict(df, size, repeat):
+    # Eğitim verisinin hemen ardından bir yıllık saatlik tahmin
+    from fatura_hesapla import NeuralPriceEngine
+    engine = NeuralPriceEngine()
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine.fit(df.copy())
+    start = df['tarih'].iloc[-1].normalize() + pd.Timedelta(days=1)
+    return best_time(lambda: engine.forecast(start, start + pd.DateOffset(years=1)), repeat) * 1000, 'ms', False
+
+# isim -> (fonksiyon, en büyük boyut). Yavaş ölçümler büyük boyutlarda atlanır.
+BENCHMARKS = {
+    'env_step': (bench_env_step, 1_000_000),
+    'agent_act_learn_dense': (bench_agent_act_learn, 100_000),
+    'agent_act_learn_dict': (bench_agent_act_learn_dict, 100_000),
+    'train_dict': (bench_train_dict, 100_000),
+    'train_online': (bench_train, 100_000),
+    'train_exact': (bench_train_exact, 100_000),
+    'train_batched': (bench_train_batched, 100_000),
+    'add_technical_indicators': (bench_indicators, 1_000_000),
+    'robust_import': (bench_robust_import, 100_000),
+    'engine_fit': (bench_engine_fit, 100_000),
+    'engine_predict': (bench_engine_predict, 100_000),
+}
+
+# (yeni, referans) ölçüm çiftleri: aynı girdide birbirine göre hızlanma raporlanır
+SPEEDUP_PAIRS = [
+    ('agent_act_learn_dense', 'agent_act_learn_dict'),
+    # Eğitim süresindeki kazanç: eski sözlük ajanına ve online yoğun ajana göre
+    ('train_online', 'train_dict'),
+    ('train_batched', 'train_dict'),
+    ('train_batched', 'train_online'),
+    ('train_exact', 'train_online'),
+]
+
+def pair_speedups(results):
+    """
+    SPEEDUP_PAIRS içindeki ölçümlerin aynı kaynak/boyuttaki oranı (>1: yeni yol hızlı).
+    Dönüş: Satır listesi
+    """
+    by_key = {(row['name'], row['source'], row['size']): row for row in results}
+    rows = []
+    for name, reference in SPEEDUP_PAIRS:
+        for (row_name, source, size), row in by_key.items():
+            ref = by_key.get((reference, source, size))
+            if row_name != name or ref is None or ref['value'] == 0:
+                continue
+            ratio = row['value'] / ref['value']
+            rows.append({'benchmark': name, 'reference': reference, 'source': source, 'size': size,
+                         'speedup': ratio if row['higher_is_better'] else 1 / ratio})
+    return rows
+
+def run_benchmarks(names=None, sizes=DEFAULT_SIZES, real=True, repeat=3):
+    """
+    Seçilen ölçümleri her boyutta yapay veride, (varsa) gerçek veri diliminde de çalıştırır.
+    Dönüş: Sonuç satırları listesi
+    """
+    results = []
+    for name in names or BENCHMARKS:
+        fn, max_size = BENCHMARKS[name]
+        for size in sizes:
+            if size > max_size:
+                continue
+            sources = [('synthetic', synthetic_frame(size))]
+            if real:
+                real_df = real_frame(size)
+                if real_df is not None:
+                    sources.append(('real', real_df))
+            for source, df in sources:
+                # Büyük girdilerde tek tekrar yeterli (süre zaten uzun)
+                start = time.perf_counter()
+                value, unit, higher_is_better = fn(df, size, repeat if size <= 100_000 else 1)
+                elapsed = time.perf_counter() - start
+                results.append({'name': name, 'source': source, 'size': size, 'value': value,
+                                'unit': unit, 'higher_is_better': higher_is_better, 'seconds': elapsed})
+                print(f"  ⏱️ {name:<26} {source:<9} {size:>9,} saat: {value:>14,.1f} {unit}")
+    return results
+
+def environment_info():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=parent_dir,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+    }
+
+def result_key(row):
+    return f"{row['name']}/{row['source']}/{row['size']}"
+
+def compare(results, baseline, threshold=0.2):
+    """
+    Sonuçları temel ölçümle kıyaslar. İşlem süresi temel ölçümün (1 + threshold) katını aşarsa
+    (büyük-iyi ölçümlerde: hız 1 / (1 + threshold) katının altına düşerse) gerileme sayılır.
+    Dönüş: (kıyas satırları, gerileme var mı)
+    """
+    base = {result_key(row): row for row in baseline['results']}
+    rows = []
+    regressed = False
+    for row in results:
+        old = base.get(result_key(row))
+        if old is None or old['value'] == 0:
+            continue
+        ratio = row['value'] / old['value']
+        # Hızlanma oranı: >1 iyileşme, <1 yavaşlama
+        speedup = ratio if row['higher_is_better'] else 1 / ratio
+        regression = speedup < 1 / (1 + threshold)
+        regressed |= regression
+        rows.append({'benchmark': result_key(row), 'baseline': old['value'], 'current': row['value'],
+                     'unit': row['unit'], 'speedup': speedup, 'regression': regression})
+    return rows, regressed
+
+def main():
+    parser = argparse.ArgumentParser(description="Sıcak yollar için performans ölçümleri")
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), default=None, help="Sadece bu ölçümler")
+    parser.add_argument('--sizes', type=int, nargs='+', default=None, help=f"Saat cinsinden boyutlar (varsayılan: {DEFAULT_SIZES})")
+    parser.add_argument('--quick', action='store_true', help=f"Küçük boyutlar: {QUICK_SIZES}")
+    parser.add_argument('--no-real', action='store_true', help="Gerçek veri dilimlerini atla")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--out', default=None, help="Sonuç JSON (varsayılan: benchmarks/results/<zaman>.json)")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help="Bu sonuçları temel ölçüm olarak kaydet")
+    parser.add_argument('--no-compare', action='store_true', help="Sadece ölç ve kaydet, temel ölçümle kıyaslama")
+    parser.add_argument('--require-baseline', action='store_true',
+                        help="Temel ölçüm yoksa hata kodu ile çık (CI için; varsayılan: uyarı verip geç)")
+    parser.add_argument('--threshold', type=float, default=0.2, help="İzin verilen yavaşlama oranı (0.2 = %%20)")
+    args = parser.parse_args()
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else DEFAULT_SIZES)
+    print(f"🏎️  PERFORMANS ÖLÇÜMLERİ: boyutlar {sizes}")
+    results = run_benchmarks(args.only, sizes, real=not args.no_real, repeat=args.repeat)
+    speedups = pair_speedups(results)
+    if speedups:
+        print("\n🏁 Aynı girdide hızlanma:")
+        for row in speedups:
+            print(f"  {row['benchmark']} / {row['reference']} ({row['source']}, {row['size']:,} saat): {row['speedup']:.2f}x")
+    report = {'environment': environment_info(), 'threshold': args.threshold, 'results': results, 'speedups': speedups}
+
+    out_path = args.out or os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with open(out_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Sonuçlar: {out_path}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"📌 Temel ölçüm kaydedildi: {args.baseline}")
+        return
+    if args.no_compare:
+        return
+
+    # Temel ölçüm makineye özgüdür, depoda tutulmaz: her makinede bir kez --save-baseline ile oluşturulur
+    if not os.path.exists(args.baseline):
+        print(f"\n⚠️ Temel ölçüm bulunamadı: {args.baseline} -- gerileme KONTROL EDİLMEDİ.\n"
+              f"   Bu makinede bir kez --save-baseline ile oluşturun, sonraki çalıştırmalar onunla kıyaslanır.")
+        if args.require_baseline:
+            sys.exit(2)
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    rows, regressed = compare(results, baseline, args.threshold)
+    if rows:
+        print(f"\n📊 Temel ölçümle kıyas ({baseline['environment'].get('commit')}):")
+        print(pd.DataFrame(rows).to_string(index=False, float_format='{:,.2f}'.format))
+    if regressed:
+        print(f"\n❌ %{args.threshold * 100:.0f} eşiğini aşan yavaşlama var!")
+        sys.exit(1)
+    print("\n✅ Gerileme yok.")
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,160 @@
 import pandas as pd
+import numpy as np
 import glob
 import os
+import json
+import hashlib
+import sys
 import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+# Ortak ikili veri deposu (src/preprocessor.py)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.preprocessor import write_store, source_signature
 
 # Gereksiz uyarıları gizle
 warnings.simplefilter(action='ignore', category=FutureWarning)
 warnings.simplefilter(action='ignore', category=UserWarning)
 
-def robust_import():
-    # Kodun çalıştığı klasörü bul
-    current_dir = os.path.dirname(os.path.abspath(__file__))
+# Dosya başına ayrıştırma önbelleği ve manifest
+CACHE_DIRNAME = '.cache'
+MANIFEST_VERSION = 1
+
+# Dosya imzaları (magic bytes)
+XLSX_MAGIC = b'PK\x03\x04' # .xlsx bir ZIP arşividir
+XLS_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1' # Eski .xls (OLE2)
+
+def detect_format(filename):
+    """
+    Dosya biçimini uzantıya veya deneme-yanılmaya değil, ilk baytlara bakarak bulur.
+    Dönüş: 'xlsx', 'xls', 'csv' veya None (boş dosya)
+    """
+    with open(filename, 'rb') as f:
+        head = f.read(8)
+    if not head:
+        return None
+    if head.startswith(XLSX_MAGIC):
+        return 'xlsx'
+    if head.startswith(XLS_MAGIC):
+        return 'xls'
+    return 'csv'
+
+def detect_separator(filename):
+    # CSV ayırıcısı: ilk satırda hangisi çoksa (virgül veya noktalı virgül)
+    with open(filename, 'rb') as f:
+        first_line = f.readline().decode('utf-8', errors='ignore')
+    return ';' if first_line.count(';') > first_line.count(',') else ','
+
+def file_sha256(filename):
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def normalize(df):
+    """
+    Ham tabloyu (tarih, ptf) biçimine getirir.
+    Dönüş: (temp_df, None) veya (None, uyarı mesajı)
+    """
+    # Sütun isimlerini temizle (Küçük harf, Türkçe karakter temizliği)
+    df.columns = [str(c).lower().strip().replace(' ', '_').replace('.', '').replace('(', '').replace(')', '').replace('/', '') for c in df.columns]
+
+    # PTF Sütununu Akıllıca Bul
+    ptf_cols = [c for c in df.columns if 'ptf' in c]
+    if not ptf_cols:
+        return None, "PTF sütunu yok"
+
+    # 'tl' yazanı önceliklendir, yoksa ilkini al
+    target = next((c for c in ptf_cols if 'tl' in c), ptf_cols[0])
+    df = df.rename(columns={target: 'ptf'})
+
+    # Tarih Sütununu Bul
+    date_col = next((c for c in df.columns if 'tarih' in c), None)
+    if not date_col:
+        return None, "Tarih sütunu yok"
+    df = df.rename(columns={date_col: 'tarih'})
+
+    # Tarih ve Saat Birleştirme
+    if 'saat' in df.columns:
+        # Saat sütunu bazen "00:00" bazen "0" gelebilir, string yapıp topla
+        df['tarih'] = pd.to_datetime(df['tarih'].astype(str) + ' ' + df['saat'].astype(str))
+    else:
+        df['tarih'] = pd.to_datetime(df['tarih'])
+
+    # Sayı Formatı Düzeltme (1.234,56 -> 1234.56)
+    # (pandas 3'te metin sütunları 'object' değil 'str' tipinde gelir)
+    if not pd.api.types.is_numeric_dtype(df['ptf']):
+        df['ptf'] = df['ptf'].astype(str).str.replace('.', '').str.replace(',', '.').astype(float)
+
+    # Sadece lazım olanları al, boş satırları at
+    temp_df = df[['tarih', 'ptf']].copy()
+    temp_df = temp_df.dropna()
+    return temp_df, None
+
+def parse_file(filename):
+    """
+    Tek bir dosyayı okuyup normalize eder (işçi süreçte çalışır).
+    Dönüş: (tarih dizisi, ptf dizisi, None) veya (None, None, hata mesajı)
+    """
+    fmt = detect_format(filename)
+    try:
+        if fmt in ('xlsx', 'xls'):
+            df = pd.read_excel(filename)
+        elif fmt == 'csv':
+            df = pd.read_csv(filename, sep=detect_separator(filename))
+        else:
+            return None, None, "Format belirsiz (boş dosya)"
+    except Exception as e:
+        return None, None, f"Okunamadı ({fmt}): {e}"
+
+    try:
+        temp_df, warning = normalize(df)
+        if temp_df is None:
+            return None, None, warning
+        return temp_df['tarih'].to_numpy(dtype='datetime64[ns]'), temp_df['ptf'].to_numpy(dtype=np.float64), None
+    except Exception as e:
+        return None, None, f"İşleme hatası: {e}"
+
+def load_manifest(path):
+    if os.path.exists(path):
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest.get('version') == MANIFEST_VERSION:
+            return manifest
+    return {'version': MANIFEST_VERSION, 'files': {}, 'merged': []}
+
+def save_manifest(path, manifest):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+def merge_arrays(parts):
+    """
+    Parçaları (tarih, ptf, kaynak) birleştirir ve tarihe göre sıralar. kaynak: satırın geldiği dosyanın
+    dosya adı sırasındaki yeri. Yinelenen saatlerde kaynağı en küçük olan (dosya adı sırasında ilk
+    dosyanın) satırı tutulur; tam ve artımlı birleştirme aynı kuralı kullanır.
+    Dönüş: (tarih, ptf, kaynak)
+    """
+    tarih = np.concatenate([p[0] for p in parts])
+    ptf = np.concatenate([p[1] for p in parts])
+    source = np.concatenate([p[2] for p in parts])
+    order = np.lexsort((source, tarih))
+    tarih, ptf, source = tarih[order], ptf[order], source[order]
+    keep = np.ones(len(tarih), dtype=bool)
+    keep[1:] = tarih[1:] != tarih[:-1]
+    return tarih[keep], ptf[keep], source[keep]
+
+def robust_import(workers=None, data_dir=None):
+    # Varsayılan: kodun çalıştığı klasör (ölçüm/test için başka bir klasör verilebilir)
+    current_dir = data_dir or os.path.dirname(os.path.abspath(__file__))
     output_file = os.path.join(current_dir, 'merged_data.csv')
-    
+    cache_dir = os.path.join(current_dir, CACHE_DIRNAME)
+    manifest_path = os.path.join(cache_dir, 'manifest.json')
+    merged_cache = os.path.join(cache_dir, 'merged.npz')
+    os.makedirs(cache_dir, exist_ok=True)
+
     print(f"📂 Çalışma Dizini: {current_dir}")
     print("🕵️  Dosyalar taranıyor (CSV ve Excel)...")
 
@@ -19,98 +162,123 @@ def robust_import():
     files_csv = glob.glob(os.path.join(current_dir, "*.csv"))
     files_xlsx = glob.glob(os.path.join(current_dir, "*.xlsx"))
     files_xls = glob.glob(os.path.join(current_dir, "*.xls"))
-    
+
     all_files = files_csv + files_xlsx + files_xls
-    
+
     # Çıktı dosyasını listeden çıkar (varsa)
-    all_files = [f for f in all_files if "merged_data.csv" not in f and "fix_merge" not in f]
-    
+    all_files = sorted(f for f in all_files if "merged_data.csv" not in f and "fix_merge" not in f)
+
     if not all_files:
         print("❌ HATA: Klasörde hiç veri dosyası bulunamadı!")
         return
 
-    print(f"📄 Toplam {len(all_files)} dosya bulundu. İşleniyor...")
-    df_list = []
-
+    # --- 1. MANIFEST: Hangi dosyalar yeni veya değişmiş? ---
+    manifest = load_manifest(manifest_path)
+    old_entries = manifest['files']
+    entries = {}
+    to_parse = []
     for filename in all_files:
-        file_name_short = os.path.basename(filename)
-        df = None
-        
-        # --- STRATEJİ 1: Excel Olarak Oku (En garantisi bu, uzantı csv olsa bile dene) ---
-        try:
-            df = pd.read_excel(filename)
-            # print(f"  -> {file_name_short} Excel olarak okundu.")
-        except:
-            # --- STRATEJİ 2: CSV Olarak Oku (Virgül) ---
-            try:
-                df = pd.read_csv(filename, sep=',')
-            except:
-                # --- STRATEJİ 3: CSV Olarak Oku (Noktalı Virgül) ---
-                try:
-                    df = pd.read_csv(filename, sep=';')
-                except:
-                    print(f"❌ OKUNAMADI: {file_name_short} (Format belirsiz)")
+        name = os.path.basename(filename)
+        stat = os.stat(filename)
+        old = old_entries.get(name)
+        # Önbellek dosyası elle silinmişse dosyayı yeniden ayrıştır
+        if old and old['rows'] is not None and not os.path.exists(os.path.join(cache_dir, old['sha256'] + '.npz')):
+            old = None
+        if old and old['size'] == stat.st_size and old['mtime'] == stat.st_mtime:
+            entries[name] = old
+            continue
+        # Boyut/zaman değişmiş: içerik özetine bak (sadece dokunulmuş dosyayı tekrar ayrıştırma)
+        sha = file_sha256(filename)
+        if old and old['sha256'] == sha:
+            entries[name] = {**old, 'size': stat.st_size, 'mtime': stat.st_mtime}
+            continue
+        entries[name] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': sha, 'rows': None, 'error': None}
+        to_parse.append(filename)
+
+    removed = set(old_entries) - set(entries)
+    print(f"📄 Toplam {len(all_files)} dosya bulundu. {len(to_parse)} yeni/değişmiş, {len(removed)} silinmiş.")
+
+    # --- 2. Sadece yeni/değişmiş dosyaları paralel ayrıştır ---
+    if to_parse:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for filename, (tarih, ptf, error) in zip(to_parse, pool.map(parse_file, to_parse)):
+                name = os.path.basename(filename)
+                entry = entries[name]
+                if error:
+                    entry['error'] = error
+                    print(f"  ⚠️ {name}: {error}")
                     continue
+                np.savez(os.path.join(cache_dir, entry['sha256'] + '.npz'), tarih=tarih, ptf=ptf)
+                entry['rows'] = len(tarih)
+                print(f"  ✅ OKUNDU: {name} ({len(tarih)} satır)")
 
-        # Veri Yüklendiyse Temizle
-        if df is not None:
-            try:
-                # Sütun isimlerini temizle (Küçük harf, Türkçe karakter temizliği)
-                df.columns = [str(c).lower().strip().replace(' ', '_').replace('.', '').replace('(', '').replace(')', '').replace('/', '') for c in df.columns]
-                
-                # PTF Sütununu Akıllıca Bul
-                ptf_cols = [c for c in df.columns if 'ptf' in c]
-                
-                if ptf_cols:
-                    # 'tl' yazanı önceliklendir, yoksa ilkini al
-                    target = next((c for c in ptf_cols if 'tl' in c), ptf_cols[0])
-                    df = df.rename(columns={target: 'ptf'})
-                    
-                    # Tarih Sütununu Bul
-                    date_col = next((c for c in df.columns if 'tarih' in c), None)
-                    if date_col:
-                        df = df.rename(columns={date_col: 'tarih'})
-                    
-                        # Tarih ve Saat Birleştirme
-                        if 'saat' in df.columns:
-                            # Saat sütunu bazen "00:00" bazen "0" gelebilir, string yapıp topla
-                            df['tarih'] = pd.to_datetime(df['tarih'].astype(str) + ' ' + df['saat'].astype(str))
-                        else:
-                            df['tarih'] = pd.to_datetime(df['tarih'])
-
-                        # Sayı Formatı Düzeltme (1.234,56 -> 1234.56)
-                        if df['ptf'].dtype == object:
-                            df['ptf'] = df['ptf'].astype(str).str.replace('.', '').str.replace(',', '.').astype(float)
-                        
-                        # Sadece lazım olanları al ve listeye ekle
-                        temp_df = df[['tarih', 'ptf']].copy()
-                        # Boş satırları at
-                        temp_df = temp_df.dropna()
-                        df_list.append(temp_df)
-                        print(f"  ✅ OKUNDU: {file_name_short} ({len(temp_df)} satır)")
-                    else:
-                        print(f"  ⚠️ Tarih sütunu yok: {file_name_short}")
-                else:
-                    print(f"  ⚠️ PTF sütunu yok: {file_name_short}")
-
-            except Exception as e:
-                print(f"  ❌ İŞLEME HATASI ({file_name_short}): {e}")
-
-    # BİRLEŞTİRME VE KAYDETME
-    if df_list:
-        full_df = pd.concat(df_list).sort_values('tarih').reset_index(drop=True)
-        # Yinelenen tarihleri temizle (Aynı dosya 2 kez indirilmişse)
-        full_df = full_df.drop_duplicates(subset=['tarih'])
-        
-        full_df.to_csv(output_file, index=False)
-        print("\n" + "="*40)
-        print(f"🎉 BÜYÜK BAŞARI! Dosyalar birleştirildi.")
-        print(f"📂 Kaydedilen Yer: {output_file}")
-        print(f"📊 Toplam Veri: {len(full_df)} satır")
-        print(f"📅 Tarih Aralığı: {full_df['tarih'].min()} - {full_df['tarih'].max()}")
-        print("="*40)
-    else:
+    # Artık kullanılmayan önbellek dosyalarını temizle
+    live = {e['sha256'] for e in entries.values()}
+    for old in old_entries.values():
+        cache_file = os.path.join(cache_dir, old['sha256'] + '.npz')
+        if old['sha256'] not in live and os.path.exists(cache_file):
+            os.remove(cache_file)
+
+    # --- 3. ARTIMLI BİRLEŞTİRME ---
+    ok_hashes = [e['sha256'] for e in entries.values() if e['rows'] is not None]
+    previous = manifest.get('merged', [])
+    if not ok_hashes:
         print("\n❌ Hiçbir dosya kurtarılamadı. Dosyaların bozuk olmadığından emin ol.")
+        manifest.update(files=entries, merged=[])
+        save_manifest(manifest_path, manifest)
+        return
+
+    # ok_hashes dosya adı sırasındadır: yinelenen saatlerde öncelik bu sıradaki yer (rank)
+    rank = {sha: i for i, sha in enumerate(ok_hashes)}
+
+    def load_file_part(sha):
+        with np.load(os.path.join(cache_dir, sha + '.npz')) as part:
+            return part['tarih'], part['ptf'], np.full(len(part['tarih']), rank[sha], dtype=np.int64)
+
+    def load_merged():
+        # Birleşik önbellekteki kaynak indeksleri önceki sıraya göredir, yeni sıraya çevrilir
+        with np.load(merged_cache) as part:
+            if 'source' not in part.files:
+                return None # Eski önbellek (kaynak bilgisi yok): tam birleştirme
+            remap = np.array([rank[sha] for sha in previous], dtype=np.int64)
+            return part['tarih'], part['ptf'], remap[part['source']]
+
+    if previous == ok_hashes and os.path.exists(merged_cache) and os.path.exists(output_file):
+        manifest.update(files=entries)
+        save_manifest(manifest_path, manifest)
+        print("✅ Veri zaten güncel, birleştirme atlandı.")
+        return
+
+    merged_part = None
+    # Artımlı yol sadece eski dosyalar duruyor ve aralarındaki ad sırası değişmediyse doğru
+    # (aksi halde önceki birleştirmede elenen bir satır artık öncelikli olabilir)
+    if previous and set(previous) <= set(ok_hashes) and os.path.exists(merged_cache) \
+            and [sha for sha in ok_hashes if sha in set(previous)] == previous:
+        merged_part = load_merged()
+    if merged_part is not None:
+        # Sadece yeni dosyalar eklendi: mevcut birleşik veriye ekle
+        new_hashes = [sha for sha in ok_hashes if sha not in set(previous)]
+        print(f"➕ Artımlı birleştirme: {len(new_hashes)} yeni dosya ekleniyor...")
+        tarih, ptf, source = merge_arrays([merged_part] + [load_file_part(sha) for sha in new_hashes])
+    else:
+        # Değişen/silinen dosya var: önbellekten yeniden kur (Excel tekrar okunmaz)
+        tarih, ptf, source = merge_arrays([load_file_part(sha) for sha in ok_hashes])
+
+    np.savez(merged_cache, tarih=tarih, ptf=ptf, source=source)
+    manifest.update(files=entries, merged=ok_hashes)
+    save_manifest(manifest_path, manifest)
+
+    # KAYDETME
+    full_df = pd.DataFrame({'tarih': tarih, 'ptf': ptf})
+    full_df.to_csv(output_file, index=False)
+    # Eğitim ve fatura modülleri CSV yerine bu ikili depodan okur
+    write_store(tarih, ptf, os.path.join(current_dir, 'store'), source=source_signature(output_file))
+    print("\n" + "="*40)
+    print(f"🎉 BÜYÜK BAŞARI! Dosyalar birleştirildi.")
+    print(f"📂 Kaydedilen Yer: {output_file}")
+    print(f"📊 Toplam Veri: {len(full_df)} satır")
+    print(f"📅 Tarih Aralığı: {full_df['tarih'].min()} - {full_df['tarih'].max()}")
+    print("="*40)
 
 if __name__ == "__main__":
     # Gerekli kütüphane kontrolü
@@ -119,5 +287,5 @@ if __name__ == "__main__":
     except ImportError:
         print("⚠️ UYARI: 'openpyxl' kütüphanesi eksik olabilir. Excel okumak için gereklidir.")
         print("Terminalden şunu çalıştırabilirsin: pip install openpyxl")
-    
-    robust_import()
\ No newline at end of file
+
+    robust_import()
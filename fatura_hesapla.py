@@ -3,10 +3,27 @@ import numpy as np
 from sklearn.neural_network import MLPRegressor
 from sklearn.preprocessing import StandardScaler
 import os
-import calendar
+import json
+import pickle
+import hashlib
+import argparse
 from datetime import datetime
 import warnings
 
+from src.preprocessor import load_frame
+
+# Eğitilmiş fiyat motoru önbelleği (veri + ayar parmak izi değişmedikçe tekrar eğitilmez)
+ENGINE_CACHE_VERSION = 2
+ENGINE_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'neural_price_engine.pkl')
+# Eğitimde kullanılan son saat sayısı (çok eski veriler atılır)
+TRAIN_WINDOW_HOURS = 20000
+# Monte Carlo risk simülasyonunda bir rastgele akışın ürettiği yol sayısı (parça boyutundan bağımsız)
+RISK_RNG_BLOCK = 500
+# Artımlı güncellemede yeni günler üzerinde yapılan partial_fit turu
+UPDATE_EPOCHS = 1
+# Bu kadar artımlı güncellemeden sonra sıfırdan eğitilir (kayma birikmesin)
+FULL_REFIT_EVERY = 30
+
 # Gereksiz uyarıları sustur
 warnings.filterwarnings('ignore')
 
@@ -16,6 +33,12 @@ def get_tariff_period(hour):
     elif 17 <= hour < 22: return 'T2 (Puant)'
     else: return 'T3 (Gece)'
 
+TARIFF_PERIODS = ['T1 (Gündüz)', 'T2 (Puant)', 'T3 (Gece)']
+# Saat -> tarife dilimi tablosu (satır satır fonksiyon çağırmamak için)
+TARIFF_BY_HOUR = np.array([get_tariff_period(hour) for hour in range(24)], dtype=object)
+# Saat -> dilim indeksi (0: T1, 1: T2, 2: T3)
+TARIFF_INDEX_BY_HOUR = np.array([TARIFF_PERIODS.index(get_tariff_period(hour)) for hour in range(24)])
+
 class NeuralPriceEngine:
     """
     Gerçek Yapay Zeka (Yapay Sinir Ağları - MLP)
@@ -23,17 +46,114 @@ class NeuralPriceEngine:
     Saatlik dağılımı (T1/T2/T3) tarihsel oranlara (Ratio) göre yapar.
     Böylece T3 asla T1'den pahalı çıkmaz.
     """
-    def __init__(self):
+    def __init__(self, hidden_layer_sizes=(100, 50, 25), max_iter=1000, random_state=42):
         # 3 Katmanlı Sinir Ağı (Deep Learning Lite)
+        self.config = {
+            'hidden_layer_sizes': list(hidden_layer_sizes), # Beyin nöron katmanları
+            'activation': 'relu',
+            'solver': 'adam',
+            'max_iter': max_iter,
+            'random_state': random_state,
+        }
         self.model = MLPRegressor(
-            hidden_layer_sizes=(100, 50, 25), # Beyin nöron katmanları
+            hidden_layer_sizes=tuple(hidden_layer_sizes),
             activation='relu',
             solver='adam',
-            max_iter=1000,
-            random_state=42
+            max_iter=max_iter,
+            random_state=random_state
         )
         self.scaler = StandardScaler()
         self.hourly_ratios = {} # Her saatin gün ortalamasına oranı
+        self.start_date = None
+        self.window = None # Kayan pencerenin günlük toplamları (artımlı güncelleme için)
+        self.updates = 0 # Son tam eğitimden beri artımlı güncelleme sayısı
+        self.history_fingerprint = None # Penceredeki geçmiş verinin özeti (geçmiş düzeltilirse artımlı güncelleme yapılmaz)
+
+    def fingerprint(self, df):
+        # Eğitim diliminin (tarih, ptf) içeriği + model ayarları -> önbellek anahtarı
+        digest = hashlib.sha256()
+        digest.update(json.dumps({'version': ENGINE_CACHE_VERSION, **self.config}, sort_keys=True).encode())
+        digest.update(df['tarih'].to_numpy(dtype='datetime64[ns]').tobytes())
+        digest.update(df['ptf'].to_numpy(dtype=np.float64).tobytes())
+        return digest.hexdigest()
+
+    def save(self, filepath, fingerprint):
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        # Sınıfın kendisi değil parçaları saklanır (script/modül olarak çalıştırma farkı sorun olmasın)
+        state = {
+            'version': ENGINE_CACHE_VERSION,
+            'fingerprint': fingerprint,
+            'config': self.config,
+            'model': self.model,
+            'scaler': self.scaler,
+            'hourly_ratios': self.hourly_ratios,
+            'start_date': self.start_date,
+            'window': self.window,
+            'updates': self.updates,
+            'history_fingerprint': self.history_fingerprint,
+        }
+        with open(filepath, 'wb') as f:
+            pickle.dump(state, f)
+
+    @classmethod
+    def load(cls, filepath, fingerprint=None):
+        # Dosya yoksa, sürüm veya parmak izi tutmuyorsa None döner
+        if not os.path.exists(filepath):
+            return None
+        try:
+            with open(filepath, 'rb') as f:
+                state = pickle.load(f)
+        except Exception:
+            return None
+        if state.get('version') != ENGINE_CACHE_VERSION:
+            return None
+        if fingerprint is not None and state.get('fingerprint') != fingerprint:
+            return None
+        config = state['config']
+        engine = cls(config['hidden_layer_sizes'], config['max_iter'], config['random_state'])
+        engine.model = state['model']
+        engine.scaler = state['scaler']
+        engine.hourly_ratios = state['hourly_ratios']
+        engine.start_date = state['start_date']
+        engine.window = state['window']
+        engine.updates = state['updates']
+        engine.history_fingerprint = state['history_fingerprint']
+        return engine
+
+    @staticmethod
+    def daily_aggregates(df):
+        """
+        Saatlik veriden gün bazında toplamlar (groupby yerine tek geçişte bincount):
+            days: gün dizisi, daily_mean: günlük ortalama PTF,
+            ratio_sum / ratio_count: (gün, saat) bazında ptf / günlük_ortalama toplamı ve sayısı
+        """
+        day = df['tarih'].to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+        days, inverse = np.unique(day, return_inverse=True)
+        ptf = df['ptf'].to_numpy(dtype=np.float64)
+        hour = df['hour'].to_numpy(dtype=np.int64)
+        daily_mean = np.bincount(inverse, ptf, len(days)) / np.bincount(inverse, minlength=len(days))
+
+        # Günlük ortalaması 0 olan günün oranları tanımsız (pandas ortalaması NaN'ları atlar)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = ptf / daily_mean[inverse]
+        valid = np.isfinite(ratio)
+        ratio_sum = np.zeros((len(days), 24))
+        ratio_count = np.zeros((len(days), 24), dtype=np.int64)
+        np.add.at(ratio_sum, (inverse[valid], hour[valid]), ratio[valid])
+        np.add.at(ratio_count, (inverse[valid], hour[valid]), 1)
+        return {'days': days, 'daily_mean': daily_mean, 'ratio_sum': ratio_sum, 'ratio_count': ratio_count}
+
+    def _set_window(self, window):
+        # Pencere günlük toplamları + saat başına oran biriktiricileri -> hourly_ratios
+        self.window = window
+        totals = window['ratio_sum'].sum(axis=0)
+        counts = window['ratio_count'].sum(axis=0)
+        self.hourly_ratios = {hour: totals[hour] / counts[hour] for hour in range(24) if counts[hour]}
+
+    def _time_features(self, days):
+        # Gün dizisi -> ölçeklenmiş zaman indeksi (start_date'ten beri gün)
+        time_idx = (days - np.datetime64(self.start_date, 'D')).astype(np.int64)
+        return self.scaler.transform(pd.DataFrame({'time_idx': time_idx}))
 
     def fit(self, df):
         print("🧠 Sinir Ağları (Neural Network) eğitiliyor...")
@@ -41,76 +161,426 @@ class NeuralPriceEngine:
         # 1. Hiyerarşik Veri Hazırlığı
         # Önce veriyi "Günlük Ortalama"ya indirgeyelim.
         # Çünkü Neural Network trendi günlük bazda daha iyi yakalar.
-        daily_avg = df.groupby(df['tarih'].dt.date)['ptf'].mean().reset_index()
-        daily_avg['tarih'] = pd.to_datetime(daily_avg['tarih'])
-        
-        # Zamanı sayıya çevir (Trend için)
-        daily_avg['time_idx'] = (daily_avg['tarih'] - daily_avg['tarih'].min()).dt.days
+        window = self.daily_aggregates(df)
+        self.start_date = pd.Timestamp(window['days'][0])
         
         # 2. Oranları Öğren (Seasonality)
         # Her saatin, o günün ortalamasına göre oranı nedir?
         # Örn: Saat 04:00 genelde ortalamanın %70'idir (0.7)
-        df['daily_mean'] = df.groupby(df['tarih'].dt.date)['ptf'].transform('mean')
-        df['ratio'] = df['ptf'] / df['daily_mean']
-        
-        # Her saatin ortalama çarpanını kaydet
-        self.hourly_ratios = df.groupby('hour')['ratio'].mean().to_dict()
+        # Günlük toplamlar saklanır: yeni gün gelince pencere yeniden gruplanmadan güncellenir
+        window['window_days'] = len(window['days'])
+        self._set_window(window)
+        self.updates = 0
         
         # 3. Sinir Ağını Eğit (Sadece Fiyat Seviyesi İçin)
-        X = daily_avg[['time_idx']]
-        y = daily_avg['ptf']
+        # Zamanı sayıya çevir (Trend için)
+        X = pd.DataFrame({'time_idx': (window['days'] - window['days'][0]).astype(np.int64)})
+        y = window['daily_mean']
         
         # Veriyi ölçekle (Neural Network için şarttır)
         X_scaled = self.scaler.fit_transform(X)
         
         self.model.fit(X_scaled, y)
-        self.start_date = daily_avg['tarih'].min()
         print("✅ Yapay Zeka enflasyon trendini ve saatlik oranları ezberledi.")
 
+    def update(self, df, epochs=UPDATE_EPOCHS):
+        """
+        Artımlı (sıcak başlangıçlı) güncelleme: df içindeki, pencerenin son gününden sonraki
+        günler pencereye eklenir, en eski günler kayan pencereden düşer.
+        Saatlik oranlar biriktiricilerden güncellenir; sinir ağı mevcut ağırlıklarından devam ederek
+        sadece yeni günler üzerinde `epochs` tur partial_fit ile eğitilir.
+        Zaman ekseni ve ölçekleyici ilk tam eğitimdeki gibi kalır.
+        Dönüş: Eklenen gün sayısı
+        """
+        if self.window is None:
+            raise ValueError("Önce fit ile tam eğitim yapılmalı!")
+        last_day = self.window['days'][-1]
+        new = df[df['tarih'].to_numpy(dtype='datetime64[ns]').astype('datetime64[D]') > last_day]
+        if new.empty:
+            return 0
+        added = self.daily_aggregates(new)
+
+        # Kayan pencere: yeni günler eklenir, pencere boyunu aşan eski günler düşer
+        keep = slice(max(len(self.window['days']) + len(added['days']) - self.window['window_days'], 0), None)
+        window = {name: np.concatenate([self.window[name], added[name]])[keep]
+                  for name in ('days', 'daily_mean', 'ratio_sum', 'ratio_count')}
+        window['window_days'] = self.window['window_days']
+        self._set_window(window)
+
+        X_scaled = self._time_features(added['days'])
+        for _ in range(epochs):
+            self.model.partial_fit(X_scaled, added['daily_mean'])
+        self.updates += 1
+        return len(added['days'])
+
+    def window_fingerprint(self, df):
+        # df'nin penceredeki günlere düşen kısmı (pencere kurulduktan sonra geçmiş değişti mi?)
+        day = df['tarih'].to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+        in_window = (day >= self.window['days'][0]) & (day <= self.window['days'][-1])
+        digest = hashlib.sha256()
+        digest.update(df['tarih'].to_numpy(dtype='datetime64[ns]')[in_window].tobytes())
+        digest.update(df['ptf'].to_numpy(dtype=np.float64)[in_window].tobytes())
+        return digest.hexdigest()
+
+    def hourly_ratio_array(self):
+        # Saat -> oran tablosu (24 elemanlı dizi, bilinmeyen saat 1.0)
+        ratios = np.ones(24)
+        for hour, ratio in self.hourly_ratios.items():
+            ratios[int(hour)] = ratio
+        return ratios
+
+    def daily_base_price(self, dates):
+        # Tarih dizisi -> Neural Network'ün "Günlük Ortalama Fiyat" tahmini (her farklı gün için bir kez)
+        days, inverse = np.unique(pd.DatetimeIndex(dates).to_numpy(dtype='datetime64[D]'), return_inverse=True)
+        return self.model.predict(self._time_features(days))[inverse]
+
     def predict(self, future_df):
-        # Gelecek günlerin "time_idx"ini bul
+        # 1. Gelecek günlerin "Günlük Ortalama Fiyatı"
         future_dates = pd.to_datetime(future_df[['year', 'month', 'day']])
-        time_idx = (future_dates - self.start_date).dt.days.values.reshape(-1, 1)
-        
-        # 1. Neural Network ile "Günlük Ortalama Fiyatı" tahmin et
-        X_scaled = self.scaler.transform(time_idx)
-        daily_base_price = self.model.predict(X_scaled)
+        daily_base_price = self.daily_base_price(future_dates)
         
         # 2. Saatlik Oranları Uygula (Ratio Reconstruction)
         # Bu işlem T3 < T1 < T2 hiyerarşisini GARANTİ eder.
-        final_prices = []
-        for i, row in future_df.iterrows():
-            hour = row['hour']
-            ratio = self.hourly_ratios.get(hour, 1.0)
-            base_price = daily_base_price[i]
-            
-            # Negatif fiyat tahminini engelle
-            price = max(base_price * ratio, 0)
-            final_prices.append(price)
-            
-        return np.array(final_prices)
-
-def train_neural_model():
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    data_path = os.path.join(current_dir, 'data', 'merged_data.csv')
-    
-    if not os.path.exists(data_path):
+        ratios = self.hourly_ratio_array()[future_df['hour'].to_numpy(dtype=np.int64)]
+        
+        # Negatif fiyat tahminini engelle
+        return np.maximum(daily_base_price * ratios, 0)
+
+    def forecast(self, start, end):
+        """
+        [start, end) aralığındaki her saat için fiyat tahmini üretir (tek çağrıda aylar/yıllar).
+        Dönüş: tarih, year, month, day, hour, period, Tahmin_PTF sütunlu DataFrame
+        """
+        hours = pd.date_range(pd.Timestamp(start), pd.Timestamp(end), freq='h', inclusive='left')
+        future_df = pd.DataFrame({
+            'tarih': hours,
+            'year': hours.year,
+            'month': hours.month,
+            'day': hours.day,
+            'hour': hours.hour,
+        })
+        future_df['period'] = TARIFF_BY_HOUR[future_df['hour'].to_numpy()]
+        future_df['Tahmin_PTF'] = self.predict(future_df)
+        return future_df
+
+def period_summary(forecast_df):
+    # Saatlik tahmini ay bazında T1/T2/T3 ortalamalarına indirger
+    summary = forecast_df.pivot_table(index=['year', 'month'], columns='period', values='Tahmin_PTF', aggfunc='mean')
+    summary['Ortalama'] = forecast_df.groupby(['year', 'month'])['Tahmin_PTF'].mean()
+    return summary[TARIFF_PERIODS + ['Ortalama']]
+
+def train_neural_model(cache_path=ENGINE_CACHE_PATH, force_retrain=False, incremental=True):
+    # İkili sütun deposundan oku (tarihe göre sıralı, saat alanı hazır)
+    try:
+        df = load_frame()
+    except FileNotFoundError:
         print("❌ Veri bulunamadı!")
         exit()
-
-    df = pd.read_csv(data_path)
-    df['tarih'] = pd.to_datetime(df['tarih'])
-    df = df.sort_values('tarih').reset_index(drop=True)
     
     # Çok eski verileri at, kafası karışmasın (Son 20.000 saat)
-    df['hour'] = df['tarih'].dt.hour
-    df_train = df.tail(20000).reset_index(drop=True)
+    df_train = df.tail(TRAIN_WINDOW_HOURS).reset_index(drop=True)
     
     engine = NeuralPriceEngine()
+    fingerprint = engine.fingerprint(df_train)
+    
+    if not force_retrain:
+        # Veri veya ayar değişmediyse kayıtlı motoru yükle
+        cached = NeuralPriceEngine.load(cache_path, fingerprint)
+        if cached is not None:
+            print("⚡ Kayıtlı Sinir Ağı yüklendi (veri değişmemiş).")
+            return cached
+        
+        # Sadece yeni günler eklendiyse (penceredeki geçmiş aynı) kayıtlı motoru artımlı güncelle
+        cached = NeuralPriceEngine.load(cache_path)
+        if (incremental and cached is not None and cached.config == engine.config
+                and cached.updates < FULL_REFIT_EVERY
+                and cached.history_fingerprint == cached.window_fingerprint(df)):
+            added = cached.update(df)
+            if added:
+                cached.history_fingerprint = cached.window_fingerprint(df)
+                cached.save(cache_path, fingerprint)
+                print(f"⚡ Kayıtlı Sinir Ağı {added} yeni günle güncellendi "
+                      f"({cached.updates}/{FULL_REFIT_EVERY} artımlı güncelleme).")
+                return cached
+    
     engine.fit(df_train)
+    engine.history_fingerprint = engine.window_fingerprint(df)
+    engine.save(cache_path, fingerprint)
     
     return engine
 
+def tariff_unit_prices(avg_ptf, yekdem, margin_percent):
+    """
+    Dilim ortalama PTF'lerinden (TL/MWh, son eksen T1/T2/T3) tüketici birim fiyatı (TL/kWh).
+    yekdem ve margin_percent skaler veya müşteri başına dizi olabilir.
+    """
+    avg_ptf = np.asarray(avg_ptf, dtype=np.float64)
+    yekdem = np.asarray(yekdem, dtype=np.float64)[..., None]
+    margin_multiplier = 1 + (np.asarray(margin_percent, dtype=np.float64)[..., None] / 100)
+    price_mwh = (avg_ptf + yekdem) * margin_multiplier
+    return price_mwh / 1000
+
+def compare_offer(unit_prices, consumption, offer_price, total_kwh=None):
+    """
+    Endeksli (piyasa) maliyet ile sabit fiyat teklifini kıyaslar. Tüm girdiler müşteri
+    başına dizi olabilir; consumption ve unit_prices'ın son ekseni T1/T2/T3'tür.
+    Dönüş: (cost_market, cost_offer, diff) -- diff > 0 ise teklif pahalı (REDDET)
+    """
+    consumption = np.asarray(consumption, dtype=np.float64)
+    if total_kwh is None:
+        total_kwh = consumption.sum(axis=-1)
+    cost_market = (consumption * unit_prices).sum(axis=-1)
+    cost_offer = np.asarray(offer_price, dtype=np.float64) * total_kwh
+    return cost_market, cost_offer, cost_offer - cost_market
+
+def evaluate_batch(customers, engine):
+    """
+    Çok sayıda müşteri/teklifi tek seferde değerlendirir.
+
+    customers sütunları:
+        year, month (veya 'period' = 'YYYY-MM'), offer_price (TL/kWh)
+        t1_kwh, t2_kwh, t3_kwh  veya  total_kwh + t1_pct, t2_pct, t3_pct
+        yekdem (TL/MWh, varsayılan 250), margin (%, varsayılan 5)
+    Her farklı ay bir kez tahmin edilir, tüm müşteriler dizi işlemleriyle hesaplanır.
+    """
+    df = customers.copy()
+    if 'period' in df.columns and 'year' not in df.columns:
+        period = pd.to_datetime(df['period'].astype(str), format='%Y-%m')
+        df['year'] = period.dt.year
+        df['month'] = period.dt.month
+    if 'yekdem' not in df.columns:
+        df['yekdem'] = 250.0
+    if 'margin' not in df.columns:
+        df['margin'] = 5.0
+    df['yekdem'] = df['yekdem'].fillna(250.0)
+    df['margin'] = df['margin'].fillna(5.0)
+
+    # Tüketim: Detaylı (kWh) yoksa toplam + yüzdelik dağılımdan türet
+    n = len(df)
+    consumption = np.full((n, 3), np.nan)
+    for i, col in enumerate(['t1_kwh', 't2_kwh', 't3_kwh']):
+        if col in df.columns:
+            consumption[:, i] = df[col].to_numpy(dtype=np.float64)
+    if {'total_kwh', 't1_pct', 't2_pct', 't3_pct'} <= set(df.columns):
+        pct = df[['t1_pct', 't2_pct', 't3_pct']].to_numpy(dtype=np.float64)
+        split = df['total_kwh'].to_numpy(dtype=np.float64)[:, None] * pct / pct.sum(axis=1, keepdims=True)
+        missing = np.isnan(consumption).any(axis=1)
+        consumption[missing] = split[missing]
+    if np.isnan(consumption).any():
+        raise ValueError("Bazı müşterilerde tüketim bilgisi eksik (t1/t2/t3_kwh veya total_kwh + yüzdeler)!")
+
+    # Her farklı ay için tek tahmin
+    months = df[['year', 'month']].drop_duplicates().astype(int)
+    summaries = []
+    for year, month in months.itertuples(index=False):
+        month_start = pd.Timestamp(year=year, month=month, day=1)
+        summaries.append(period_summary(engine.forecast(month_start, month_start + pd.DateOffset(months=1))))
+    summary = pd.concat(summaries)
+    keys = pd.MultiIndex.from_arrays([df['year'].astype(int), df['month'].astype(int)])
+    avg_ptf = summary.loc[keys, TARIFF_PERIODS].to_numpy()
+
+    unit_prices = tariff_unit_prices(avg_ptf, df['yekdem'].to_numpy(), df['margin'].to_numpy())
+    cost_market, cost_offer, diff = compare_offer(unit_prices, consumption, df['offer_price'].to_numpy())
+
+    for i, col in enumerate(['t1_price', 't2_price', 't3_price']):
+        df[col] = unit_prices[:, i]
+    df['market_cost'] = cost_market
+    df['offer_cost'] = cost_offer
+    df['cost_delta'] = diff
+    df['decision'] = np.where(diff > 0, 'REDDET', 'KABUL ET')
+    return df
+
+def hourly_unit_prices(hourly_ptf, yekdem=250.0, margin_percent=5.0):
+    # Saatlik PTF (TL/MWh) -> saatlik tüketici birim fiyatı (TL/kWh)
+    return (np.asarray(hourly_ptf, dtype=np.float64) + yekdem) * (1 + margin_percent / 100) / 1000
+
+def profile_costs(hourly_ptf, hours, profiles, yekdem=250.0, margin_percent=5.0):
+    """
+    Saatlik yük profillerini (Örn: akıllı sayaçtan 8.760 satır) saatlik tahminle eşleştirir.
+    Üç dilimin ortalama fiyatı yerine her saatin kendi fiyatı kullanılır (tüketim ile PTF
+    zirvesi arasındaki ilişki korunur).
+
+    hourly_ptf: (n_hours,) TL/MWh, hours: (n_hours,) saat (0-23), profiles: (n_profiles, n_hours) kWh
+    Dönüş: (market_cost (n_profiles,), period_kwh (n_profiles, 3), period_cost (n_profiles, 3))
+    """
+    unit = hourly_unit_prices(hourly_ptf, yekdem, margin_percent)
+    profiles = np.atleast_2d(np.asarray(profiles, dtype=np.float64))
+    # Saat -> dilim eşlemesi (one-hot): tek matris çarpımıyla dilim toplamları
+    onehot = np.zeros((len(unit), 3))
+    onehot[np.arange(len(unit)), TARIFF_INDEX_BY_HOUR[np.asarray(hours, dtype=np.int64)]] = 1
+    period_kwh = profiles @ onehot
+    period_cost = profiles @ (onehot * unit[:, None])
+    return profiles @ unit, period_kwh, period_cost
+
+def evaluate_profile_stream(path, engine, start, end, yekdem=250.0, margin_percent=5.0, offer_price=None, chunksize=500_000):
+    """
+    Uzun formatlı (customer, tarih, kwh) sayaç dosyasını parça parça okuyup müşteri başına
+    saatlik faturayı hesaplar. Bellek kullanımı dosya boyutundan bağımsızdır (chunksize satır + müşteri başına toplamlar).
+    [start, end) dışındaki satırlar fiyatlanmaz, 'unpriced_kwh' olarak raporlanır.
+    """
+    forecast = engine.forecast(start, end)
+    unit = hourly_unit_prices(forecast['Tahmin_PTF'].to_numpy(), yekdem, margin_percent)
+    period_idx = TARIFF_INDEX_BY_HOUR[forecast['hour'].to_numpy()]
+    start_ns = pd.Timestamp(start).value
+    hour_ns = 3_600_000_000_000
+
+    totals = None
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        ts = pd.to_datetime(chunk['tarih']).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        idx = (ts - start_ns) // hour_ns
+        priced = (idx >= 0) & (idx < len(unit))
+        idx = np.where(priced, idx, 0)
+        kwh = chunk['kwh'].to_numpy(dtype=np.float64)
+        priced_kwh = np.where(priced, kwh, 0.0)
+        period = period_idx[idx]
+        cost = priced_kwh * unit[idx]
+
+        part = {'customer': chunk['customer'].to_numpy()}
+        for i, name in enumerate(['t1', 't2', 't3']):
+            mask = period == i
+            part[f'{name}_kwh'] = np.where(mask, priced_kwh, 0.0)
+            part[f'{name}_cost'] = np.where(mask, cost, 0.0)
+        part['unpriced_kwh'] = kwh - priced_kwh
+        aggregated = pd.DataFrame(part).groupby('customer').sum()
+        totals = aggregated if totals is None else totals.add(aggregated, fill_value=0)
+
+    if totals is None:
+        return pd.DataFrame()
+    return _profile_summary(totals, offer_price)
+
+def evaluate_profile_matrix(path, engine, start, end, yekdem=250.0, margin_percent=5.0, offer_price=None):
+    """
+    Geniş formatlı sayaç dosyası (satır başına bir saat: tarih + müşteri başına bir kWh sütunu)
+    için saatlik fatura. Profiller tek (müşteri, saat) matrisine dizilir ve profile_costs ile
+    tek matris çarpımında fiyatlanır. [start, end) dışındaki saatler 'unpriced_kwh' olarak raporlanır.
+    """
+    forecast = engine.forecast(start, end)
+    df = pd.read_csv(path)
+    customers = [c for c in df.columns if c != 'tarih']
+    ts = pd.to_datetime(df['tarih']).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    idx = (ts - pd.Timestamp(start).value) // 3_600_000_000_000
+    priced = (idx >= 0) & (idx < len(forecast))
+    kwh = df[customers].to_numpy(dtype=np.float64).T
+
+    # (müşteri, tahmin saati) matrisi; aynı saat birden çok satırdaysa toplanır
+    profiles = np.zeros((len(customers), len(forecast)))
+    np.add.at(profiles, (slice(None), idx[priced]), kwh[:, priced])
+    _, period_kwh, period_cost = profile_costs(forecast['Tahmin_PTF'].to_numpy(), forecast['hour'].to_numpy(),
+                                               profiles, yekdem, margin_percent)
+
+    totals = pd.DataFrame(index=pd.Index(customers, name='customer'))
+    for i, name in enumerate(['t1', 't2', 't3']):
+        totals[f'{name}_kwh'] = period_kwh[:, i]
+        totals[f'{name}_cost'] = period_cost[:, i]
+    totals['unpriced_kwh'] = kwh[:, ~priced].sum(axis=1)
+    return _profile_summary(totals, offer_price)
+
+def is_wide_profile_file(path):
+    # Uzun format: customer, tarih, kwh sütunları; geniş format: tarih + müşteri sütunları
+    columns = pd.read_csv(path, nrows=0).columns
+    return 'tarih' in columns and not {'customer', 'kwh'} <= set(columns)
+
+def _profile_summary(totals, offer_price=None):
+    # Müşteri başına dilim toplamlarından fatura özeti (uzun ve geniş format ortak)
+    totals['total_kwh'] = totals[['t1_kwh', 't2_kwh', 't3_kwh']].sum(axis=1)
+    totals['market_cost'] = totals[['t1_cost', 't2_cost', 't3_cost']].sum(axis=1)
+    totals['avg_unit_price'] = totals['market_cost'] / totals['total_kwh']
+    if offer_price is not None:
+        totals['offer_cost'] = offer_price * totals['total_kwh']
+        totals['cost_delta'] = totals['offer_cost'] - totals['market_cost']
+        totals['decision'] = np.where(totals['cost_delta'] > 0, 'REDDET', 'KABUL ET')
+    return totals.reset_index()
+
+def daily_residuals(engine, df):
+    """
+    Tarihsel saatlik fiyatların motor tahmininden göreli sapmaları, gün blokları halinde:
+        residual[d, h] = ptf / günlük_baz - saatlik_oran   (yani ptf = baz * (oran + residual))
+    Göreli olduğu için farklı fiyat seviyelerine taşınabilir. Saatleri eksik günler atılır.
+    Dönüş: (n_days, 24) dizisi
+    """
+    day = df['tarih'].dt.normalize()
+    table = df.pivot_table(index=day, columns='hour', values='ptf', aggfunc='mean')
+    table = table.reindex(columns=range(24)).dropna()
+    base = engine.daily_base_price(table.index)
+    valid = base > 0
+    return table.to_numpy()[valid] / base[valid, None] - engine.hourly_ratio_array()
+
+def simulate_bill_risk(engine, residuals, year, month, consumption, offer_price, yekdem=250.0, margin_percent=5.0,
+                       n_paths=10_000, chunk_size=2_000, seed=42):
+    """
+    Monte Carlo fatura riski: Hedef ay için n_paths adet saatlik PTF yolu üretir.
+    Her yol, tahmin edilen günlük baz fiyat ve saatlik oranların üzerine tarihsel
+    günlerden rastgele (iadeli) seçilmiş sapma bloklarının eklenmesiyle oluşur
+    (gün içi saatlerin birlikte hareketi korunur).
+
+    consumption: (3,) T1/T2/T3 kWh (dilim ortalama fiyatıyla) veya (n_hours,) saatlik profil kWh
+    Yollar chunk_size'lık parçalar halinde üretilir; bellek yol sayısıyla değil parça boyutuyla büyür.
+    Rastgele seçimler RISK_RNG_BLOCK yolluk bloklarda, her blok SeedSequence(seed).spawn ile kendi
+    akışından çekilir: aynı seed, chunk_size ne olursa olsun aynı yolları üretir (maliyetler en fazla
+    matris çarpımının son bit yuvarlamasında farklılaşır).
+    Dönüş: (özet sözlüğü, yol başına endeksli maliyet dizisi)
+    """
+    month_start = pd.Timestamp(year=year, month=month, day=1)
+    forecast = engine.forecast(month_start, month_start + pd.DateOffset(months=1))
+    n_hours = len(forecast)
+    base = engine.daily_base_price(forecast['tarih'].to_numpy()[::24]) # (n_days,)
+    ratios = engine.hourly_ratio_array() # (24,)
+    residuals = np.asarray(residuals, dtype=np.float64)
+
+    consumption = np.asarray(consumption, dtype=np.float64)
+    if consumption.shape == (3,):
+        # Saat -> dilim ortalaması ağırlıkları: (yollar x saat) @ (saat x 3) = dilim ortalama PTF'leri
+        onehot = np.zeros((n_hours, 3))
+        onehot[np.arange(n_hours), TARIFF_INDEX_BY_HOUR[forecast['hour'].to_numpy()]] = 1
+        period_weights = onehot / onehot.sum(axis=0)
+        cost_of = lambda paths: tariff_unit_prices(paths @ period_weights, yekdem, margin_percent) @ consumption
+    elif consumption.shape == (n_hours,):
+        cost_of = lambda paths: hourly_unit_prices(paths, yekdem, margin_percent) @ consumption
+    else:
+        raise ValueError(f"Tüketim 3 dilim veya {n_hours} saat olmalı, gelen: {consumption.shape}")
+
+    # Blok b'nin yolları her zaman streams[b]'den çekilir; parçalar blok sınırlarına hizalanır
+    n_blocks = -(-n_paths // RISK_RNG_BLOCK)
+    streams = np.random.SeedSequence(seed).spawn(n_blocks)
+    blocks_per_chunk = max(1, chunk_size // RISK_RNG_BLOCK)
+    costs = np.empty(n_paths)
+    for first_block in range(0, n_blocks, blocks_per_chunk):
+        start = first_block * RISK_RNG_BLOCK
+        n = min(blocks_per_chunk * RISK_RNG_BLOCK, n_paths - start)
+        # (n, gün, 24): her yol için her güne rastgele bir tarihsel gün bloğu
+        picks = np.concatenate([
+            np.random.default_rng(streams[b]).integers(len(residuals), size=(min(RISK_RNG_BLOCK, n_paths - b * RISK_RNG_BLOCK), len(base)))
+            for b in range(first_block, min(first_block + blocks_per_chunk, n_blocks))
+        ])
+        paths = base[None, :, None] * (ratios + residuals[picks])
+        np.maximum(paths, 0, out=paths) # Negatif fiyat yok
+        costs[start:start + n] = cost_of(paths.reshape(n, n_hours))
+
+    offer_cost = offer_price * consumption.sum()
+    summary = {
+        'forecast_cost': float(cost_of(forecast['Tahmin_PTF'].to_numpy()[None, :])[0]),
+        'expected_cost': float(costs.mean()),
+        'p5_cost': float(np.percentile(costs, 5)),
+        'p50_cost': float(np.percentile(costs, 50)),
+        'p95_cost': float(np.percentile(costs, 95)),
+        'offer_cost': float(offer_cost),
+        'prob_offer_cheaper': float(np.mean(offer_cost < costs)),
+    }
+    return summary, costs
+
+def print_bill_risk(period, consumption, offer_price, yekdem=250.0, margin_percent=5.0, n_paths=10_000, seed=42):
+    engine = train_neural_model()
+    residuals = daily_residuals(engine, load_frame().tail(TRAIN_WINDOW_HOURS))
+    period = pd.Timestamp(period)
+    summary, _ = simulate_bill_risk(engine, residuals, period.year, period.month, consumption, offer_price,
+                                    yekdem, margin_percent, n_paths=n_paths, seed=seed)
+    print(f"\n🎲 {period.month}/{period.year} Fatura Riski ({n_paths} senaryo, {len(residuals)} tarihsel gün):")
+    print(f"   Tahmin (tek senaryo): {summary['forecast_cost']:.2f} TL")
+    print(f"   Beklenen Maliyet:     {summary['expected_cost']:.2f} TL")
+    print(f"   P5 / P50 / P95:       {summary['p5_cost']:.2f} / {summary['p50_cost']:.2f} / {summary['p95_cost']:.2f} TL")
+    print(f"   Sabit Teklif:         {summary['offer_cost']:.2f} TL")
+    print(f"   Teklifin daha ucuz olma olasılığı: %{summary['prob_offer_cheaper'] * 100:.1f}")
+
 def calculate_bill():
     print("\n" + "="*60)
     print("⚡ NEURAL NETWORK FATURA SİSTEMİ (Derin Öğrenme) ⚡")
@@ -128,23 +598,9 @@ def calculate_bill():
 
     print(f"\n🔄 {target_month}/{target_year} için Sinir Ağları çalışıyor...")
     
-    num_days = calendar.monthrange(target_year, target_month)[1]
-    future_data = []
-    
-    for day in range(1, num_days + 1):
-        for hour in range(24):
-            future_data.append({
-                'year': target_year,
-                'month': target_month,
-                'day': day,
-                'hour': hour,
-                'period': get_tariff_period(hour)
-            })
-            
-    future_df = pd.DataFrame(future_data)
-    
     # TAHMİN (Neural Network + Ratios)
-    future_df['Tahmin_PTF'] = engine.predict(future_df)
+    month_start = pd.Timestamp(year=target_year, month=target_month, day=1)
+    future_df = engine.forecast(month_start, month_start + pd.DateOffset(months=1))
     
     avg_ptf = future_df.groupby('period')['Tahmin_PTF'].mean()
     
@@ -159,23 +615,14 @@ def calculate_bill():
         margin_percent = float(margin_input) if margin_input else 5.0
     except ValueError: margin_percent = 5.0
     
-    margin_multiplier = 1 + (margin_percent / 100)
-
-    final_unit_prices = {}
+    unit_prices = tariff_unit_prices(avg_ptf[TARIFF_PERIODS].to_numpy(), yekdem, margin_percent)
+    final_unit_prices = dict(zip(TARIFF_PERIODS, unit_prices))
     print(f"\n📊 Hesaplanan PİYASA Birim Fiyatları (Vergiler Hariç):")
     
-    # FİYAT KONTROLÜ (Sağlama)
-    t1_p = avg_ptf['T1 (Gündüz)']
-    t2_p = avg_ptf['T2 (Puant)']
-    t3_p = avg_ptf['T3 (Gece)']
-    
     # Matematiksel olarak T3 < T1 < T2 olması lazım artık
     
-    for period in ['T1 (Gündüz)', 'T2 (Puant)', 'T3 (Gece)']:
-        price_mwh = (avg_ptf[period] + yekdem) * margin_multiplier
-        price_kwh = price_mwh / 1000
-        final_unit_prices[period] = price_kwh
-        
+    for period in TARIFF_PERIODS:
+        price_kwh = final_unit_prices[period]
         label = "✅ UCUZ" if period == "T3 (Gece)" else "🔥 PAHALI" if period == "T2 (Puant)" else "NORMAL"
         print(f"   🔹 {period}: {price_kwh:.3f} TL/kWh [{label}]")
 
@@ -206,11 +653,8 @@ def calculate_bill():
     print("\n💼 Şirket Teklifi (Sabit Fiyat):")
     offer_price = float(input("Teklif Fiyatı (TL/kWh): "))
     
-    cost_market = (consumption['T1 (Gündüz)'] * final_unit_prices['T1 (Gündüz)'] +
-                   consumption['T2 (Puant)']  * final_unit_prices['T2 (Puant)'] +
-                   consumption['T3 (Gece)']   * final_unit_prices['T3 (Gece)'])
-    cost_offer = offer_price * total_kwh
-    diff = cost_offer - cost_market
+    cost_market, cost_offer, diff = compare_offer(unit_prices, [consumption[p] for p in TARIFF_PERIODS],
+                                                  offer_price, total_kwh)
     
     print("\n" + "*"*50)
     print(f"💰 {target_month}/{target_year} DETAYLI RAPOR")
@@ -225,5 +669,55 @@ def calculate_bill():
     else:
         print(f"✅ TEKLİFİ KABUL ET! (Piyasa {abs(diff):.2f} TL daha pahalı)")
 
+def print_forecast(start, months):
+    # Çok aylık sözleşme teklifi için tek çağrıda T1/T2/T3 tahmini
+    engine = train_neural_model()
+    start = pd.Timestamp(start)
+    forecast_df = engine.forecast(start, start + pd.DateOffset(months=months))
+    summary = period_summary(forecast_df)
+    print(f"\n📅 {months} Aylık PTF Tahmini (TL/MWh):")
+    print(summary.round(2).to_string())
+
 if __name__ == "__main__":
-    calculate_bill()
+    parser = argparse.ArgumentParser(description="Neural Network fatura ve teklif analizi")
+    parser.add_argument('--forecast', metavar='YYYY-MM', default=None, help="Bu aydan başlayarak çok aylık tahmin yazdır")
+    parser.add_argument('--months', type=int, default=12, help="--forecast ile kaç ay")
+    parser.add_argument('--batch', metavar='CSV', default=None, help="Müşteri/teklif tablosunu toplu değerlendir")
+    parser.add_argument('--profiles', metavar='CSV', default=None,
+                        help="Saatlik sayaç verisi ile saatlik fatura: uzun (customer, tarih, kwh) veya geniş "
+                             "(tarih + müşteri başına kWh sütunu) format; --forecast ve --months dönemi belirler")
+    parser.add_argument('--risk', metavar='YYYY-MM', default=None, help="Bu ay için Monte Carlo fatura riski (--kwh ve --offer-price ile)")
+    parser.add_argument('--kwh', type=float, nargs=3, metavar=('T1', 'T2', 'T3'), default=None, help="--risk için dilim tüketimleri (kWh)")
+    parser.add_argument('--paths', type=int, default=10_000, help="--risk için senaryo sayısı")
+    parser.add_argument('--seed', type=int, default=42, help="--risk için rastgelelik tohumu")
+    parser.add_argument('--yekdem', type=float, default=250.0, help="--profiles / --risk için YEKDEM (TL/MWh)")
+    parser.add_argument('--margin', type=float, default=5.0, help="--profiles / --risk için marj (%%)")
+    parser.add_argument('--offer-price', type=float, default=None, help="--profiles / --risk için sabit teklif (TL/kWh)")
+    parser.add_argument('--out', metavar='CSV', default=None, help="--batch / --profiles sonuç dosyası")
+    args = parser.parse_args()
+    
+    if args.risk:
+        if args.kwh is None or args.offer_price is None:
+            parser.error("--risk için --kwh T1 T2 T3 ve --offer-price gerekli")
+        print_bill_risk(args.risk, args.kwh, args.offer_price, args.yekdem, args.margin, args.paths, args.seed)
+    elif args.profiles:
+        if not args.forecast:
+            parser.error("--profiles için --forecast YYYY-MM (dönem başlangıcı) gerekli")
+        start = pd.Timestamp(args.forecast)
+        # Geniş format (tarih + müşteri sütunları) matris yoluyla, uzun format parça parça okunur
+        evaluate = evaluate_profile_matrix if is_wide_profile_file(args.profiles) else evaluate_profile_stream
+        results = evaluate(args.profiles, train_neural_model(), start, start + pd.DateOffset(months=args.months),
+                           args.yekdem, args.margin, args.offer_price)
+        out_path = args.out or os.path.splitext(args.profiles)[0] + '_sonuc.csv'
+        results.to_csv(out_path, index=False)
+        print(f"📊 {len(results)} profil hesaplandı -> {out_path}")
+    elif args.batch:
+        results = evaluate_batch(pd.read_csv(args.batch), train_neural_model())
+        out_path = args.out or os.path.splitext(args.batch)[0] + '_sonuc.csv'
+        results.to_csv(out_path, index=False)
+        accepted = int((results['decision'] == 'KABUL ET').sum())
+        print(f"📊 {len(results)} teklif değerlendirildi: {accepted} KABUL, {len(results) - accepted} RED -> {out_path}")
+    elif args.forecast:
+        print_forecast(args.forecast, args.months)
+    else:
+        calculate_bill()
@@ -1,20 +1,174 @@
 import numpy as np
 import random
 import pickle
+import json
 import os
+import struct
+
+# Durum uzayı boyutları (karışık tabanlı / mixed-radix indeks için):
+# saat × envanter × fiyat durumu × trend × kârlılık
+def state_dims(max_inventory=10):
+    return (24, max_inventory + 1, 3, 2, 2)
+
+def encode_state_index(hour, inventory, price_status, trend, is_profitable, max_inventory=10):
+    # Bileşenleri tek bir tam sayı indekse çevirir (get_state_key ile aynı sıra)
+    return (((hour * (max_inventory + 1) + inventory) * 3 + price_status) * 2 + trend) * 2 + is_profitable
+
+def state_key_to_index(state_key, max_inventory=10):
+    # Eski "13_4_1_0_1" anahtarını yoğun tablo indeksine çevirir
+    hour, inventory, price_status, trend, is_profitable = (int(p) for p in state_key.split('_'))
+    if not 0 <= inventory <= max_inventory:
+        raise ValueError(f"Envanter ({inventory}) max_inventory ({max_inventory}) sınırının dışında: {state_key}")
+    return encode_state_index(hour, inventory, price_status, trend, is_profitable, max_inventory)
+
+def index_to_state_key(index, max_inventory=10):
+    parts = []
+    for radix in reversed(state_dims(max_inventory)):
+        index, part = divmod(int(index), radix)
+        parts.append(part)
+    return "_".join(str(p) for p in reversed(parts))
+
+def market_code_base_indices(max_inventory=10):
+    # Piyasa kodu (saat, fiyat durumu, trend) -> envanter=0, kârlılık=0 için yoğun indeks.
+    # Tam indeks = taban + envanter * 12 + kârlılık
+    return [encode_state_index(code // 6, 0, (code // 2) % 3, code % 2, 0, max_inventory) for code in range(24 * 3 * 2)]
+
+def dict_to_dense(q_dict, action_size=3, max_inventory=10):
+    """
+    Eski sözlük tabanlı Q-tablosunu (expert_trader.pkl) yoğun diziye çevirir.
+    Dönüş: (q_table [n_states, action_size], visited [n_states])
+    """
+    n_states = int(np.prod(state_dims(max_inventory)))
+    q_table = np.zeros((n_states, action_size))
+    visited = np.zeros(n_states, dtype=bool)
+    for state_key, values in q_dict.items():
+        idx = state_key_to_index(state_key, max_inventory)
+        q_table[idx] = values
+        visited[idx] = True
+    return q_table, visited
+
+def dense_to_dict(q_table, visited, max_inventory=10):
+    # Yoğun tabloyu eski sözlük formatına geri çevirir (sadece ziyaret edilen durumlar)
+    return {index_to_state_key(idx, max_inventory): q_table[idx].copy() for idx in np.flatnonzero(visited)}
+
+# İkili Q-tablosu dosyası (.qtb):
+#   "EPQT" + uint32 sürüm + uint32 başlık uzunluğu + JSON başlık (64 bayta hizalı)
+#   + q_table (float64, n_states x action_size, C sırası) + visited (uint8, n_states)
+# Diziler ham yazıldığı için dosya kopyalanmadan bellek eşlemeli açılır (süreçler arası salt okunur paylaşım).
+BRAIN_MAGIC = b'EPQT'
+BRAIN_FORMAT_VERSION = 1
+BRAIN_EXTENSION = '.qtb'
+_BRAIN_PREFIX = struct.Struct('<4sII')
+_BRAIN_ALIGN = 64
+
+def state_encoding_spec(max_inventory=10):
+    # Durum indeksinin nasıl üretildiği (farklı kodlamayla eğitilmiş tabloyu yanlış okumamak için)
+    return {
+        'components': ['hour', 'inventory', 'price_status', 'trend', 'is_profitable'],
+        'dims': list(state_dims(max_inventory)),
+        'price_ratio_thresholds': [0.90, 1.10],
+        'max_inventory': max_inventory,
+    }
+
+def write_qtable(filepath, q_table, visited, max_inventory=10, hyperparameters=None):
+    """
+    Yoğun Q-tablosunu sürümlü ikili biçimde yazar (geçici dosya + os.replace: okuyucular
+    yarım dosya görmez, açık bellek eşlemeleri eski dosyada kalır).
+    """
+    q_table = np.ascontiguousarray(q_table, dtype=np.float64)
+    visited = np.ascontiguousarray(visited, dtype=np.uint8)
+    header = {
+        'format_version': BRAIN_FORMAT_VERSION,
+        'state_encoding': state_encoding_spec(max_inventory),
+        'actions': ['HOLD', 'BUY', 'SELL'][:q_table.shape[1]],
+        'shape': list(q_table.shape),
+        'hyperparameters': hyperparameters or {},
+    }
+    # Dizilerin başlangıcı hizalı olsun diye başlık boşlukla doldurulur
+    header_bytes = json.dumps(header).encode()
+    data_offset = -(-(_BRAIN_PREFIX.size + len(header_bytes)) // _BRAIN_ALIGN) * _BRAIN_ALIGN
+    header_bytes = header_bytes.ljust(data_offset - _BRAIN_PREFIX.size, b' ')
+
+    os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+    tmp_path = filepath + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_BRAIN_PREFIX.pack(BRAIN_MAGIC, BRAIN_FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(q_table.tobytes())
+        f.write(visited.tobytes())
+    os.replace(tmp_path, filepath)
+
+def is_qtable_file(filepath):
+    with open(filepath, 'rb') as f:
+        return f.read(len(BRAIN_MAGIC)) == BRAIN_MAGIC
+
+def require_qtable_file(filepath):
+    # Yükleyiciler sadece .qtb açar: model dosyası yüklenirken pickle ile kod çalıştırılmaz
+    if not is_qtable_file(filepath):
+        raise ValueError(f"Q-tablosu dosyası değil: {filepath}. Eski .pkl beyinleri önce çevirin: "
+                         f"python src/agent.py {filepath}")
+
+def read_qtable(filepath, mmap=True, copy_on_write=False):
+    """
+    İkili Q-tablosunu okur. mmap=True ise diziler salt okunur bellek eşlemesidir
+    (tablo boyutundan bağımsız sabit sürede açılır, sayfalar süreçler arasında paylaşılır).
+    copy_on_write=True ile eşleme yazılabilir olur ama değişiklikler dosyaya gitmez: sadece
+    yazılan sayfalar sürece özel kopyalanır, gerisi paylaşılmaya devam eder.
+    Dönüş: (q_table, visited (bool), header)
+    """
+    with open(filepath, 'rb') as f:
+        magic, version, header_len = _BRAIN_PREFIX.unpack(f.read(_BRAIN_PREFIX.size))
+        if magic != BRAIN_MAGIC:
+            raise ValueError(f"Q-tablosu dosyası değil: {filepath}")
+        if version != BRAIN_FORMAT_VERSION:
+            raise ValueError(f"Desteklenmeyen Q-tablosu sürümü {version}: {filepath}")
+        header = json.loads(f.read(header_len))
+    n_states, action_size = header['shape']
+    q_offset = _BRAIN_PREFIX.size + header_len
+    visited_offset = q_offset + n_states * action_size * 8
+    if mmap:
+        mode = 'c' if copy_on_write else 'r'
+        q_table = np.memmap(filepath, dtype=np.float64, mode=mode, offset=q_offset, shape=(n_states, action_size))
+        visited = np.memmap(filepath, dtype=np.bool_, mode=mode, offset=visited_offset, shape=(n_states,))
+    else:
+        with open(filepath, 'rb') as f:
+            f.seek(q_offset)
+            q_table = np.fromfile(f, dtype=np.float64, count=n_states * action_size).reshape(n_states, action_size)
+            visited = np.fromfile(f, dtype=np.uint8, count=n_states).astype(bool)
+    return q_table, visited, header
+
+def import_pickle_brain(pkl_path, out_path=None, action_size=3, max_inventory=10):
+    # Eski sözlük tabanlı .pkl beyni ikili biçime çevirir (pickle sadece bu tek seferlik dönüşümde açılır)
+    with open(pkl_path, 'rb') as f:
+        q_dict = pickle.load(f)
+    q_table, visited = dict_to_dense(q_dict, action_size, max_inventory)
+    out_path = out_path or os.path.splitext(pkl_path)[0] + BRAIN_EXTENSION
+    write_qtable(out_path, q_table, visited, max_inventory)
+    return out_path
 
 class QLearningAgent:
-    def __init__(self, action_size=3, learning_rate=0.1, discount_rate=0.99, epsilon=1.0, epsilon_decay=0.995, epsilon_min=0.01):
+    def __init__(self, action_size=3, learning_rate=0.1, discount_rate=0.99, epsilon=1.0, epsilon_decay=0.995, epsilon_min=0.01, dense=False, max_inventory=10):
         self.action_size = action_size 
         self.lr = learning_rate 
         self.gamma = discount_rate 
         self.epsilon = epsilon 
         self.epsilon_decay = epsilon_decay 
         self.epsilon_min = epsilon_min
-        self.q_table = {} 
+        self.max_inventory = max_inventory
+        
+        # Yoğun mod: Q-değerleri tek bir float64[n_states, action_size] dizisinde tutulur.
+        # Sözlük modundaki "hiç görülmedi" bilgisini korumak için ayrıca visited dizisi tutulur.
+        self.dense = dense
+        self.n_states = int(np.prod(state_dims(max_inventory)))
+        self._market_base = market_code_base_indices(max_inventory)
+        if dense:
+            self.q_table = np.zeros((self.n_states, action_size))
+            self.visited = np.zeros(self.n_states, dtype=bool)
+        else:
+            self.q_table = {} 
 
-    def get_state_key(self, state):
-        # State içinden önemli bilgileri alıp bir anahtar oluşturur
+    def get_state_components(self, state):
+        # State içinden önemli bilgileri alır
         hour = int(state[1])
         inventory = int(state[5])
         
@@ -32,18 +186,45 @@ class QLearningAgent:
         # Kârlılık (Maliyetin üstünde miyiz?)
         is_profitable = int(state[8])
 
+        return hour, inventory, price_status, trend, is_profitable
+
+    def get_state_key(self, state):
+        # Sözlük modu için metin anahtar (Örn: "13_4_1_0_1")
+        hour, inventory, price_status, trend, is_profitable = self.get_state_components(state)
         return f"{hour}_{inventory}_{price_status}_{trend}_{is_profitable}"
 
+    def get_state_index(self, state):
+        # Yoğun mod için tam sayı indeks
+        # Ortam önceden hesaplanmış piyasa kodunu veriyorsa float'ları yeniden gruplama
+        # (tek tolist: NumPy skalerlerini tek tek okumaktan ucuz)
+        values = state.tolist() if isinstance(state, np.ndarray) else state
+        if len(values) > 9 and values[9] >= 0:
+            return self._market_base[int(values[9])] + int(values[5]) * 12 + int(values[8])
+        hour, inventory, price_status, trend, is_profitable = self.get_state_components(state)
+        return encode_state_index(hour, inventory, price_status, trend, is_profitable, self.max_inventory)
+
     def act(self, state):
-        if np.random.rand() <= self.epsilon:
+        # Adım başına çağrılır: 3 elemanlı satırlarda np.random/np.argmax çağrı maliyeti işin kendisinden büyük
+        if random.random() <= self.epsilon:
             return random.randrange(self.action_size)
         
+        if self.dense:
+            state_idx = self.get_state_index(state)
+            if not self.visited[state_idx]:
+                return random.randrange(self.action_size)
+            row = self.q_table[state_idx].tolist()
+            return row.index(max(row)) # np.argmax ile aynı: eşitlikte ilk aksiyon
+        
         state_key = self.get_state_key(state)
         if state_key not in self.q_table:
             return random.randrange(self.action_size)
         return np.argmax(self.q_table[state_key])
 
     def learn(self, state, action, reward, next_state, done):
+        if self.dense:
+            self._learn_dense(state, action, reward, next_state)
+            return
+        
         state_key = self.get_state_key(state)
         next_state_key = self.get_state_key(next_state)
         
@@ -58,17 +239,188 @@ class QLearningAgent:
         if self.epsilon > self.epsilon_min:
             self.epsilon *= self.epsilon_decay
 
+    def _learn_dense(self, state, action, reward, next_state):
+        state_idx = self.get_state_index(state)
+        next_state_idx = self.get_state_index(next_state)
+        self.visited[state_idx] = True
+        self.visited[next_state_idx] = True
+        
+        q = self.q_table
+        target = reward + self.gamma * max(q[next_state_idx].tolist())
+        q[state_idx, action] += self.lr * (target - q[state_idx, action])
+        
+        if self.epsilon > self.epsilon_min:
+            self.epsilon *= self.epsilon_decay
+
+    def end_episode(self):
+        # Tur sonu kancası (online öğrenmede yapılacak bir şey yok)
+        pass
+
+    def hyperparameters(self):
+        return {
+            'learning_rate': self.lr,
+            'discount_rate': self.gamma,
+            'epsilon': self.epsilon,
+            'epsilon_decay': self.epsilon_decay,
+            'epsilon_min': self.epsilon_min,
+        }
+
     def save_brain(self, filepath):
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        with open(filepath, 'wb') as f:
-            pickle.dump(self.q_table, f)
+        if filepath.endswith(BRAIN_EXTENSION):
+            # İkili biçim (.qtb): sözlük modu önce yoğun tabloya çevrilir
+            q_table, visited = (self.q_table, self.visited) if self.dense else \
+                dict_to_dense(self.q_table, self.action_size, self.max_inventory)
+            write_qtable(filepath, q_table, visited, self.max_inventory, self.hyperparameters())
+        else:
+            # Eski sözlük formatı (.pkl); yoğun mod da bu formatta kaydedilebilir
+            q_table = dense_to_dict(self.q_table, self.visited, self.max_inventory) if self.dense else self.q_table
+            with open(filepath, 'wb') as f:
+                pickle.dump(q_table, f)
         print(f"🧠 Beyin kaydedildi: {filepath}")
 
     def load_brain(self, filepath):
+        """
+        .qtb beynini yükler (biçim uzantıdan değil dosya imzasından anlaşılır; eski .pkl
+        dosyaları reddedilir, import_pickle_brain ile bir kez çevrilmelidir).
+        Yoğun modda .qtb tablosu kopyalanmaz, yazarken-kopyala (mode='c') bellek eşlemesiyle
+        açılır: yükleme tablo boyutundan bağımsızdır, okunmayan sayfalar diske dokunmaz ve
+        ajanın sonraki güncellemeleri dosyayı değiştirmez (kalıcı olması için save_brain gerekir).
+        """
         if os.path.exists(filepath):
-            with open(filepath, 'rb') as f:
-                self.q_table = pickle.load(f)
+            require_qtable_file(filepath)
+            q_table, visited, header = read_qtable(filepath, copy_on_write=True)
+            if header['state_encoding'] != state_encoding_spec(self.max_inventory):
+                raise ValueError(f"Q-tablosu farklı durum kodlamasıyla kaydedilmiş: {header['state_encoding']}")
+            if self.dense:
+                self.q_table, self.visited = q_table, visited
+            else:
+                self.q_table = dense_to_dict(q_table, visited, self.max_inventory)
             self.epsilon = self.epsilon_min
             print(f"🧠 Beyin yüklendi: {filepath}")
         else:
-            print("⚠️ Beyin bulunamadı!")
\ No newline at end of file
+            print("⚠️ Beyin bulunamadı!")
+
+
+class BatchQLearningAgent(QLearningAgent):
+    """
+    Geçişleri (durum indeksi, aksiyon, ödül, sonraki durum indeksi) halka
+    tampon dizilerine kaydeder ve TD güncellemelerini toplu uygular.
+    Her zaman yoğun (dense) Q-tablosu kullanır.
+
+    update_mode:
+        'exact'   -> Sıralı TD ile BİREBİR aynı: geçişler kayıt sırasıyla tek tek uygulanır ve act(),
+                     bekleyen güncellemesi olan bir durumu okumadan önce tamponu boşaltır. Aynı seed ile
+                     QLearningAgent(dense=True) ile aynı yörüngeyi ve aynı Q-tablosunu üretir.
+                     Doğrulama/referans modudur; sık boşaltma yüzünden online öğrenmeden hızlı DEĞİLDİR.
+        'batched' -> Tampon tek seferde, tablonun boşaltma anındaki haline göre güncellenir; act() tampon
+                     boşaltılana kadar eski tabloyu görür. Aynı (durum, aksiyon) k kez geçiyorsa ortalama
+                     hedefe 1-(1-lr)^k adım atılır (hedefler eşitse sıralı güncellemeyle aynı sonuç).
+                     Yaklaşıktır (sıralı TD'den sapar) ama hızlıdır.
+    epsilon_schedule:
+        'step'    -> Her learn çağrısında azalır (QLearningAgent ile aynı)
+        'episode' -> Her end_episode çağrısında bir kez azalır
+    """
+    def __init__(self, action_size=3, learning_rate=0.1, discount_rate=0.99, epsilon=1.0, epsilon_decay=0.995, epsilon_min=0.01,
+                 max_inventory=10, batch_size=4096, update_mode='batched', epsilon_schedule='step'):
+        super().__init__(action_size, learning_rate, discount_rate, epsilon, epsilon_decay, epsilon_min,
+                         dense=True, max_inventory=max_inventory)
+        if update_mode not in ('exact', 'batched'):
+            raise ValueError(f"Bilinmeyen update_mode: {update_mode}")
+        if epsilon_schedule not in ('step', 'episode'):
+            raise ValueError(f"Bilinmeyen epsilon_schedule: {epsilon_schedule}")
+        self.batch_size = batch_size
+        self.update_mode = update_mode
+        self.epsilon_schedule = epsilon_schedule
+        
+        # Halka tampon
+        self._states = np.zeros(batch_size, dtype=np.int64)
+        self._actions = np.zeros(batch_size, dtype=np.int64)
+        self._rewards = np.zeros(batch_size)
+        self._next_states = np.zeros(batch_size, dtype=np.int64)
+        self._pos = 0
+        # 'exact': tamponda güncellemesi bekleyen durumlar (act okumadan önce boşaltılır)
+        self._pending = np.zeros(self.n_states, dtype=bool) if update_mode == 'exact' else None
+
+    def act(self, state):
+        if self._pending is not None and self._pos and self._pending[self.get_state_index(state)]:
+            self.flush()
+        return super().act(state)
+
+    def learn(self, state, action, reward, next_state, done):
+        state_idx = self.get_state_index(state)
+        next_state_idx = self.get_state_index(next_state)
+        # "Hiç görülmedi" bilgisi act() için hemen güncellenir
+        self.visited[state_idx] = True
+        self.visited[next_state_idx] = True
+        
+        pos = self._pos
+        self._states[pos] = state_idx
+        self._actions[pos] = action
+        self._rewards[pos] = reward
+        self._next_states[pos] = next_state_idx
+        self._pos = pos + 1
+        if self._pending is not None:
+            self._pending[state_idx] = True
+        if self._pos == self.batch_size:
+            self.flush()
+        
+        if self.epsilon_schedule == 'step' and self.epsilon > self.epsilon_min:
+            self.epsilon *= self.epsilon_decay
+
+    def flush(self):
+        # Tampondaki geçişleri Q-tablosuna uygula
+        n = self._pos
+        if n == 0:
+            return
+        states = self._states[:n]
+        actions = self._actions[:n]
+        rewards = self._rewards[:n]
+        next_states = self._next_states[:n]
+        
+        if self.update_mode == 'exact':
+            self._apply_sequential(states, actions, rewards, next_states)
+            self._pending[states] = False
+        else:
+            self._apply_batched(states, actions, rewards, next_states)
+        self._pos = 0
+
+    def _apply_sequential(self, states, actions, rewards, next_states):
+        q = self.q_table
+        lr, gamma = self.lr, self.gamma
+        for s, a, r, ns in zip(states.tolist(), actions.tolist(), rewards.tolist(), next_states.tolist()):
+            target = r + gamma * max(q[ns].tolist())
+            q[s, a] += lr * (target - q[s, a])
+
+    def _apply_batched(self, states, actions, rewards, next_states):
+        q = self.q_table
+        flat_q = q.reshape(-1)
+        targets = rewards + self.gamma * q[next_states].max(axis=1)
+        
+        # Aynı (durum, aksiyon) çiftlerini scatter-add ile topla
+        flat_idx = states * self.action_size + actions
+        counts = np.bincount(flat_idx, minlength=flat_q.size)
+        sums = np.bincount(flat_idx, weights=targets, minlength=flat_q.size)
+        hit = np.flatnonzero(counts)
+        mean_target = sums[hit] / counts[hit]
+        step = 1.0 - (1.0 - self.lr) ** counts[hit]
+        flat_q[hit] += step * (mean_target - flat_q[hit])
+
+    def end_episode(self):
+        self.flush()
+        if self.epsilon_schedule == 'episode' and self.epsilon > self.epsilon_min:
+            self.epsilon *= self.epsilon_decay
+
+    def save_brain(self, filepath):
+        self.flush()
+        super().save_brain(filepath)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Eski .pkl beyinlerini ikili Q-tablosu biçimine (.qtb) çevirir")
+    parser.add_argument('pkl', nargs='+', help="Çevrilecek .pkl dosyaları")
+    parser.add_argument('--max-inventory', type=int, default=10)
+    args = parser.parse_args()
+    for path in args.pkl:
+        print(f"✅ {path} -> {import_pickle_brain(path, max_inventory=args.max_inventory)}")
@@ -0,0 +1,209 @@
+import sys
+import os
+import time
+import random
+import argparse
+import numpy as np
+import pandas as pd
+from multiprocessing import Pool, cpu_count
+
+# Yolları ayarla
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(current_dir)
+
+try:
+    from market_env import EnergyMarketEnv, market_arrays
+    from agent import QLearningAgent, market_code_base_indices
+    from train_bot import load_training_data
+    from parallel_train import run_episodes
+    from oracle import solve, HOLD, BUY, SELL
+except ImportError:
+    from src.market_env import EnergyMarketEnv, market_arrays
+    from src.agent import QLearningAgent, market_code_base_indices
+    from src.train_bot import load_training_data
+    from src.parallel_train import run_episodes
+    from src.oracle import solve, HOLD, BUY, SELL
+
+def walk_forward_folds(n_rows, train_hours=15000, test_hours=4380, step_hours=None):
+    """
+    Kayan pencere (walk-forward) katları: [train_start, train_end) eğitim, [train_end, test_end) test.
+    Eğitim penceresi sabit boyutta kayar; test pencereleri (step_hours = test_hours iken) üst üste binmez.
+    """
+    step_hours = step_hours or test_hours
+    folds = []
+    train_start = 0
+    while train_start + train_hours + 2 <= n_rows:
+        train_end = train_start + train_hours
+        test_end = min(train_end + test_hours, n_rows)
+        folds.append((train_start, train_end, test_end))
+        if test_end == n_rows:
+            break
+        train_start += step_hours
+    return folds
+
+def greedy_policy(agent):
+    # Durum indeksi -> açgözlü aksiyon. Hiç ziyaret edilmemiş durumda BEKLE (rastgele değil: test tekrarlanabilir olsun)
+    return np.where(agent.visited, agent.q_table.argmax(axis=1), HOLD)
+
+def greedy_replay(ptf, market_code, policy, initial_balance=10000, max_inventory=10):
+    """
+    Açgözlü politikayı EnergyMarketEnv.step kurallarıyla, önceden hesaplanmış dizilerden oynatır
+    (ortam/ajan nesnesi ve gözlem dizisi yok; bir yıllık veri milisaniyeler içinde biter).
+    Dönüş: (net değer serisi, işlem sayısı)
+    """
+    prices = np.asarray(ptf, dtype=np.float64).tolist()
+    base = market_code_base_indices(max_inventory)
+    codes = np.asarray(market_code).astype(np.int64)
+    # Göstergesiz çerçevede market_code -1'dir: base[-1] sessizce 23. saatin durumlarını okurdu
+    bad = np.flatnonzero((codes[:len(prices) - 1] < 0) | (codes[:len(prices) - 1] >= len(base)))
+    if len(bad):
+        raise ValueError(f"Geçersiz market_code {int(codes[bad[0]])} (adım {int(bad[0])}): "
+                         f"veri önce add_technical_indicators (compute_market_codes) ile hazırlanmalı")
+    codes = codes.tolist()
+    actions = np.asarray(policy).tolist()
+
+    n_steps = len(prices) - 1
+    net_worth = [0.0] * n_steps
+    balance = initial_balance
+    inventory = 0
+    avg_buy_price = 0
+    trades = 0
+    for t in range(n_steps):
+        price = prices[t]
+        profitable = 1 if inventory > 0 and price > avg_buy_price else 0
+        action = actions[base[codes[t]] + inventory * 12 + profitable]
+        if action == BUY and inventory < max_inventory and balance >= price:
+            balance -= price
+            avg_buy_price = (inventory * avg_buy_price + price) / (inventory + 1)
+            inventory += 1
+            trades += 1
+        elif action == SELL and inventory > 0:
+            balance += price
+            inventory -= 1
+            trades += 1
+            if inventory == 0:
+                avg_buy_price = 0
+        net_worth[t] = balance + inventory * price
+    return np.array(net_worth), trades
+
+def max_drawdown(net_worth):
+    # En yüksek noktadan en büyük göreli düşüş (0.25 = %25)
+    if len(net_worth) == 0:
+        return 0.0
+    peak = np.maximum.accumulate(net_worth)
+    return float(np.max((peak - net_worth) / peak))
+
+def buy_and_hold(ptf, initial_balance=10000, max_inventory=10):
+    """
+    Aynı kurallarla al-tut: ilk saatte kasanın yettiği kadar (en fazla max_inventory) birim alınır,
+    ortamın net değeri son aksiyon saatinin fiyatıyla hesapladığı için o fiyattan değerlenir.
+    Dönüş: net değer serisi
+    """
+    prices = np.asarray(ptf, dtype=np.float64)[:-1]
+    units = int(min(max_inventory, initial_balance // prices[0])) if prices[0] > 0 else max_inventory
+    return initial_balance - units * prices[0] + units * prices
+
+# İşçi süreç durumu: tüm geçmişin dizileri (initializer ile bir kez gönderilir)
+_worker = {}
+
+def _init_worker(arrays):
+    _worker['arrays'] = arrays
+
+def _run_fold(args):
+    fold_id, (train_start, train_end, test_end), episodes, seed, max_inventory, initial_balance = args
+    np.random.seed(seed)
+    random.seed(seed)
+    arrays = _worker['arrays']
+
+    # 1. Eğitim (sadece eğitim penceresi)
+    train = {name: values[train_start:train_end] for name, values in arrays.items()}
+    env = EnergyMarketEnv(None, initial_balance=initial_balance, max_inventory=max_inventory, arrays=train)
+    agent = QLearningAgent(dense=True, max_inventory=max_inventory)
+    start_time = time.perf_counter()
+    _, scores = run_episodes(agent, env, episodes)
+    train_seconds = time.perf_counter() - start_time
+
+    # 2. Örneklem dışı açgözlü test
+    ptf = arrays['ptf'][train_end:test_end]
+    start_time = time.perf_counter()
+    net_worth, trades = greedy_replay(ptf, arrays['market_code'][train_end:test_end], greedy_policy(agent),
+                                      initial_balance, max_inventory)
+    eval_ms = (time.perf_counter() - start_time) * 1000
+    baseline = buy_and_hold(ptf, initial_balance, max_inventory)
+    _, oracle_net_worth = solve(ptf, initial_balance, max_inventory)
+
+    return {
+        'fold': fold_id,
+        'train_hours': train_end - train_start,
+        'test_hours': test_end - train_end,
+        'in_sample_net_worth': float(scores[-1]),
+        'net_worth': float(net_worth[-1]),
+        'trades': trades,
+        'max_drawdown': max_drawdown(net_worth),
+        'buy_hold_net_worth': float(baseline[-1]),
+        'buy_hold_drawdown': max_drawdown(baseline),
+        'oracle_net_worth': float(oracle_net_worth),
+        'states_visited': int(agent.visited.sum()),
+        'train_seconds': train_seconds,
+        'eval_ms': eval_ms,
+    }
+
+def run_backtest(df, train_hours=15000, test_hours=4380, step_hours=None, episodes=100, workers=None,
+                 max_inventory=10, initial_balance=10000, seed=42):
+    """
+    Tüm geçmiş üzerinde walk-forward backtest. Her kat ayrı bir işçi süreçte eğitilir ve
+    kendi test penceresinde epsilon=0 ile değerlendirilir.
+    Dönüş: Kat başına bir satır (DataFrame)
+    """
+    df = df.reset_index(drop=True)
+    folds = walk_forward_folds(len(df), train_hours, test_hours, step_hours)
+    if not folds:
+        raise ValueError(f"Veri ({len(df)} saat) tek bir kat için bile yetersiz!")
+    arrays = market_arrays(df)
+    dates = df['tarih']
+    tasks = [(i, fold, episodes, seed + i, max_inventory, initial_balance) for i, fold in enumerate(folds)]
+
+    rows = []
+    with Pool(min(workers or cpu_count(), len(folds)), initializer=_init_worker, initargs=(arrays,)) as pool:
+        for row in pool.imap_unordered(_run_fold, tasks):
+            _, train_end, test_end = folds[row['fold']]
+            row['test_start'] = dates.iloc[train_end]
+            row['test_end'] = dates.iloc[test_end - 1]
+            rows.append(row)
+            print(f"  ✅ Kat {row['fold']}: {row['test_start']:%Y-%m-%d} - {row['test_end']:%Y-%m-%d} | "
+                  f"Ajan {row['net_worth']:.0f} TL, Al-Tut {row['buy_hold_net_worth']:.0f} TL, "
+                  f"{row['trades']} işlem, düşüş %{row['max_drawdown'] * 100:.1f} ({row['eval_ms']:.1f} ms)")
+
+    results = pd.DataFrame(rows).sort_values('fold').reset_index(drop=True)
+    results['beats_buy_hold'] = results['net_worth'] > results['buy_hold_net_worth']
+    columns = ['fold', 'test_start', 'test_end'] + [c for c in results.columns if c not in ('fold', 'test_start', 'test_end')]
+    return results[columns]
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward (kayan pencere) backtest")
+    parser.add_argument('--train-hours', type=int, default=15000)
+    parser.add_argument('--test-hours', type=int, default=4380, help="Test penceresi (varsayılan: ~6 ay)")
+    parser.add_argument('--step-hours', type=int, default=None, help="Katlar arası kayma (varsayılan: test penceresi)")
+    parser.add_argument('--episodes', type=int, default=100, help="Kat başına eğitim turu")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-inventory', type=int, default=10)
+    parser.add_argument('--out', default=os.path.join(parent_dir, 'models', 'backtest_results.csv'))
+    args = parser.parse_args()
+
+    df = load_training_data(tail=None)
+    if df is None:
+        return
+    print(f"🧪 BACKTEST: {df['tarih'].min()} - {df['tarih'].max()} ({len(df)} saat)")
+    results = run_backtest(df, args.train_hours, args.test_hours, args.step_hours, args.episodes,
+                           args.workers, args.max_inventory)
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    results.to_csv(args.out, index=False)
+    print(f"\n📊 Sonuçlar kaydedildi: {args.out}")
+    print(results[['fold', 'test_start', 'net_worth', 'buy_hold_net_worth', 'oracle_net_worth',
+                   'trades', 'max_drawdown']].to_string(index=False, float_format='{:.3f}'.format))
+    print(f"\n🏁 Ajan {int(results['beats_buy_hold'].sum())}/{len(results)} katta al-tut stratejisini geçti.")
+
+if __name__ == "__main__":
+    main()
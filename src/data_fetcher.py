@@ -0,0 +1,295 @@
+import sys
+import os
+import json
+import random
+import asyncio
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+# Yolları ayarla
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(current_dir)
+
+try:
+    from preprocessor import load_arrays, append_store, CSV_PATH, STORE_DIR
+except ImportError:
+    from src.preprocessor import load_arrays, append_store, CSV_PATH, STORE_DIR
+
+# EPİAŞ Şeffaflık Platformu - Gün Öncesi Piyasası PTF (MCP) servisi
+EPIAS_PTF_URL = 'https://seffaflik.epias.com.tr/electricity-service/v1/markets/dam/data/mcp'
+# Platform saatleri Türkiye saatiyle (sabit UTC+3) verir; depo saatleri yerel ve zaman dilimsizdir
+EPIAS_UTC_OFFSET = '+03:00'
+HOUR = pd.Timedelta(hours=1)
+
+def missing_ranges(tarih, start, end):
+    """
+    [start, end) aralığında depoda olmayan saatleri ardışık [başlangıç, bitiş) aralıklarına gruplar.
+    tarih: Depodaki saatler (sıralı datetime64 dizisi)
+    """
+    expected = pd.date_range(pd.Timestamp(start).floor('h'), pd.Timestamp(end), freq='h', inclusive='left')
+    if len(expected) == 0:
+        return []
+    expected = expected.to_numpy(dtype='datetime64[ns]')
+    missing = expected[~np.isin(expected, np.asarray(tarih, dtype='datetime64[ns]'))]
+    if len(missing) == 0:
+        return []
+    # Ardışık olmayan saatlerde yeni aralık başlar
+    breaks = np.flatnonzero(np.diff(missing) != np.timedelta64(1, 'h')) + 1
+    starts = np.concatenate(([0], breaks))
+    ends = np.concatenate((breaks, [len(missing)]))
+    return [(pd.Timestamp(missing[s]), pd.Timestamp(missing[e - 1]) + HOUR) for s, e in zip(starts, ends)]
+
+def chunk_ranges(ranges, chunk_days=30):
+    # Uzun aralıkları en fazla chunk_days günlük parçalara böler (her parça tek istek)
+    chunks = []
+    step = pd.Timedelta(days=chunk_days)
+    for start, end in ranges:
+        while start < end:
+            chunks.append((start, min(start + step, end)))
+            start += step
+    return chunks
+
+def source_file_path(start, end, data_dir):
+    # İndirilen parçanın ETL kaynak dosyası (fix_merge.py diğer dışa aktarımlar gibi okur)
+    return os.path.join(data_dir, f"ptf_api_{start:%Y%m%d%H}_{end:%Y%m%d%H}.csv")
+
+def save_source_file(start, end, tarih, ptf, data_dir):
+    """
+    Çekilen parçayı veri klasörüne kaynak dosya olarak yazar. Böylece fix_merge.py kaynaklardan
+    birleşik veriyi yeniden kurduğunda indirilen saatler kaybolmaz.
+    Dönüş: dosya yolu
+    """
+    path = source_file_path(start, end, data_dir)
+    tmp_path = path + '.tmp'
+    os.makedirs(data_dir, exist_ok=True)
+    pd.DataFrame({'tarih': tarih, 'ptf': ptf}).to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+class PTFFetcher:
+    """
+    EPİAŞ PTF servisinden asyncio ile paralel veri çeker.
+
+    - Tek bir requests.Session (bağlantı havuzu) tüm istekler için paylaşılır;
+      istekler concurrency kadar iş parçacığında çalışır, asyncio.Semaphore eşzamanlılığı sınırlar.
+    - Bağlantı hatası, 429 ve 5xx cevaplarında üssel geri çekilme (+ rastgele sapma) ile tekrar dener.
+    tgt: Platformun kimlik doğrulama bileti (TGT), verilmezse EPIAS_TGT ortam değişkeni kullanılır.
+    """
+    def __init__(self, base_url=EPIAS_PTF_URL, concurrency=4, max_retries=5, backoff=0.5, timeout=30, tgt=None):
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        tgt = tgt or os.environ.get('EPIAS_TGT')
+        if tgt:
+            self.session.headers['TGT'] = tgt
+        self._executor = ThreadPoolExecutor(max_workers=concurrency)
+        self.requests_sent = 0
+        self.retries = 0
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+    def _post(self, payload):
+        # İş parçacığında çalışır (requests senkron); sayaçlara burada dokunulmaz
+        response = self.session.post(self.base_url, json=payload, timeout=self.timeout)
+        if response.status_code == 429 or response.status_code >= 500:
+            raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
+        response.raise_for_status()
+        return response.json()
+
+    async def fetch_range(self, start, end, semaphore):
+        """
+        [start, end) aralığının saatlik PTF'sini çeker. Platform gün bazında sorgulanır,
+        dönen saatler aralığa göre süzülür.
+        Dönüş: (tarih dizisi, ptf dizisi)
+        """
+        payload = {
+            'startDate': pd.Timestamp(start).normalize().strftime('%Y-%m-%dT%H:%M:%S') + EPIAS_UTC_OFFSET,
+            'endDate': (pd.Timestamp(end) - HOUR).normalize().strftime('%Y-%m-%dT%H:%M:%S') + EPIAS_UTC_OFFSET,
+        }
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with semaphore:
+                    # Sayaçlar olay döngüsü tarafında artırılır (iş parçacıkları arası yarış yok)
+                    self.requests_sent += 1
+                    body = await loop.run_in_executor(self._executor, self._post, payload)
+                break
+            except requests.HTTPError as e:
+                # 4xx (429 hariç) kalıcı hatadır, tekrar denenmez
+                status = e.response.status_code if e.response is not None else None
+                if status is not None and status < 500 and status != 429:
+                    raise
+                error = e
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            if attempt == self.max_retries:
+                raise error
+            self.retries += 1
+            await asyncio.sleep(self.backoff * 2 ** attempt * (1 + random.random()))
+
+        items = body.get('items', [])
+        if not items:
+            return np.empty(0, dtype='datetime64[ns]'), np.empty(0)
+        # "2024-01-01T00:00:00+03:00" -> yerel saat (zaman dilimsiz)
+        tarih = pd.to_datetime([item['date'] for item in items]).tz_localize(None).to_numpy(dtype='datetime64[ns]')
+        ptf = np.array([item['price'] for item in items], dtype=np.float64)
+        in_range = (tarih >= np.datetime64(pd.Timestamp(start))) & (tarih < np.datetime64(pd.Timestamp(end)))
+        return tarih[in_range], ptf[in_range]
+
+    async def fetch_ranges(self, ranges, on_chunk=None):
+        """
+        Aralıkları paralel çeker. on_chunk(start, end, tarih, ptf) her parça bittiğinde
+        (bitiş sırasıyla) çağrılır; böylece sonuçlar beklemeden depoya eklenebilir.
+        Dönüş: [(start, end, tarih, ptf veya hata)]
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(start, end):
+            try:
+                tarih, ptf = await self.fetch_range(start, end, semaphore)
+            except Exception as e:
+                return start, end, e
+            if on_chunk is not None:
+                on_chunk(start, end, tarih, ptf)
+            return start, end, (tarih, ptf)
+
+        return [await task for task in asyncio.as_completed([run(s, e) for s, e in ranges])]
+
+def fetch_missing(start, end=None, csv_path=CSV_PATH, store_dir=STORE_DIR, base_url=EPIAS_PTF_URL,
+                  concurrency=4, chunk_days=30, max_retries=5, backoff=0.5):
+    """
+    Depoda [start, end) aralığında eksik olan saatleri bulur, sadece onları indirir ve her
+    parça geldikçe depoya (ve merged_data.csv'ye) ekler. Her parça ayrıca merged_data.csv'nin
+    klasörüne ptf_api_<başlangıç>_<bitiş>.csv olarak kaydedilir (ETL'in kaynak dosyası olur).
+    end verilmezse yarının sonu (gün öncesi fiyatları yayımlanmışsa onlar da alınır).
+    Dönüş: (eklenen satır sayısı, başarısız aralıklar)
+    """
+    end = pd.Timestamp(end) if end is not None else pd.Timestamp.now().normalize() + pd.Timedelta(days=2)
+    try:
+        tarih = np.array(load_arrays(csv_path, store_dir)['tarih'])
+    except FileNotFoundError:
+        tarih = np.empty(0, dtype='datetime64[ns]')
+
+    gaps = missing_ranges(tarih, start, end)
+    chunks = chunk_ranges(gaps, chunk_days)
+    print(f"🕳️  {len(gaps)} eksik aralık ({sum((e - s) // HOUR for s, e in gaps)} saat) -> {len(chunks)} istek")
+    if not chunks:
+        return 0, []
+
+    added = 0
+    def on_chunk(chunk_start, chunk_end, tarih, ptf):
+        # Olay döngüsü tek iş parçacıklı: depo yazımları sıralı olur
+        nonlocal added
+        if len(tarih):
+            save_source_file(chunk_start, chunk_end, tarih, ptf, os.path.dirname(os.path.abspath(csv_path)))
+        count = append_store(tarih, ptf, csv_path, store_dir) if len(tarih) else 0
+        added += count
+        print(f"  ✅ {chunk_start} - {chunk_end}: {count} saat eklendi")
+
+    fetcher = PTFFetcher(base_url, concurrency, max_retries, backoff)
+    try:
+        results = asyncio.run(fetcher.fetch_ranges(chunks, on_chunk))
+    finally:
+        fetcher.close()
+
+    failed = [(s, e, str(r)) for s, e, r in results if isinstance(r, Exception)]
+    for s, e, error in failed:
+        print(f"  ⚠️ {s} - {e}: {error}")
+    print(f"📥 {fetcher.requests_sent} istek ({fetcher.retries} tekrar), {added} saat eklendi")
+    return added, failed
+
+# --- Yerel test sunucusu (platformun PTF servisini taklit eder) ---
+
+def make_stub_handler(df, fail_every=0):
+    """
+    df (tarih, ptf) verisinden platform biçiminde cevap veren istek işleyicisi.
+    fail_every > 0 ise her fail_every'inci istek 503 döner (tekrar deneme testi için).
+    Gelen istek sayısı StubHandler.state['count'] ile okunabilir.
+    """
+    tarih = df['tarih'].to_numpy(dtype='datetime64[ns]')
+    ptf = df['ptf'].to_numpy(dtype=np.float64)
+    state = {'count': 0, 'lock': threading.Lock()}
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            with state['lock']:
+                state['count'] += 1
+                fail = fail_every > 0 and state['count'] % fail_every == 0
+            if fail:
+                self.send_response(503)
+                self.end_headers()
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            # endDate gün olarak dahildir
+            start = np.datetime64(pd.Timestamp(body['startDate']).tz_localize(None))
+            end = np.datetime64(pd.Timestamp(body['endDate']).tz_localize(None) + pd.Timedelta(days=1))
+            mask = (tarih >= start) & (tarih < end)
+            items = [{'date': pd.Timestamp(t).strftime('%Y-%m-%dT%H:%M:%S') + EPIAS_UTC_OFFSET,
+                      'hour': pd.Timestamp(t).strftime('%H:%M'), 'price': float(p)}
+                     for t, p in zip(tarih[mask], ptf[mask])]
+            data = json.dumps({'items': items}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    StubHandler.state = state
+    return StubHandler
+
+def start_stub_server(df, port=0, fail_every=0):
+    # Arka planda çalışan test sunucusu; adresi server.server_address ile alınır
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_stub_handler(df, fail_every))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="EPİAŞ PTF verisindeki eksik saatleri indirip depoya ekler")
+    parser.add_argument('--start', default=None, help="Başlangıç (varsayılan: depodaki ilk saat)")
+    parser.add_argument('--end', default=None, help="Bitiş, hariç (varsayılan: yarının sonu)")
+    parser.add_argument('--url', default=EPIAS_PTF_URL, help="PTF servis adresi (Örn: yerel test sunucusu)")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--chunk-days', type=int, default=30)
+    parser.add_argument('--retries', type=int, default=5)
+    parser.add_argument('--stub', metavar='CSV', default=None,
+                        help="Bu (tarih, ptf) dosyasından cevap veren yerel test sunucusunu başlat (--port)")
+    parser.add_argument('--port', type=int, default=8700)
+    args = parser.parse_args()
+
+    if args.stub:
+        df = pd.read_csv(args.stub, parse_dates=['tarih'])
+        server = start_stub_server(df, args.port)
+        print(f"🧪 Test sunucusu: http://127.0.0.1:{server.server_address[1]}/ (Ctrl+C ile dur)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    start = args.start
+    if start is None:
+        tarih = load_arrays()['tarih']
+        start = pd.Timestamp(tarih[0])
+    fetch_missing(start, args.end, base_url=args.url, concurrency=args.concurrency,
+                  chunk_days=args.chunk_days, max_retries=args.retries)
+
+if __name__ == "__main__":
+    main()
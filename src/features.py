@@ -1,4 +1,44 @@
 import pandas as pd
+import numpy as np
+
+# Piyasa kodu: Ajanın durum anahtarındaki, sadece fiyat serisine bağlı 3 bileşen
+# (saat × fiyat durumu × trend). Eşikler QLearningAgent.get_state_components ile aynıdır.
+MARKET_CODE_COUNT = 24 * 3 * 2
+
+# Hareketli ortalama / volatilite penceresi (saat)
+FEATURE_WINDOW = 24
+
+def compute_market_codes(hour, price_ratio, trend):
+    """
+    Saat, fiyat oranı ve trend dizilerinden her zaman adımı için tek bir
+    tam sayı "piyasa kodu" üretir: (saat * 3 + fiyat_durumu) * 2 + trend
+    """
+    hour = np.asarray(hour).astype(np.int64)
+    price_ratio = np.asarray(price_ratio)
+    # Fiyat Durumu: 0 Ucuz, 1 Normal, 2 Pahalı
+    price_status = np.where(price_ratio < 0.90, 0, np.where(price_ratio > 1.10, 2, 1))
+    # Trend: 1 Artıyor, 0 Düşüyor/Yatay
+    trend_up = (np.asarray(trend) > 0).astype(np.int64)
+    return (hour * 3 + price_status) * 2 + trend_up
+
+def decode_market_codes(codes):
+    codes = np.asarray(codes)
+    return codes // 6, (codes // 2) % 3, codes % 2
+
+def market_code_coverage(df):
+    """
+    Veri setinde hangi (saat, fiyat durumu, trend) kombinasyonunun kaç kez
+    görüldüğünü döndürür. Ajanın durum uzayı kapsamasını incelemek için.
+    """
+    counts = np.bincount(df['market_code'].to_numpy(dtype=np.int64), minlength=MARKET_CODE_COUNT)
+    hour, price_status, trend = decode_market_codes(np.arange(MARKET_CODE_COUNT))
+    return pd.DataFrame({
+        'market_code': np.arange(MARKET_CODE_COUNT),
+        'hour': hour,
+        'price_status': price_status,
+        'trend': trend,
+        'count': counts,
+    })
 
 def add_technical_indicators(df):
     """
@@ -8,7 +48,7 @@ def add_technical_indicators(df):
     df = df.copy()
     
     # 1. Hareketli Ortalama (Son 24 saat)
-    df['ma_24'] = df['ptf'].rolling(window=24).mean()
+    df['ma_24'] = df['ptf'].rolling(window=FEATURE_WINDOW).mean()
     
     # 2. Fiyat Oranı (Şu anki Fiyat / Ortalama)
     # 1.0 altı ucuz, üstü pahalı demektir.
@@ -19,9 +59,99 @@ def add_technical_indicators(df):
     df['trend'] = df['ptf'].diff()
     
     # 4. Volatilite (Standart Sapma)
-    df['volatility'] = df['ptf'].rolling(window=24).std()
+    df['volatility'] = df['ptf'].rolling(window=FEATURE_WINDOW).std()
     
     # Hesaplama yapılamayan ilk satırları (NaN) temizle
     df = df.dropna().reset_index(drop=True)
     
-    return df
\ No newline at end of file
+    # 5. Piyasa Kodu (Saat + Fiyat Durumu + Trend), bir kez hesaplanır
+    if 'hour' in df.columns:
+        df['market_code'] = compute_market_codes(df['hour'], df['price_ratio'], df['trend'])
+    
+    return df
+
+class FeatureStream:
+    """
+    add_technical_indicators'ın canlı (saat saat gelen fiyat) sürümü.
+    24 elemanlı halka tampon + yürüyen toplam ve kareler toplamı ile her yeni fiyat
+    için ma_24, price_ratio, trend ve volatility O(1) zamanda hesaplanır; geçmiş
+    tekrar işlenmez. Çıktılar toplu fonksiyonun (dropna sonrası) satırlarıyla aynıdır.
+    """
+    def __init__(self):
+        self.buffer = [0.0] * FEATURE_WINDOW
+        self.index = 0 # Sıradaki yazılacak yuva
+        self.count = 0
+        # Toplamlar "shift" etrafındaki sapmalar üzerinden tutulur (kareler toplamında hassasiyet kaybı olmasın)
+        self.shift = None
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.zeros = 0 # Penceredeki sıfır fiyat sayısı (tamamen sıfır pencere tam 0 ortalama verir)
+        self.last_price = None
+
+    def update(self, ptf, hour=None):
+        """
+        Yeni saatlik fiyatı ekler. Pencere dolana kadar (ilk 23 fiyat) None döner.
+        Ortalama 0 ve fiyat 0 ise de None döner (toplu fonksiyonda price_ratio NaN olur, satır atılır).
+        hour verilirse market_code da üretilir.
+        """
+        ptf = float(ptf)
+        if self.shift is None:
+            self.shift = ptf
+        old = self.buffer[self.index]
+        self.buffer[self.index] = ptf
+        self.index += 1
+        if self.index == FEATURE_WINDOW:
+            self.index = 0
+        d_new = ptf - self.shift
+        if self.count < FEATURE_WINDOW:
+            self.count += 1
+            self.total += d_new
+            self.total_sq += d_new * d_new
+            self.zeros += ptf == 0
+        else:
+            self.zeros += (ptf == 0) - (old == 0)
+            d_old = old - self.shift
+            self.total += d_new - d_old
+            self.total_sq += d_new * d_new - d_old * d_old
+        if self.count == FEATURE_WINDOW and self.index == 0:
+            # Her tam turda toplamları pencere ortalaması etrafında yeniden kur
+            # (yuvarlama hatası birikmez; 24 adımda bir O(24) -> amortize O(1))
+            self.shift = sum(self.buffer) / FEATURE_WINDOW
+            self.total = sum(x - self.shift for x in self.buffer)
+            self.total_sq = sum((x - self.shift) ** 2 for x in self.buffer)
+
+        trend = None if self.last_price is None else ptf - self.last_price
+        self.last_price = ptf
+        if self.count < FEATURE_WINDOW:
+            return None
+
+        n = FEATURE_WINDOW
+        if self.zeros == n:
+            # Yürüyen toplamın yuvarlama artığı (~1e-13) sıfır pencereyi sıfırdan ayırmasın
+            ma, variance = 0.0, 0.0
+        else:
+            ma = self.shift + self.total / n
+            variance = max((self.total_sq - self.total * self.total / n) / (n - 1), 0.0)
+        if ma == 0:
+            if ptf == 0:
+                return None
+            ratio = float('inf') if ptf > 0 else float('-inf')
+        else:
+            ratio = ptf / ma
+        features = {
+            'ptf': ptf,
+            'ma_24': ma,
+            'price_ratio': ratio,
+            'trend': trend,
+            'volatility': variance ** 0.5,
+        }
+        if hour is not None:
+            features['market_code'] = int(compute_market_codes(hour, features['price_ratio'], trend))
+        return features
+
+    def extend(self, prices, hours=None):
+        # Geçmiş fiyatlarla ısıtır, son özellikleri döndürür (canlı döngü öncesi bir kez)
+        features = None
+        for i, ptf in enumerate(prices):
+            features = self.update(ptf, None if hours is None else hours[i])
+        return features
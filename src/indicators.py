@@ -0,0 +1,193 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
+
+# Yolları ayarla
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(current_dir)
+
+try:
+    from preprocessor import load_frame, DATA_DIR
+except ImportError:
+    from src.preprocessor import load_frame, DATA_DIR
+
+# Gösterge bankası: (tür, pencere) listesi. Pencereler saat cinsinden, 'how_z' için hafta sayısı.
+#   ma    -> Hareketli ortalama           ratio -> ptf / ma (1.0 altı ucuz)
+#   ema   -> Üssel hareketli ortalama     std   -> Hareketli standart sapma
+#   rsi   -> Wilder RSI (0-100)           diff  -> ptf - ptf[t - pencere]
+#   how_z -> Haftanın aynı saatine göre z-skoru (son pencere haftanın aynı saati, en az 2 hafta)
+INDICATOR_KINDS = ('ma', 'ratio', 'ema', 'std', 'rsi', 'diff', 'how_z')
+DEFAULT_SPEC = [
+    ('ma', 6), ('ma', 24), ('ma', 168),
+    ('ratio', 24), ('ratio', 168),
+    ('ema', 6), ('ema', 24),
+    ('std', 24),
+    ('rsi', 14),
+    ('diff', 1), ('diff', 24),
+    ('how_z', 4),
+]
+
+INDICATOR_CACHE_VERSION = 1
+INDICATOR_CACHE_DIR = os.path.join(DATA_DIR, '.cache', 'indicators')
+
+HOURS_PER_WEEK = 168
+
+def indicator_name(kind, window):
+    return f"{kind}_{window}"
+
+def parse_spec(text):
+    # "ma:6,ma:24,rsi:14" -> [('ma', 6), ('ma', 24), ('rsi', 14)]
+    spec = []
+    for item in text.split(','):
+        kind, window = item.strip().split(':')
+        spec.append((kind, int(window)))
+    return spec
+
+def _validate(spec):
+    for kind, window in spec:
+        if kind not in INDICATOR_KINDS:
+            raise ValueError(f"Bilinmeyen gösterge: {kind}")
+        if window < 1:
+            raise ValueError(f"Pencere en az 1 olmalı: {kind}_{window}")
+        if kind == 'how_z' and window < 2:
+            # Tek gözlemin (ddof=1) standart sapması tanımsız: tüm z-skorları NaN olurdu
+            raise ValueError(f"how_z için en az 2 hafta gerekli: {kind}_{window}")
+
+def _ema(values, alpha):
+    # y[t] = alpha * x[t] + (1 - alpha) * y[t-1], y[0] = x[0] (pandas ewm(adjust=False) ile aynı)
+    return lfilter([alpha], [1, alpha - 1], values, zi=[(1 - alpha) * values[0]])[0]
+
+def compute_indicators(ptf, spec=DEFAULT_SPEC):
+    """
+    Fiyat dizisi (saatlik, boşluksuz) üzerinde istenen tüm göstergeleri tek geçişte hesaplar.
+    Ortak ara sonuçlar (kümülatif toplamlar, kazanç/kayıp dizileri) bir kez üretilir.
+    Dönüş: {isim: dizi} -- her dizi len(ptf) uzunluğunda, ısınma dönemi NaN
+
+    Not (RSI): Wilder yumuşatması (alpha = 1 / pencere) ilk kazanç/kayıptan başlayan üssel ortalama
+    ile tohumlanır (pandas ewm(alpha=1/n, adjust=False) ile aynı); ders kitabındaki ilk n değişimin basit
+    ortalamasıyla (SMA) tohumlama yapılmaz. Bu yüzden ilk değerler klasik tanımdan farklıdır, fark
+    (1 - 1/n)^t hızıyla söner.
+    """
+    _validate(spec)
+    ptf = np.ascontiguousarray(ptf, dtype=np.float64)
+    n = len(ptf)
+
+    # Hareketli ortalamalar için tek kümülatif toplam (hassasiyet için seri ortalamasından sapmalar)
+    center = ptf.mean() if n else 0.0
+    csum = np.concatenate(([0.0], np.cumsum(ptf - center)))
+
+    def rolling_mean(window):
+        ma = np.full(n, np.nan)
+        if window <= n:
+            ma[window - 1:] = center + (csum[window:] - csum[:-window]) / window
+        return ma
+
+    delta = np.diff(ptf, prepend=np.nan)
+    results = {}
+    for kind, window in spec:
+        name = indicator_name(kind, window)
+        if kind in ('ma', 'ratio'):
+            ma = rolling_mean(window)
+            results[name] = ma if kind == 'ma' else ptf / ma
+        elif kind == 'std':
+            # Kareler toplamı farkı büyük pencerelerde hassasiyet kaybettirir: kopyasız pencere görünümü
+            std = np.full(n, np.nan)
+            if 1 < window <= n:
+                std[window - 1:] = sliding_window_view(ptf, window).std(axis=1, ddof=1)
+            results[name] = std
+        elif kind == 'ema':
+            results[name] = _ema(ptf, 2 / (window + 1)) if n else np.empty(0)
+        elif kind == 'rsi':
+            rsi = np.full(n, np.nan)
+            if n > window:
+                # Wilder yumuşatması: alpha = 1 / pencere
+                gain = _ema(np.maximum(delta[1:], 0), 1 / window)
+                loss = _ema(np.maximum(-delta[1:], 0), 1 / window)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    rsi[1:] = np.where(loss == 0, 100.0, 100 - 100 / (1 + gain / loss))
+                rsi[:window] = np.nan
+            results[name] = rsi
+        elif kind == 'diff':
+            diff = np.full(n, np.nan)
+            diff[window:] = ptf[window:] - ptf[:-window]
+            results[name] = diff
+        elif kind == 'how_z':
+            # Haftanın aynı saatinin son `window` gözlemi: 168 saat adımlı kayan pencere
+            z = np.full(n, np.nan)
+            span = window * HOURS_PER_WEEK
+            if n > span:
+                lags = sliding_window_view(ptf[:-HOURS_PER_WEEK], span - HOURS_PER_WEEK + 1)[:, ::HOURS_PER_WEEK]
+                mean = lags.mean(axis=1)
+                std = lags.std(axis=1, ddof=1)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    z[span:] = np.where(std > 0, (ptf[span:] - mean) / std, np.nan)
+            results[name] = z
+    return results
+
+def data_fingerprint(tarih, ptf):
+    # Fiyat serisinin içerik özeti (tarih + ptf)
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(tarih, dtype='datetime64[ns]').tobytes())
+    digest.update(np.ascontiguousarray(ptf, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+def cache_key(fingerprint, spec):
+    payload = json.dumps({'version': INDICATOR_CACHE_VERSION, 'data': fingerprint,
+                          'spec': [[kind, int(window)] for kind, window in spec]})
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def cached_indicators(df, spec=DEFAULT_SPEC, cache_dir=INDICATOR_CACHE_DIR):
+    """
+    compute_indicators'ın disk önbellekli hali. Anahtar: veri parmak izi + gösterge listesi.
+    Aynı veri ve aynı liste için göstergeler yeniden hesaplanmaz, .npz dosyasından okunur.
+    Dönüş: ({isim: dizi}, önbellekten_mi)
+    """
+    _validate(spec)
+    key = cache_key(data_fingerprint(df['tarih'].to_numpy(), df['ptf'].to_numpy()), spec)
+    path = os.path.join(cache_dir, key + '.npz')
+    if os.path.exists(path):
+        with np.load(path) as cached:
+            return {name: cached[name] for name in cached.files}, True
+
+    results = compute_indicators(df['ptf'].to_numpy(), spec)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Yarım yazılmış dosya önbellek sayılmasın
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, **results)
+    os.replace(tmp_path, path)
+    return results, False
+
+def add_indicators(df, spec=DEFAULT_SPEC, cache_dir=INDICATOR_CACHE_DIR):
+    # Gösterge sütunlarını ekler (NaN satırlar atılmaz, eğitim tarafı kendi penceresini seçer)
+    results, _ = cached_indicators(df, spec, cache_dir)
+    df = df.copy()
+    for name, values in results.items():
+        df[name] = values
+    return df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Çok pencereli gösterge bankası")
+    parser.add_argument('--spec', default=None, help="Örn: ma:6,ma:24,ema:24,rsi:14,how_z:4 (varsayılan: DEFAULT_SPEC)")
+    parser.add_argument('--clear-cache', action='store_true', help="Gösterge önbelleğini sil")
+    args = parser.parse_args()
+
+    if args.clear_cache and os.path.isdir(INDICATOR_CACHE_DIR):
+        for filename in os.listdir(INDICATOR_CACHE_DIR):
+            os.remove(os.path.join(INDICATOR_CACHE_DIR, filename))
+
+    spec = parse_spec(args.spec) if args.spec else DEFAULT_SPEC
+    df = load_frame()
+    start_time = time.perf_counter()
+    results, from_cache = cached_indicators(df, spec)
+    elapsed = time.perf_counter() - start_time
+    source = "önbellekten okundu" if from_cache else "hesaplandı"
+    print(f"📈 {len(results)} gösterge, {len(df)} saat: {source} ({elapsed * 1000:.1f} ms)")
+    for name, values in results.items():
+        print(f"   {name:>10}: son değer {values[-1]:.3f}")
@@ -0,0 +1,323 @@
+import sys
+import os
+import json
+import time
+import asyncio
+import argparse
+from collections import deque
+import numpy as np
+
+# Yolları ayarla
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(current_dir)
+
+try:
+    from agent import market_code_base_indices, require_qtable_file, read_qtable, state_encoding_spec
+    from features import FeatureStream
+    from preprocessor import load_frame
+except ImportError:
+    from src.agent import market_code_base_indices, require_qtable_file, read_qtable, state_encoding_spec
+    from src.features import FeatureStream
+    from src.preprocessor import load_frame
+
+ACTION_NAMES = ['HOLD', 'BUY', 'SELL']
+HOLD = 0
+
+def load_policy(brain_path, max_inventory=10):
+    """
+    Beyin -> (q_table, visited) yoğun dizileri.
+    .qtb dosyası salt okunur bellek eşlemesiyle açılır (kopya yok, diğer süreçlerle paylaşılır).
+    Eski .pkl dosyaları reddedilir (sıcak yeniden yüklemede de pickle açılmaz).
+    """
+    require_qtable_file(brain_path)
+    q_table, visited, header = read_qtable(brain_path)
+    if header['state_encoding'] != state_encoding_spec(max_inventory):
+        raise ValueError(f"Q-tablosu farklı durum kodlamasıyla kaydedilmiş: {header['state_encoding']}")
+    return q_table, visited
+
+class PolicyServer:
+    """
+    Eğitilmiş Q-tablosundan AL/SAT/BEKLE kararı veren asyncio servisi.
+
+    - Beyin bir kez yüklenir; dosya değişince arka planda yeniden okunup tek atamayla
+      değiştirilir (işlemdeki istekler eski tabloyla biter, istek düşmez).
+    - Piyasa durumu FeatureStream ile tutulur (/price her saat bir kez beslenir).
+    - Aynı anda gelen /act istekleri max_delay süresince toplanıp tek NumPy
+      işlemiyle cevaplanır (mikro-yığınlama).
+    Hiç ziyaret edilmemiş durumlarda (ajan burada rastgele oynar) servis BEKLE döner.
+    """
+    def __init__(self, brain_path, max_inventory=10, max_batch=1024, max_delay=0.002, reload_interval=1.0):
+        self.brain_path = brain_path
+        self.max_inventory = max_inventory
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.reload_interval = reload_interval
+        self._market_base = np.array(market_code_base_indices(max_inventory), dtype=np.int64)
+
+        self.policy = load_policy(brain_path, max_inventory)
+        self.brain_mtime = os.stat(brain_path).st_mtime_ns
+        self.reloads = 0
+
+        self.stream = FeatureStream()
+        self.features = None
+        self.hour = None
+
+        self.queue = None
+        self.latencies = deque(maxlen=10_000) # saniye
+        self.batch_sizes = deque(maxlen=10_000)
+        self.requests = 0
+        self.errors = 0
+
+    # --- Piyasa durumu ---
+    def warm_up(self, df):
+        # Son fiyatlarla ısıt (sunucu ilk istekten itibaren karar verebilsin)
+        tail = df.tail(48)
+        self.update_price(tail['ptf'].to_numpy(), tail['hour'].to_numpy())
+
+    @staticmethod
+    def parse_prices(body):
+        """
+        /price gövdesini akışa dokunmadan önce bütünüyle doğrular (yarım uygulanan istek
+        paylaşılan FeatureStream durumunu bozar). Hatalı gövdede ValueError/KeyError.
+        Dönüş: (fiyatlar, saatler)
+        """
+        prices = np.atleast_1d(np.asarray(body['ptf'], dtype=np.float64))
+        hours = np.atleast_1d(np.asarray(body['hour'], dtype=np.float64))
+        if prices.ndim != 1 or hours.ndim != 1:
+            raise ValueError("ptf ve hour sayı veya sayı listesi olmalı")
+        if len(prices) != len(hours) or len(prices) == 0:
+            raise ValueError(f"ptf ({len(prices)}) ve hour ({len(hours)}) aynı uzunlukta ve boş olmamalı")
+        if not np.isfinite(prices).all():
+            raise ValueError("ptf sonlu sayılardan oluşmalı")
+        if not ((hours >= 0) & (hours <= 23) & (hours == np.floor(hours))).all():
+            raise ValueError("hour 0-23 arasında tam sayı olmalı")
+        return prices, hours.astype(np.int64)
+
+    def update_price(self, prices, hours):
+        features = self.stream.extend(prices, hours)
+        if features is not None:
+            self.features = features
+            self.hour = int(hours[-1])
+        return features
+
+    # --- Karar ---
+    def decide(self, inventory, profitable):
+        """
+        inventory, profitable: portföy başına diziler. Tek NumPy işlemi.
+        Dönüş: aksiyon dizisi (0: BEKLE, 1: AL, 2: SAT)
+        """
+        q_table, visited = self.policy # Tek okuma: yeniden yükleme ortasında tutarlı
+        idx = self._market_base[self.features['market_code']] + inventory * 12 + profitable
+        actions = q_table[idx].argmax(axis=1)
+        return np.where(visited[idx], actions, HOLD)
+
+    async def _batcher(self):
+        while True:
+            items = [await self.queue.get()]
+            # İlk istekten sonra kısa bir süre bekle, biriken istekleri tek yığında topla
+            if self.max_delay > 0:
+                await asyncio.sleep(self.max_delay)
+            rows = len(items[0][0])
+            while rows < self.max_batch and not self.queue.empty():
+                item = self.queue.get_nowait()
+                items.append(item)
+                rows += len(item[0])
+
+            inventory = np.concatenate([item[0] for item in items])
+            profitable = np.concatenate([item[1] for item in items])
+            try:
+                actions = self.decide(inventory, profitable)
+            except Exception as e:
+                for item in items:
+                    if not item[2].done():
+                        item[2].set_exception(e)
+                continue
+            self.batch_sizes.append(rows)
+            start = 0
+            for inv, _, future in items:
+                if not future.done():
+                    future.set_result(actions[start:start + len(inv)])
+                start += len(inv)
+
+    async def act(self, portfolios):
+        # portfolios: [{"inventory": .., "avg_buy_price": ..} veya {"inventory": .., "profitable": ..}]
+        if self.features is None:
+            raise ValueError("Piyasa durumu yok: önce en az 24 saatlik /price gönderin")
+        price = self.features['ptf']
+        inventory = np.array([int(p['inventory']) for p in portfolios], dtype=np.int64)
+        profitable = np.array([int(p['profitable']) if 'profitable' in p else
+                               int(p['inventory'] > 0 and price > float(p.get('avg_buy_price', 0)))
+                               for p in portfolios], dtype=np.int64)
+        # Aralık dışı değer başka bir durumun indeksine düşer ve yanlış karar döner: reddet (400)
+        bad = np.flatnonzero((inventory < 0) | (inventory > self.max_inventory))
+        if len(bad):
+            raise ValueError(f"inventory 0-{self.max_inventory} aralığında olmalı (portföy {int(bad[0])}: {int(inventory[bad[0]])})")
+        bad = np.flatnonzero((profitable != 0) & (profitable != 1))
+        if len(bad):
+            raise ValueError(f"profitable 0 veya 1 olmalı (portföy {int(bad[0])}: {int(profitable[bad[0]])})")
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((inventory, profitable, future))
+        return await future
+
+    # --- Sıcak yeniden yükleme ---
+    async def _watch_brain(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                mtime = os.stat(self.brain_path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            if mtime == self.brain_mtime:
+                continue
+            try:
+                # Okuma olay döngüsünü bloklamasın
+                policy = await loop.run_in_executor(None, load_policy, self.brain_path, self.max_inventory)
+            except Exception as e:
+                # Dosya yazılırken okunmuş olabilir: eski tablo kalır, sonraki turda tekrar denenir
+                print(f"⚠️ Beyin yeniden yüklenemedi: {e}")
+                continue
+            self.policy = policy
+            self.brain_mtime = mtime
+            self.reloads += 1
+            print(f"🔄 Beyin yeniden yüklendi: {self.brain_path}")
+
+    def metrics(self):
+        latencies = np.array(self.latencies) * 1000
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'latency_ms_p50': float(np.percentile(latencies, 50)) if len(latencies) else None,
+            'latency_ms_p99': float(np.percentile(latencies, 99)) if len(latencies) else None,
+            'mean_batch_size': float(np.mean(self.batch_sizes)) if self.batch_sizes else None,
+            'reloads': self.reloads,
+            'visited_states': int(self.policy[1].sum()),
+            'market': self.features,
+            'hour': self.hour,
+        }
+
+    # --- HTTP/1.1 (JSON) ---
+    async def _route(self, method, path, body):
+        if method == 'GET' and path == '/health':
+            return 200, {'status': 'ok'}
+        if method == 'GET' and path == '/metrics':
+            return 200, self.metrics()
+        if method == 'POST' and path == '/price':
+            # {"ptf": 2500.0, "hour": 14} veya {"ptf": [...], "hour": [...]}
+            features = self.update_price(*self.parse_prices(body))
+            return 200, {'features': features}
+        if method == 'POST' and path == '/act':
+            portfolios = body['portfolios'] if 'portfolios' in body else [body]
+            actions = await self.act(portfolios)
+            return 200, {'actions': [ACTION_NAMES[a] for a in actions.tolist()],
+                         'market_code': self.features['market_code']}
+        return 404, {'error': f"Bilinmeyen yol: {method} {path}"}
+
+    @staticmethod
+    async def _read_request(reader, request_line):
+        # İstek satırı + başlıklar + gövde. Bozuk istekte ValueError (UnicodeDecodeError dahil)
+        parts = request_line.decode().split()
+        if len(parts) != 3:
+            raise ValueError(f"Bozuk istek satırı: {request_line[:100]!r}")
+        method, path, _ = parts
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, sep, value = line.decode().partition(':')
+            if not sep:
+                raise ValueError(f"Bozuk başlık: {line[:100]!r}")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get('content-length', 0))
+        if length < 0:
+            raise ValueError(f"Geçersiz Content-Length: {length}")
+        raw = await reader.readexactly(length) if length else b''
+        return method, path, headers, raw
+
+    async def _respond(self, writer, status, payload):
+        data = json.dumps(payload).encode()
+        reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error'}[status]
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+        await writer.drain()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, headers, raw = await self._read_request(reader, request_line)
+                except ValueError as e:
+                    # Çerçeve bozuk: sonraki isteğin nerede başladığı bilinmez, cevap verip bağlantıyı kapat
+                    self.requests += 1
+                    self.errors += 1
+                    await self._respond(writer, 400, {'error': str(e)})
+                    break
+
+                start = time.perf_counter()
+                try:
+                    status, payload = await self._route(method, path, json.loads(raw) if raw else {})
+                except KeyError as e:
+                    status, payload = 400, {'error': f"Eksik alan: {e}"}
+                except (ValueError, TypeError, IndexError) as e:
+                    status, payload = 400, {'error': str(e)}
+                except Exception as e:
+                    # Beklenmeyen hata: bağlantıyı cevapsız düşürme, 500 dön
+                    print(f"⚠️ {method} {path}: {type(e).__name__}: {e}")
+                    status, payload = 500, {'error': f"Sunucu hatası: {type(e).__name__}"}
+                self.requests += 1
+                if status >= 400:
+                    self.errors += 1
+                elif path == '/act':
+                    self.latencies.append(time.perf_counter() - start)
+
+                await self._respond(writer, status, payload)
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8765, unix_path=None):
+        self.queue = asyncio.Queue()
+        tasks = [asyncio.create_task(self._batcher()), asyncio.create_task(self._watch_brain())]
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle, path=unix_path)
+            print(f"🚀 Karar servisi: unix:{unix_path}")
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+            print(f"🚀 Karar servisi: http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+def main():
+    parser = argparse.ArgumentParser(description="Q-tablosu karar (AL/SAT/BEKLE) servisi")
+    parser.add_argument('--brain', default=os.path.join(parent_dir, 'models', 'expert_trader.qtb'))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', default=None, help="TCP yerine Unix soketi yolu")
+    parser.add_argument('--max-inventory', type=int, default=10)
+    parser.add_argument('--max-batch', type=int, default=1024, help="Bir yığındaki en fazla portföy")
+    parser.add_argument('--max-delay-ms', type=float, default=2.0, help="Yığın toplama süresi")
+    parser.add_argument('--no-warm-up', action='store_true', help="Son fiyatlarla ısıtma (veri deposu gerekmez)")
+    args = parser.parse_args()
+
+    server = PolicyServer(args.brain, args.max_inventory, args.max_batch, args.max_delay_ms / 1000)
+    if not args.no_warm_up:
+        server.warm_up(load_frame())
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,61 @@
 import pandas as pd
 import numpy as np
 
+def _column_array(df, name, default=None):
+    # Sütun yoksa varsayılan değerle doldur (eski obs.get(...) davranışı)
+    if name in df.columns:
+        return np.ascontiguousarray(df[name].to_numpy(dtype=np.float64))
+    if default is None:
+        raise KeyError(f"'{name}' sütunu bulunamadı!")
+    return np.full(len(df), default, dtype=np.float64)
+
+# Ortamın kullandığı sütunlar ve eksik olduklarında varsayılan değerleri
+# (market_code yoksa -1: ajan kodu kendisi hesaplar)
+MARKET_COLUMNS = {
+    'ptf': None,
+    'hour': None,
+    'day_of_week': None,
+    'month': None,
+    'price_ratio': 1.0,
+    'trend': 0.0,
+    'market_code': -1.0,
+}
+
+def market_arrays(df):
+    # Ortamın ihtiyaç duyduğu tüm sütunları float64 NumPy dizileri olarak döndürür
+    return {name: _column_array(df, name, default) for name, default in MARKET_COLUMNS.items()}
+
 class EnergyMarketEnv:
-    def __init__(self, df, initial_balance=10000, max_inventory=10):
-        self.df = df.reset_index(drop=True)
+    def __init__(self, df, initial_balance=10000, max_inventory=10, arrays=None):
+        # df yerine hazır diziler (market_arrays çıktısı, ör. ortak bellekte) verilebilir
+        self.df = df.reset_index(drop=True) if df is not None else None
         self.initial_balance = initial_balance
         self.max_inventory = max_inventory # Depo limiti (Örn: 10 birim)
+
+        # Sıcak döngüde pandas'a dokunmamak için sütunları bir kez NumPy dizilerine al
+        if arrays is None:
+            arrays = market_arrays(self.df)
+        self._ptf = arrays['ptf']
+        self._hour = arrays['hour']
+        self._day_of_week = arrays['day_of_week']
+        self._month = arrays['month']
+        self._price_ratio = arrays['price_ratio']
+        self._trend = arrays['trend']
+        self._market_code = arrays['market_code']
+
+        # Gözlem tamponları: Her adımda yeni dizi yaratmamak için iki tampon dönüşümlü kullanılır.
+        # (state ve next_state aynı anda yaşadığı için tek tampon yetmez.)
+        # DİKKAT: reset/step'in döndürdüğü gözlem iki adım sonra üzerine yazılır;
+        # gözlemi saklayan çağıran (ör. deneyim listesi) .copy() almalıdır.
+        self._obs_buffers = (np.zeros(10), np.zeros(10))
+        self._obs_index = 0
         
         self.current_step = 0
         self.balance = initial_balance
         self.inventory = 0 
         self.avg_buy_price = 0 # Maliyet ortalaması
         self.net_worth = initial_balance 
-        self.max_steps = len(df) - 1
+        self.max_steps = len(self._ptf) - 1
 
     def reset(self):
         self.current_step = 0
@@ -23,25 +66,31 @@ class EnergyMarketEnv:
         return self._next_observation()
 
     def _next_observation(self):
-        obs = self.df.iloc[self.current_step]
-        
+        i = self.current_step
+        price = self._ptf[i]
+
+        # Sıradaki tamponu seç (bir önceki gözlem çağıranda bozulmadan kalır)
+        self._obs_index ^= 1
+        obs = self._obs_buffers[self._obs_index]
+
         # Botun gördüğü özellikler:
-        return np.array([
-            obs['ptf'], 
-            obs['hour'], 
-            obs['day_of_week'],
-            obs['month'],
-            self.balance,
-            self.inventory,
-            # Teknik göstergeler
-            obs.get('price_ratio', 1.0), 
-            obs.get('trend', 0.0),
-            # Ekstra Bilgi: Şu an kârda mıyım? (1: Evet, 0: Hayır)
-            1 if self.inventory > 0 and obs['ptf'] > self.avg_buy_price else 0
-        ])
+        obs[0] = price
+        obs[1] = self._hour[i]
+        obs[2] = self._day_of_week[i]
+        obs[3] = self._month[i]
+        obs[4] = self.balance
+        obs[5] = self.inventory
+        # Teknik göstergeler
+        obs[6] = self._price_ratio[i]
+        obs[7] = self._trend[i]
+        # Ekstra Bilgi: Şu an kârda mıyım? (1: Evet, 0: Hayır)
+        obs[8] = 1 if self.inventory > 0 and price > self.avg_buy_price else 0
+        # Piyasa kodu (saat + fiyat durumu + trend)
+        obs[9] = self._market_code[i]
+        return obs
 
     def step(self, action):
-        current_price = self.df.iloc[self.current_step]['ptf']
+        current_price = self._ptf[self.current_step]
         reward = 0
         
         # --- 1. AL (BUY) ---
@@ -78,4 +127,112 @@ class EnergyMarketEnv:
         done = self.current_step >= self.max_steps
         self.net_worth = self.balance + (self.inventory * current_price)
         
-        return self._next_observation(), reward, done, {}
\ No newline at end of file
+        return self._next_observation(), reward, done, {}
+
+class VectorEnergyMarketEnv:
+    """
+    N adet piyasa simülasyonunu aynı anda ilerleten toplu (vektörel) ortam.
+    Kasa, envanter, maliyet ve net değer uzunluğu N olan dizilerde tutulur;
+    AL/SAT/BEKLE kuralları EnergyMarketEnv.step ile birebir aynıdır, sadece
+    tüm aksiyon vektörüne maskeli NumPy işlemleri ile uygulanır.
+
+    Her şerit (lane) aynı fiyat geçmişini (farklı ajan seed'leri ile) ya da
+    verinin farklı bir penceresini oynatabilir: `starts` her şeridin
+    başlangıç satırını, `window` pencere uzunluğunu belirler.
+    """
+    def __init__(self, df, n_envs=8, initial_balance=10000, max_inventory=10, window=None, starts=None):
+        self.df = df.reset_index(drop=True)
+        self.initial_balance = initial_balance
+        self.max_inventory = max_inventory
+
+        total = len(self.df)
+        if window is None:
+            window = total if starts is None else total - int(np.max(starts))
+        if starts is None:
+            # Pencere tüm veriden kısaysa şeritleri veriye eşit aralıklarla yay
+            starts = np.linspace(0, total - window, n_envs).astype(np.int64)
+        starts = np.asarray(starts, dtype=np.int64)
+        if len(starts) != n_envs:
+            raise ValueError("starts uzunluğu n_envs ile aynı olmalı!")
+        if window < 2 or starts.min() < 0 or starts.max() + window > total:
+            raise ValueError("Pencere veri sınırlarının dışında!")
+
+        self.n_envs = n_envs
+        self.window = window
+        self.starts = starts
+
+        # (N, window) fiyat/özellik matrisleri: her satır bir şeridin fiyat yolu
+        rows = starts[:, None] + np.arange(window)
+        arrays = market_arrays(self.df)
+        self._ptf = arrays['ptf'][rows]
+        self._hour = arrays['hour'][rows]
+        self._day_of_week = arrays['day_of_week'][rows]
+        self._month = arrays['month'][rows]
+        self._price_ratio = arrays['price_ratio'][rows]
+        self._trend = arrays['trend'][rows]
+        self._market_code = arrays['market_code'][rows]
+
+        self._obs_buffers = (np.zeros((n_envs, 10)), np.zeros((n_envs, 10)))
+        self._obs_index = 0
+
+        self.current_step = 0
+        self.max_steps = window - 1
+        self.balance = np.full(n_envs, initial_balance, dtype=np.float64)
+        self.inventory = np.zeros(n_envs, dtype=np.int64)
+        self.avg_buy_price = np.zeros(n_envs)
+        self.net_worth = np.full(n_envs, initial_balance, dtype=np.float64)
+
+    def reset(self):
+        self.current_step = 0
+        self.balance.fill(self.initial_balance)
+        self.inventory.fill(0)
+        self.avg_buy_price.fill(0)
+        self.net_worth.fill(self.initial_balance)
+        return self._next_observation()
+
+    def _next_observation(self):
+        i = self.current_step
+        price = self._ptf[:, i]
+
+        self._obs_index ^= 1
+        obs = self._obs_buffers[self._obs_index]
+
+        obs[:, 0] = price
+        obs[:, 1] = self._hour[:, i]
+        obs[:, 2] = self._day_of_week[:, i]
+        obs[:, 3] = self._month[:, i]
+        obs[:, 4] = self.balance
+        obs[:, 5] = self.inventory
+        obs[:, 6] = self._price_ratio[:, i]
+        obs[:, 7] = self._trend[:, i]
+        obs[:, 8] = (self.inventory > 0) & (price > self.avg_buy_price)
+        obs[:, 9] = self._market_code[:, i]
+        return obs
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        current_price = self._ptf[:, self.current_step]
+
+        # --- 1. AL (BUY) ---
+        buy = (actions == 1) & (self.inventory < self.max_inventory) & (self.balance >= current_price)
+        # --- 2. SAT (SELL) ---
+        sell = (actions == 2) & (self.inventory > 0)
+
+        # Alış: Maliyet güncelle (Ağırlıklı Ortalama)
+        new_avg = (self.inventory * self.avg_buy_price + current_price) / (self.inventory + 1)
+        self.avg_buy_price = np.where(buy, new_avg, self.avg_buy_price)
+
+        # Satış: Sadece satınca kâr/zarar hesaplanır (Realized Profit)
+        profit = current_price - self.avg_buy_price
+        rewards = np.where(sell, np.where(profit > 0, profit * 1.5, profit * 2.0), 0.0)
+
+        self.balance = self.balance - np.where(buy, current_price, 0) + np.where(sell, current_price, 0)
+        self.inventory = self.inventory + buy - sell
+        self.avg_buy_price = np.where(sell & (self.inventory == 0), 0, self.avg_buy_price)
+
+        # --- İLERLE ---
+        self.current_step += 1
+        dones = np.full(self.n_envs, self.current_step >= self.max_steps)
+        self.net_worth = self.balance + (self.inventory * current_price)
+
+        return self._next_observation(), rewards, dones, {}
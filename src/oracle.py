@@ -0,0 +1,152 @@
+import sys
+import os
+import time
+import random
+import argparse
+import numpy as np
+import pandas as pd
+
+# Yolları ayarla
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(current_dir)
+
+try:
+    from market_env import EnergyMarketEnv
+    from agent import QLearningAgent
+    from train_bot import load_training_data
+except ImportError:
+    from src.market_env import EnergyMarketEnv
+    from src.agent import QLearningAgent
+    from src.train_bot import load_training_data
+
+HOLD, BUY, SELL = 0, 1, 2
+
+def solve(prices, initial_balance=10000, max_inventory=10):
+    """
+    EnergyMarketEnv kurallarıyla (1 birim al / 1 birim sat / bekle, depo limiti
+    max_inventory) ulaşılabilecek en yüksek net değeri dinamik programlama ile bulur.
+
+    Durum (zaman, envanter) için tutulan değer "ulaşılabilen en yüksek kasa"dır:
+    aynı envanterde daha fazla kasa her zaman en az o kadar iyidir (alış koşulu
+    sadece kasa >= fiyat), bu yüzden sonuç kesindir.
+
+    Dönüş: (actions, net_worth) -- actions uzunluğu len(prices) - 1'dir, çünkü ortam
+    son fiyatta aksiyon almadan biter.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    n_steps = len(prices) - 1
+    if n_steps < 1:
+        raise ValueError("En az 2 saatlik fiyat gerekli!")
+
+    # history[t, i]: t adım sonra envanter i ile ulaşılabilen en yüksek kasa
+    history = np.empty((n_steps + 1, max_inventory + 1))
+    history[0] = -np.inf
+    history[0, 0] = initial_balance
+    buy = np.empty(max_inventory)
+    sell = np.empty(max_inventory)
+
+    for t in range(n_steps):
+        p = prices[t]
+        balance = history[t]
+        new_balance = history[t + 1]
+        new_balance[:] = balance # BEKLE
+
+        # AL: i -> i+1 (sadece kasa yetiyorsa)
+        np.subtract(balance[:-1], p, out=buy)
+        buy[balance[:-1] < p] = -np.inf
+        np.maximum(new_balance[1:], buy, out=new_balance[1:])
+
+        # SAT: i+1 -> i
+        np.add(balance[1:], p, out=sell)
+        np.maximum(new_balance[:-1], sell, out=new_balance[:-1])
+
+    # Ortam net değeri son aksiyon alınan saatin fiyatıyla hesaplar
+    final_price = prices[n_steps - 1]
+    net_worth = history[n_steps] + np.arange(max_inventory + 1) * final_price
+    inventory = int(np.argmax(net_worth))
+    best = float(net_worth[inventory])
+
+    # Geriye doğru izle: hangi aksiyon bu kasa değerini üretti? (eşitlikte BEKLE tercih edilir)
+    actions = np.zeros(n_steps, dtype=np.int8)
+    for t in range(n_steps - 1, -1, -1):
+        p = prices[t]
+        target = history[t + 1, inventory]
+        balance = history[t]
+        if balance[inventory] == target:
+            actions[t] = HOLD
+        elif inventory > 0 and balance[inventory - 1] >= p and balance[inventory - 1] - p == target:
+            actions[t] = BUY
+            inventory -= 1
+        else:
+            actions[t] = SELL
+            inventory += 1
+    return actions, best
+
+def replay(df, actions, initial_balance=10000, max_inventory=10):
+    """
+    Aksiyon dizisini ortamda oynatır; (state, action, reward, next_state, done)
+    geçişlerini döndürür. Uzman gösterimi (expert demonstration) olarak
+    QLearningAgent.learn'e verilebilir.
+    """
+    env = EnergyMarketEnv(df, initial_balance=initial_balance, max_inventory=max_inventory)
+    state = env.reset()
+    transitions = []
+    for action in actions:
+        next_state, reward, done, _ = env.step(int(action))
+        transitions.append((state.copy(), int(action), reward, next_state.copy(), done))
+        state = next_state
+        if done:
+            break
+    return transitions, env.net_worth
+
+def evaluate_agent(agent, df, initial_balance=10000, max_inventory=10, seed=42):
+    # Ajanı açgözlü (epsilon=0) oynatır, net değeri döndürür
+    np.random.seed(seed)
+    random.seed(seed)
+    epsilon = agent.epsilon
+    agent.epsilon = 0
+    env = EnergyMarketEnv(df, initial_balance=initial_balance, max_inventory=max_inventory)
+    state = env.reset()
+    done = False
+    while not done:
+        state, _, done, _ = env.step(agent.act(state))
+    agent.epsilon = epsilon
+    return env.net_worth
+
+def slice_by_date(df, start=None, end=None):
+    mask = pd.Series(True, index=df.index)
+    if start:
+        mask &= df['tarih'] >= pd.Timestamp(start)
+    if end:
+        mask &= df['tarih'] < pd.Timestamp(end)
+    return df[mask].reset_index(drop=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Ticaret ortamı için kesin DP kahini (oracle)")
+    parser.add_argument('--start', default=None, help="Başlangıç tarihi (Örn: 2025-01-01)")
+    parser.add_argument('--end', default=None, help="Bitiş tarihi (hariç)")
+    parser.add_argument('--max-inventory', type=int, default=10)
+    parser.add_argument('--brain', default=os.path.join(parent_dir, 'models', 'expert_trader.qtb'))
+    args = parser.parse_args()
+
+    df = load_training_data(tail=None)
+    if df is None:
+        return
+    df = slice_by_date(df, args.start, args.end)
+    print(f"📚 Pencere: {df['tarih'].min()} - {df['tarih'].max()} ({len(df)} saat)")
+
+    start_time = time.perf_counter()
+    actions, best = solve(df['ptf'].to_numpy(), max_inventory=args.max_inventory)
+    elapsed = time.perf_counter() - start_time
+    print(f"🏆 Kahin (Optimum) Net Değer: {best:.2f} TL ({elapsed*1000:.0f} ms)")
+    print(f"   İşlem sayısı: AL {int(np.sum(actions == BUY))} / SAT {int(np.sum(actions == SELL))}")
+
+    if os.path.exists(args.brain):
+        agent = QLearningAgent(dense=True, max_inventory=args.max_inventory)
+        agent.load_brain(args.brain)
+        score = evaluate_agent(agent, df, max_inventory=args.max_inventory)
+        print(f"🤖 Ajan Net Değer: {score:.2f} TL | Optimumun %{score / best * 100:.1f}'i")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import sys
+import os
+import time
+import random
+import argparse
+import numpy as np
+from multiprocessing import Pool, cpu_count, shared_memory
+
+# Yolları ayarla
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(current_dir)
+
+try:
+    from market_env import EnergyMarketEnv
+    from agent import QLearningAgent
+    from train_bot import load_training_data
+except ImportError:
+    from src.market_env import EnergyMarketEnv
+    from src.agent import QLearningAgent
+    from src.train_bot import load_training_data
+
+# Her işçi sürecinin kendi ortamı ve ajanı (Pool initializer doldurur)
+_worker = {}
+
+def _init_worker(df, max_inventory, shm_names):
+    env = EnergyMarketEnv(df, initial_balance=10000, max_inventory=max_inventory)
+    agent = QLearningAgent(dense=True, max_inventory=max_inventory)
+
+    if shm_names is not None:
+        # Ortak bellek modu: Q-tablosu ve visited dizisi tüm süreçlerde aynı bellek
+        q_shm = shared_memory.SharedMemory(name=shm_names[0])
+        visited_shm = shared_memory.SharedMemory(name=shm_names[1])
+        agent.q_table = np.ndarray(agent.q_table.shape, dtype=np.float64, buffer=q_shm.buf)
+        agent.visited = np.ndarray(agent.visited.shape, dtype=bool, buffer=visited_shm.buf)
+        # Referansları sakla, yoksa bellek eşlemesi kapanır
+        _worker['shm'] = (q_shm, visited_shm)
+
+    _worker['env'] = env
+    _worker['agent'] = agent
+
+def run_episodes(agent, env, n_episodes):
+    # n_episodes tur eğitir, (adım sayısı, tur sonu net değerleri) döndürür
+    steps = 0
+    scores = []
+    for _ in range(n_episodes):
+        state = env.reset()
+        done = False
+        while not done:
+            action = agent.act(state)
+            next_state, reward, done, _ = env.step(action)
+            agent.learn(state, action, reward, next_state, done)
+            state = next_state
+            steps += 1
+        agent.end_episode()
+        scores.append(env.net_worth)
+    return steps, scores
+
+def _shared_task(args):
+    n_episodes, seed = args
+    np.random.seed(seed)
+    random.seed(seed)
+    agent = _worker['agent']
+    steps, scores = run_episodes(agent, _worker['env'], n_episodes)
+    return steps, scores, agent.epsilon
+
+def _replica_task(args):
+    n_episodes, seed, q_table, visited, epsilon = args
+    np.random.seed(seed)
+    random.seed(seed)
+    agent = _worker['agent']
+    agent.q_table[:] = q_table
+    agent.visited[:] = visited
+    agent.epsilon = epsilon
+    steps, scores = run_episodes(agent, _worker['env'], n_episodes)
+    return steps, scores, agent.epsilon, agent.q_table, agent.visited
+
+def merge_replicas(q_tables, visited_masks, previous_q):
+    """
+    Kopyaları birleştirir: her durumun Q-değeri sadece o durumu ziyaret etmiş kopyaların
+    ortalamasıdır (görmemiş kopyaların sıfırları ortalamayı seyreltmez); visited'lar birleşimdir.
+    Hiçbir kopyanın görmediği durumlar previous_q'dan gelir.
+    Dönüş: (q_table, visited)
+    """
+    q_tables = np.asarray(q_tables)
+    visited_masks = np.asarray(visited_masks, dtype=bool)
+    counts = visited_masks.sum(axis=0)
+    totals = np.einsum('rsa,rs->sa', q_tables, visited_masks.astype(np.float64))
+    q_table = np.where(counts[:, None] > 0, totals / np.maximum(counts, 1)[:, None], previous_q)
+    return q_table, counts > 0
+
+def train_parallel(df, episodes=500, workers=None, mode='shared', sync_every=10, max_inventory=10, seed=42):
+    """
+    Eğitim turlarını çok süreçli bir havuza dağıtır.
+
+    mode:
+        'shared'  -> Tüm işçiler multiprocessing.shared_memory içindeki tek bir Q-tablosunu
+                     kilitsiz (Hogwild tarzı) günceller. İşler sync_every turluk parçalar halinde dağıtılır.
+        'replica' -> Her işçi tablonun kendi kopyasını sync_every tur eğitir, sonra kopyalar
+                     merge_replicas ile birleştirilip bir sonraki turda tüm işçilere dağıtılır.
+
+    Dönüş: (agent, scores, steps_per_sec) -- agent yoğun modda bir QLearningAgent'tır,
+    save_brain ile kaydedilebilir.
+    """
+    if mode not in ('shared', 'replica'):
+        raise ValueError(f"Bilinmeyen mod: {mode}")
+    workers = workers or cpu_count()
+    agent = QLearningAgent(dense=True, max_inventory=max_inventory)
+    scores = []
+    total_steps = 0
+    start_time = time.perf_counter()
+
+    if mode == 'shared':
+        q_shm = shared_memory.SharedMemory(create=True, size=agent.q_table.nbytes)
+        visited_shm = shared_memory.SharedMemory(create=True, size=agent.visited.nbytes)
+        q_table = visited = None
+        try:
+            q_table = np.ndarray(agent.q_table.shape, dtype=np.float64, buffer=q_shm.buf)
+            visited = np.ndarray(agent.visited.shape, dtype=bool, buffer=visited_shm.buf)
+            q_table[:] = 0
+            visited[:] = False
+
+            chunks = [min(sync_every, episodes - i) for i in range(0, episodes, sync_every)]
+            tasks = [(n, seed + i) for i, n in enumerate(chunks)]
+            with Pool(workers, initializer=_init_worker, initargs=(df, max_inventory, (q_shm.name, visited_shm.name))) as pool:
+                # imap: sonuçlar tur sırasıyla gelir, puan listesi sıralı kalır
+                for steps, chunk_scores, epsilon in pool.imap(_shared_task, tasks):
+                    total_steps += steps
+                    scores.extend(chunk_scores)
+                    agent.epsilon = epsilon
+                    print(f"Tur {len(scores)}/{episodes} | Kasa: {chunk_scores[-1]:.2f} TL | Keşfetme: %{epsilon*100:.1f}")
+
+            # Ortak bellek kapanmadan önce tabloyu kopyala
+            agent.q_table = q_table.copy()
+            agent.visited = visited.copy()
+        finally:
+            # Görünümler bırakılmadan close() BufferError verir (ve asıl hatayı gizler)
+            q_table = visited = None
+            q_shm.close()
+            q_shm.unlink()
+            visited_shm.close()
+            visited_shm.unlink()
+    else:
+        rounds = -(-episodes // (workers * sync_every))
+        with Pool(workers, initializer=_init_worker, initargs=(df, max_inventory, None)) as pool:
+            for r in range(rounds):
+                remaining = episodes - len(scores)
+                per_worker = [min(sync_every, max(remaining - w * sync_every, 0)) for w in range(workers)]
+                tasks = [(n, seed + r * workers + w, agent.q_table, agent.visited, agent.epsilon)
+                         for w, n in enumerate(per_worker) if n > 0]
+                results = pool.map(_replica_task, tasks)
+
+                # Kopyaları birleştir: ziyaret edenler üzerinden Q ortalaması, visited'ların birleşimi
+                agent.q_table, agent.visited = merge_replicas([res[3] for res in results],
+                                                              [res[4] for res in results], agent.q_table)
+                agent.epsilon = float(np.mean([res[2] for res in results]))
+                for steps, chunk_scores, *_ in results:
+                    total_steps += steps
+                    scores.extend(chunk_scores)
+                print(f"Tur {len(scores)}/{episodes} | Kasa: {scores[-1]:.2f} TL | Keşfetme: %{agent.epsilon*100:.1f}")
+
+    elapsed = time.perf_counter() - start_time
+    return agent, scores, total_steps / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Çok süreçli Q-Learning eğitimi")
+    parser.add_argument('--episodes', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=None, help="Varsayılan: CPU çekirdek sayısı")
+    parser.add_argument('--mode', choices=['shared', 'replica'], default='shared')
+    parser.add_argument('--sync-every', type=int, default=10, help="Kaç turda bir senkronize edilir")
+    args = parser.parse_args()
+
+    print("🚀 PARALEL EĞİTİM BAŞLIYOR...")
+    df_train = load_training_data()
+    if df_train is None:
+        return
+    print(f"📚 Eğitim Seti: {len(df_train)} saat. Mod: {args.mode}")
+
+    agent, scores, steps_per_sec = train_parallel(df_train, episodes=args.episodes, workers=args.workers,
+                                                  mode=args.mode, sync_every=args.sync_every)
+    print(f"\n🎉 EĞİTİM TAMAMLANDI! ⏱️ {steps_per_sec:,.0f} adım/sn")
+
+    brain_path = os.path.join(parent_dir, 'models', 'expert_trader.qtb')
+    agent.save_brain(brain_path)
+
+if __name__ == "__main__":
+    main()
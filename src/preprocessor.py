@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+# Ortak veri deposu: merged_data.csv yerine sütun başına bir .npy dosyası
+# (bellek eşlemeli okunur) + küçük bir meta.json. CSV sadece dışa aktarım biçimidir.
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+DATA_DIR = os.path.join(parent_dir, 'data')
+CSV_PATH = os.path.join(DATA_DIR, 'merged_data.csv')
+STORE_DIR = os.path.join(DATA_DIR, 'store')
+
+STORE_VERSION = 1
+# Sütunlar ve tipleri (takvim alanları bir kez türetilip saklanır)
+STORE_COLUMNS = {
+    'tarih': 'datetime64[ns]',
+    'ptf': 'float64',
+    'hour': 'int8',
+    'day_of_week': 'int8',
+    'month': 'int8',
+}
+
+def source_signature(csv_path):
+    stat = os.stat(csv_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def write_store(tarih, ptf, store_dir=STORE_DIR, source=None):
+    """
+    (tarih, ptf) serisini takvim alanlarıyla birlikte tipli ikili sütunlar olarak yazar.
+    source: Deponun üretildiği CSV'nin imzası (güncellik kontrolü için)
+    """
+    tarih = np.asarray(tarih, dtype='datetime64[ns]')
+    index = pd.DatetimeIndex(tarih)
+    columns = {
+        'tarih': tarih,
+        'ptf': np.asarray(ptf, dtype=np.float64),
+        'hour': index.hour.to_numpy().astype(np.int8),
+        'day_of_week': index.dayofweek.to_numpy().astype(np.int8),
+        'month': index.month.to_numpy().astype(np.int8),
+    }
+    os.makedirs(store_dir, exist_ok=True)
+    for name, values in columns.items():
+        # Geçici dosya + os.replace: açık bellek eşlemeleri eski dosyayı okumaya devam eder
+        path = os.path.join(store_dir, name + '.npy')
+        with open(path + '.tmp', 'wb') as f:
+            np.save(f, values)
+        os.replace(path + '.tmp', path)
+
+    meta = {
+        'version': STORE_VERSION,
+        'rows': int(len(tarih)),
+        'columns': STORE_COLUMNS,
+        'start': str(tarih[0]) if len(tarih) else None,
+        'end': str(tarih[-1]) if len(tarih) else None,
+        'source': source,
+    }
+    # meta.json en son yazılır: yarım kalmış depo geçersiz sayılır
+    tmp_path = os.path.join(store_dir, 'meta.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, os.path.join(store_dir, 'meta.json'))
+
+def build_store_from_csv(csv_path=CSV_PATH, store_dir=STORE_DIR):
+    # Depoyu CSV'den (bir kez) üretir
+    df = pd.read_csv(csv_path)
+    df['tarih'] = pd.to_datetime(df['tarih'])
+    df = df.sort_values('tarih').reset_index(drop=True)
+    write_store(df['tarih'].to_numpy(), df['ptf'].to_numpy(), store_dir, source=source_signature(csv_path))
+
+def _store_is_fresh(csv_path, store_dir):
+    meta_path = os.path.join(store_dir, 'meta.json')
+    if not os.path.exists(meta_path):
+        return False
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if meta.get('version') != STORE_VERSION:
+        return False
+    # CSV yoksa veya depodan sonra değişmediyse depo geçerlidir
+    return not os.path.exists(csv_path) or meta.get('source') == source_signature(csv_path)
+
+def load_arrays(csv_path=CSV_PATH, store_dir=STORE_DIR):
+    """
+    Sütunları bellek eşlemeli (salt okunur, kopyasız) NumPy dizileri olarak döndürür.
+    Depo yoksa veya CSV daha yeniyse önce depo CSV'den yeniden üretilir.
+    """
+    if not _store_is_fresh(csv_path, store_dir):
+        if not os.path.exists(csv_path):
+            raise FileNotFoundError(f"Veri bulunamadı: {csv_path}")
+        build_store_from_csv(csv_path, store_dir)
+    return {name: np.load(os.path.join(store_dir, name + '.npy'), mmap_mode='r') for name in STORE_COLUMNS}
+
+def append_store(tarih, ptf, csv_path=CSV_PATH, store_dir=STORE_DIR):
+    """
+    Yeni saatleri hem CSV'ye hem depoya ekler (Örn: API'den çekilen eksik aralıklar).
+    Zaten var olan saatler korunur. Yeni satırların hepsi mevcut verinin sonrasındaysa
+    CSV'ye sadece ekleme yapılır, değilse CSV sıralı olarak yeniden yazılır.
+    Dönüş: eklenen satır sayısı
+    """
+    tarih = np.asarray(tarih, dtype='datetime64[ns]')
+    ptf = np.asarray(ptf, dtype=np.float64)
+    if os.path.exists(csv_path) or _store_is_fresh(csv_path, store_dir):
+        arrays = load_arrays(csv_path, store_dir)
+        # Kopyala: depo dosyaları aşağıda yeniden yazılacak
+        old_tarih, old_ptf = np.array(arrays['tarih']), np.array(arrays['ptf'])
+        del arrays
+    else:
+        old_tarih, old_ptf = np.empty(0, dtype='datetime64[ns]'), np.empty(0)
+
+    order = np.argsort(tarih, kind='stable')
+    tarih, ptf = tarih[order], ptf[order]
+    keep = ~np.isin(tarih, old_tarih)
+    keep[1:] &= tarih[1:] != tarih[:-1]
+    tarih, ptf = tarih[keep], ptf[keep]
+    if len(tarih) == 0:
+        return 0
+
+    merged_tarih = np.concatenate([old_tarih, tarih])
+    merged_ptf = np.concatenate([old_ptf, ptf])
+    if len(old_tarih) and tarih[0] > old_tarih[-1] and os.path.exists(csv_path):
+        pd.DataFrame({'tarih': tarih, 'ptf': ptf}).to_csv(csv_path, mode='a', header=False, index=False)
+    else:
+        order = np.argsort(merged_tarih, kind='stable')
+        merged_tarih, merged_ptf = merged_tarih[order], merged_ptf[order]
+        os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+        pd.DataFrame({'tarih': merged_tarih, 'ptf': merged_ptf}).to_csv(csv_path, index=False)
+    write_store(merged_tarih, merged_ptf, store_dir, source=source_signature(csv_path))
+    return len(tarih)
+
+def load_frame(csv_path=CSV_PATH, store_dir=STORE_DIR):
+    # Eğitim ve fatura modüllerinin ortak girişi: tarih, ptf, hour, day_of_week, month
+    return pd.DataFrame(load_arrays(csv_path, store_dir))
+
+def benchmark(csv_path=CSV_PATH, store_dir=STORE_DIR, repeat=5):
+    # Eski yol (CSV + to_datetime + takvim alanları) ile depo okumasını karşılaştırır
+    def old_path():
+        df = pd.read_csv(csv_path)
+        df['tarih'] = pd.to_datetime(df['tarih'])
+        df['hour'] = df['tarih'].dt.hour
+        df['day_of_week'] = df['tarih'].dt.dayofweek
+        df['month'] = df['tarih'].dt.month
+        return df
+
+    load_arrays(csv_path, store_dir) # Depo hazır olsun
+    results = {}
+    for name, fn in [('csv', old_path), ('store_frame', lambda: load_frame(csv_path, store_dir)),
+                     ('store_arrays', lambda: load_arrays(csv_path, store_dir))]:
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        results[name] = best
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="merged_data.csv -> ikili sütun deposu")
+    parser.add_argument('--benchmark', action='store_true', help="CSV ve depo okuma sürelerini karşılaştır")
+    args = parser.parse_args()
+
+    build_store_from_csv()
+    print(f"💾 Depo yazıldı: {STORE_DIR}")
+    if args.benchmark:
+        for name, seconds in benchmark().items():
+            print(f"   ⏱️ {name}: {seconds * 1000:.1f} ms")
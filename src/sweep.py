@@ -0,0 +1,218 @@
+import sys
+import os
+import json
+import time
+import random
+import argparse
+import itertools
+import numpy as np
+import pandas as pd
+from multiprocessing import Pool, cpu_count, shared_memory
+
+# Yolları ayarla
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(current_dir)
+
+try:
+    from market_env import EnergyMarketEnv, MARKET_COLUMNS, market_arrays
+    from agent import QLearningAgent
+    from train_bot import load_training_data
+    from parallel_train import run_episodes
+except ImportError:
+    from src.market_env import EnergyMarketEnv, MARKET_COLUMNS, market_arrays
+    from src.agent import QLearningAgent
+    from src.train_bot import load_training_data
+    from src.parallel_train import run_episodes
+
+# Uzayda verilmeyen parametreler için QLearningAgent / train_bot varsayılanları
+DEFAULT_CONFIG = {
+    'learning_rate': 0.1,
+    'discount_rate': 0.99,
+    'epsilon_decay': 0.995,
+    'max_inventory': 10,
+}
+
+# Varsayılan arama uzayı (varsayılan değerler dahil)
+DEFAULT_SPACE = {
+    'learning_rate': [0.05, 0.1, 0.2],
+    'discount_rate': [0.95, 0.99],
+    'epsilon_decay': [0.99, 0.995, 0.999],
+    'max_inventory': [5, 10, 20],
+}
+
+def grid_values(name, values):
+    """
+    Izgara için parametre değerleri: Liste olduğu gibi kullanılır; (alt, üst, adım_sayısı) aralığı
+    adım_sayısı eşit aralıklı noktaya bölünür. Adım sayısı verilmemiş (alt, üst) aralığı ızgarada
+    anlamsızdır (sadece uçlar denenirdi), reddedilir.
+    """
+    if not isinstance(values, tuple):
+        return values
+    if len(values) != 3:
+        raise ValueError(f"'{name}' aralığı ızgara araması için 'steps' (nokta sayısı) içermeli "
+                         f"veya rastgele arama (--search random) kullanılmalı")
+    low, high, steps = values
+    points = np.linspace(low, high, int(steps))
+    if isinstance(low, int) and isinstance(high, int):
+        return sorted(set(int(round(p)) for p in points))
+    return [round(float(p), 12) for p in points]
+
+def grid_configs(space):
+    # Izgara araması: tüm kombinasyonlar
+    names = list(space)
+    grids = [grid_values(n, space[n]) for n in names]
+    return [dict(zip(names, values)) for values in itertools.product(*grids)]
+
+def random_configs(space, n_samples, seed=42):
+    """
+    Rastgele arama: Liste verilen parametreden eleman seçilir,
+    (alt, üst[, adım_sayısı]) demeti verilen parametre düzgün dağılımdan çekilir (adım sayısı yok sayılır).
+    """
+    rng = np.random.default_rng(seed)
+    configs = []
+    for _ in range(n_samples):
+        config = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                low, high = values[:2]
+                config[name] = int(rng.integers(low, high + 1)) if isinstance(low, int) else float(rng.uniform(low, high))
+            else:
+                config[name] = values[int(rng.integers(len(values)))]
+        configs.append(config)
+    return configs
+
+# İşçi süreç durumu: ortak bellekteki fiyat dizileri (salt okunur)
+_worker = {}
+
+def _init_worker(shm_name, n_rows):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    block = np.ndarray((len(MARKET_COLUMNS), n_rows), dtype=np.float64, buffer=shm.buf)
+    block.flags.writeable = False
+    _worker['shm'] = shm
+    _worker['arrays'] = {name: block[i] for i, name in enumerate(MARKET_COLUMNS)}
+
+def _train_config(args):
+    config_id, config, n_episodes, seed, resume = args
+    config = {**DEFAULT_CONFIG, **config}
+    np.random.seed(seed)
+    random.seed(seed)
+    env = EnergyMarketEnv(None, initial_balance=10000, max_inventory=config['max_inventory'], arrays=_worker['arrays'])
+    agent = QLearningAgent(learning_rate=config['learning_rate'], discount_rate=config['discount_rate'],
+                           epsilon_decay=config['epsilon_decay'], dense=True, max_inventory=config['max_inventory'])
+    if resume is not None:
+        agent.q_table, agent.visited, agent.epsilon = resume
+
+    start_time = time.perf_counter()
+    _, scores = run_episodes(agent, env, n_episodes)
+    elapsed = time.perf_counter() - start_time
+    return config_id, scores, elapsed, (agent.q_table, agent.visited, agent.epsilon)
+
+def _score(scores, last=5):
+    # Sıralama ölçütü: son turların ortalama net değeri (tek turluk gürültüyü azaltır)
+    return float(np.mean(scores[-last:]))
+
+def run_sweep(df, configs, episodes=100, early_stop_episodes=20, keep_fraction=0.5, workers=None, seed=42):
+    """
+    Her konfigürasyonu süreç havuzunda eğitir. Fiyat dizileri ortak belleğe bir kez
+    yazılır, işçiler CSV'yi tekrar okumaz.
+
+    Erken durdurma: Tüm konfigürasyonlar önce early_stop_episodes tur eğitilir; net değere göre
+    en iyi keep_fraction kadarı kaldığı yerden episodes tura tamamlanır, diğerleri durdurulur.
+    Dönüş: Her konfigürasyon için bir satır içeren sonuç tablosu (DataFrame). Durdurulanların
+    final_net_worth değeri NaN'dır (sadece rung_net_worth); tamamlananlar önce, final_net_worth'e göre sıralanır.
+    """
+    workers = workers or cpu_count()
+    arrays = market_arrays(df.reset_index(drop=True))
+    n_rows = len(arrays['ptf'])
+    block_size = len(MARKET_COLUMNS) * n_rows * 8
+    shm = shared_memory.SharedMemory(create=True, size=block_size)
+    rows = []
+    try:
+        block = np.ndarray((len(MARKET_COLUMNS), n_rows), dtype=np.float64, buffer=shm.buf)
+        for i, name in enumerate(MARKET_COLUMNS):
+            block[i] = arrays[name]
+        del block
+
+        with Pool(workers, initializer=_init_worker, initargs=(shm.name, n_rows)) as pool:
+            # 1. Aşama: Herkes early_stop_episodes tur
+            first_episodes = min(early_stop_episodes, episodes)
+            tasks = [(i, config, first_episodes, seed + i, None) for i, config in enumerate(configs)]
+            first = {}
+            for config_id, scores, elapsed, state in pool.imap_unordered(_train_config, tasks):
+                first[config_id] = (scores, elapsed, state)
+                print(f"  ⏱️ Konfig {config_id}: {first_episodes} tur | Net Değer: {_score(scores):.2f} TL")
+
+            # 2. Aşama: Kazananlar tamamlanır
+            ranked = sorted(first, key=lambda i: _score(first[i][0]), reverse=True)
+            n_keep = max(1, int(round(len(ranked) * keep_fraction))) if episodes > first_episodes else 0
+            survivors = set(ranked[:n_keep])
+            tasks = [(i, configs[i], episodes - first_episodes, seed + len(configs) + i, first[i][2]) for i in ranked[:n_keep]]
+            second = {}
+            for config_id, scores, elapsed, _ in pool.imap_unordered(_train_config, tasks):
+                second[config_id] = (scores, elapsed)
+                print(f"  ✅ Konfig {config_id}: {episodes} tur | Net Değer: {_score(scores):.2f} TL")
+    finally:
+        shm.close()
+        shm.unlink()
+
+    for i, config in enumerate(configs):
+        scores, elapsed, _ = first[i]
+        rung_score = _score(scores)
+        stopped_early = episodes > first_episodes and i not in survivors
+        if i in second:
+            scores = scores + second[i][0]
+            elapsed += second[i][1]
+        rows.append({
+            'config_id': i,
+            **config,
+            'episodes_run': len(scores),
+            'rung_net_worth': rung_score,
+            # Durdurulanların tek basamaklık skoru tam eğitilenlerle aynı sütunda kıyaslanmaz
+            'final_net_worth': np.nan if stopped_early else _score(scores),
+            'stopped_early': stopped_early,
+            'train_seconds': elapsed,
+        })
+    results = pd.DataFrame(rows).sort_values(['stopped_early', 'final_net_worth', 'rung_net_worth'],
+                                             ascending=[True, False, False])
+    return results.reset_index(drop=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="QLearningAgent hiperparametre taraması")
+    parser.add_argument('--search', choices=['grid', 'random'], default='grid')
+    parser.add_argument('--samples', type=int, default=20, help="Rastgele aramada konfigürasyon sayısı")
+    parser.add_argument('--space', default=None,
+                        help='Arama uzayı JSON dosyası: liste veya {"low": .., "high": ..[, "steps": ..]} aralığı '
+                             '(ızgara aramasında "steps" zorunlu)')
+    parser.add_argument('--episodes', type=int, default=100)
+    parser.add_argument('--early-stop-episodes', type=int, default=20)
+    parser.add_argument('--keep', type=float, default=0.5, help="Erken durdurmadan sonra devam eden oran")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--out', default=os.path.join(parent_dir, 'models', 'sweep_results.csv'))
+    args = parser.parse_args()
+
+    space = DEFAULT_SPACE
+    if args.space:
+        with open(args.space) as f:
+            # {"low", "high"[, "steps"]} aralıkları (alt, üst[, adım_sayısı]) demetine çevrilir
+            space = {k: (v['low'], v['high']) + ((v['steps'],) if 'steps' in v else ()) if isinstance(v, dict) else v
+                     for k, v in json.load(f).items()}
+    try:
+        configs = grid_configs(space) if args.search == 'grid' else random_configs(space, args.samples)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(f"🔍 TARAMA BAŞLIYOR: {len(configs)} konfigürasyon ({args.search})")
+    df_train = load_training_data()
+    if df_train is None:
+        return
+
+    results = run_sweep(df_train, configs, episodes=args.episodes, early_stop_episodes=args.early_stop_episodes,
+                        keep_fraction=args.keep, workers=args.workers)
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    results.to_csv(args.out, index=False)
+    print(f"\n📊 Sonuçlar kaydedildi: {args.out}")
+    print(results.head(10).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
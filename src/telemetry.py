@@ -0,0 +1,164 @@
+import os
+import sys
+import csv
+import json
+import signal
+import threading
+from collections import Counter
+
+# Tur başına kaydedilen alanlar (JSONL ve CSV aynı sırada)
+METRIC_FIELDS = ['episode', 'elapsed', 'episode_seconds', 'steps', 'steps_per_sec', 'env_seconds', 'agent_seconds',
+                 'states', 'epsilon', 'net_worth', 'rss_mb']
+
+def rss_mb():
+    # Sürecin anlık yerleşik belleği (MB). /proc yoksa en yüksek değer, o da yoksa None.
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        return None
+
+def q_state_count(agent):
+    # Q-tablosunda bilinen durum sayısı (yoğun: visited, sözlük: anahtar sayısı)
+    return int(agent.visited.sum()) if agent.dense else len(agent.q_table)
+
+class TrainingCallback:
+    """
+    Eğitim döngüsü kancaları. Alt sınıflar sadece ihtiyaç duyduklarını ezer.
+    step_timing=True olan bir kanca varsa döngü ortam/ajan süresini adım adım ölçer
+    (yoksa iç döngüye hiçbir ek iş girmez).
+    """
+    step_timing = False
+
+    def on_train_begin(self, agent, env):
+        pass
+
+    def on_episode_begin(self, episode):
+        pass
+
+    def on_episode_end(self, episode, stats):
+        # stats: METRIC_FIELDS içindeki alanlar (rss_mb hariç; zamanlama kapalıysa süreler None)
+        pass
+
+    def on_train_end(self):
+        pass
+
+class ProgressPrinter(TrainingCallback):
+    # Eski davranış: her `every` turda bir satır
+    def __init__(self, episodes, every=50):
+        self.episodes = episodes
+        self.every = every
+
+    def on_episode_end(self, episode, stats):
+        if episode % self.every == 0:
+            print(f"Tur {episode}/{self.episodes} | Kasa: {stats['net_worth']:.2f} TL | Keşfetme: %{stats['epsilon']*100:.1f}")
+
+class MetricsLogger(TrainingCallback):
+    """
+    Tur başına ölçümleri dosyaya yazar: .csv uzantısında CSV, diğerlerinde JSON-lines.
+    Her satır hemen diske itilir (uzun eğitim yarıda kesilse de günlük okunabilir).
+    """
+    def __init__(self, path, step_timing=True):
+        self.path = path
+        self.step_timing = step_timing
+        self._file = None
+        self._writer = None
+
+    def on_train_begin(self, agent, env):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = open(self.path, 'w', newline='')
+        if self.path.endswith('.csv'):
+            self._writer = csv.DictWriter(self._file, fieldnames=METRIC_FIELDS)
+            self._writer.writeheader()
+
+    def on_episode_end(self, episode, stats):
+        row = dict(stats, rss_mb=rss_mb())
+        if self._writer is not None:
+            self._writer.writerow(row)
+        else:
+            self._file.write(json.dumps(row) + '\n')
+        self._file.flush()
+
+    def on_train_end(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            print(f"📝 Eğitim günlüğü: {self.path}")
+
+class SamplingProfiler(TrainingCallback):
+    """
+    Örneklemeli profil: [first_episode, last_episode] turları boyunca her `interval` saniyelik
+    CPU süresinde eğitim iş parçacığının çağrı yığını sayılır. Unix'te SIGPROF zamanlayıcısı
+    kullanılır; olmayan platformlarda (Windows) arka plan iş parçacığı yığını okur
+    (GIL devrinin denk geldiği noktalara kayabilir, daha kaba).
+    Çıktı "katlanmış yığın" biçimindedir (satır başına "kök;...;yaprak sayı"):
+    flamegraph.pl, speedscope veya inferno ile doğrudan alev grafiğine çevrilebilir.
+    """
+    def __init__(self, path, first_episode, last_episode=None, interval=0.005):
+        self.path = path
+        self.first_episode = first_episode
+        self.last_episode = last_episode or first_episode
+        self.interval = interval
+        self.counts = Counter()
+        self._running = False
+        self._thread = None
+        self._previous_handler = None
+
+    def on_episode_begin(self, episode):
+        if episode == self.first_episode:
+            self._start()
+
+    def on_episode_end(self, episode, stats):
+        if episode == self.last_episode:
+            self._stop()
+
+    def on_train_end(self):
+        self._stop()
+
+    def _record(self, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        if stack:
+            self.counts[';'.join(reversed(stack))] += 1
+
+    def _start(self):
+        self._running = True
+        if hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread():
+            self._previous_handler = signal.signal(signal.SIGPROF, lambda signum, frame: self._record(frame))
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        else:
+            self._target = threading.get_ident()
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+
+    def _sample(self):
+        while not self._stop_event.wait(self.interval):
+            self._record(sys._current_frames().get(self._target))
+
+    def _stop(self):
+        if not self._running:
+            return
+        self._running = False
+        if self._thread is None:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, self._previous_handler)
+        else:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, 'w') as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+        print(f"🔥 Profil ({sum(self.counts.values())} örnek, tur {self.first_episode}-{self.last_episode}): {self.path}")
@@ -1,6 +1,7 @@
 import sys
 import os
-import pandas as pd
+import time
+import argparse
 import matplotlib.pyplot as plt
 
 # Yolları ayarla
@@ -10,65 +11,141 @@ sys.path.append(current_dir)
 
 try:
     from market_env import EnergyMarketEnv
-    from agent import QLearningAgent
+    from agent import QLearningAgent, BatchQLearningAgent
     from features import add_technical_indicators
+    from preprocessor import load_frame
+    from telemetry import ProgressPrinter, MetricsLogger, SamplingProfiler, q_state_count
 except ImportError:
     from src.market_env import EnergyMarketEnv
-    from src.agent import QLearningAgent
+    from src.agent import QLearningAgent, BatchQLearningAgent
     from src.features import add_technical_indicators
+    from src.preprocessor import load_frame
+    from src.telemetry import ProgressPrinter, MetricsLogger, SamplingProfiler, q_state_count
 
-def main():
-    print("🚀 EXPERT AI EĞİTİMİ BAŞLIYOR (v2.0)...")
-    
-    # 1. VERİ YÜKLE
-    data_path = os.path.join(parent_dir, 'data', 'merged_data.csv')
-    if not os.path.exists(data_path):
-        print("❌ HATA: Veri dosyası bulunamadı! 'data/fix_merge_v2.py' çalıştırdın mı?")
-        return
-
-    df = pd.read_csv(data_path)
-    df['tarih'] = pd.to_datetime(df['tarih'])
-    df['hour'] = df['tarih'].dt.hour
-    df['day_of_week'] = df['tarih'].dt.dayofweek
-    df['month'] = df['tarih'].dt.month
+def load_training_data(tail=15000):
+    # 1. VERİ YÜKLE (İkili sütun deposu: takvim alanları hazır gelir)
+    try:
+        df = load_frame()
+    except FileNotFoundError:
+        print("❌ HATA: Veri dosyası bulunamadı! 'data/fix_merge.py' çalıştırdın mı?")
+        return None
     
     # 2. TEKNİK ANALİZ EKLENTİSİ
     print("📊 Teknik göstergeler hesaplanıyor...")
     df = add_technical_indicators(df)
     
     # Son 15.000 saati eğitim için kullan (Yaklaşık 2 yıl)
-    df_train = df.tail(15000).reset_index(drop=True)
+    if tail:
+        df = df.tail(tail).reset_index(drop=True)
+    return df
+
+def train_agent(agent, env, episodes, callbacks=()):
+    """
+    Eğitim döngüsü. Kancalar (telemetry.TrainingCallback) tur başında/sonunda çağrılır;
+    adım başına süre ölçümü sadece step_timing isteyen bir kanca varsa yapılır.
+    Dönüş: (toplam adım, tur sonu net değerleri)
+    """
+    timed = any(callback.step_timing for callback in callbacks)
+    for callback in callbacks:
+        callback.on_train_begin(agent, env)
+
+    scores = []
+    total_steps = 0
+    train_start = time.perf_counter()
+    for e in range(1, episodes + 1):
+        for callback in callbacks:
+            callback.on_episode_begin(e)
+        episode_start = time.perf_counter()
+        state = env.reset()
+        done = False
+        steps = 0
+        env_seconds = agent_seconds = None
+
+        if timed:
+            # Sınırlar paylaşılır: adım başına 3 saat okuması (ajan = act + learn)
+            env_seconds = agent_seconds = 0.0
+            t = time.perf_counter()
+            while not done:
+                action = agent.act(state)
+                t1 = time.perf_counter()
+                next_state, reward, done, _ = env.step(action)
+                t2 = time.perf_counter()
+                agent.learn(state, action, reward, next_state, done)
+                t3 = time.perf_counter()
+                agent_seconds += (t1 - t) + (t3 - t2)
+                env_seconds += t2 - t1
+                t = t3
+                state = next_state
+                steps += 1
+            agent.end_episode()
+            agent_seconds += time.perf_counter() - t
+        else:
+            while not done:
+                action = agent.act(state)
+                next_state, reward, done, _ = env.step(action)
+                agent.learn(state, action, reward, next_state, done)
+                state = next_state
+                steps += 1
+            agent.end_episode()
+
+        now = time.perf_counter()
+        total_steps += steps
+        scores.append(env.net_worth)
+        if callbacks:
+            stats = {
+                'episode': e,
+                'elapsed': now - train_start,
+                'episode_seconds': now - episode_start,
+                'steps': steps,
+                'steps_per_sec': steps / (now - episode_start),
+                'env_seconds': env_seconds,
+                'agent_seconds': agent_seconds,
+                'states': q_state_count(agent),
+                'epsilon': agent.epsilon,
+                'net_worth': float(env.net_worth),
+            }
+            for callback in callbacks:
+                callback.on_episode_end(e, stats)
+
+    for callback in callbacks:
+        callback.on_train_end()
+    return total_steps, scores
+
+def main(learner='online', episodes=500, telemetry=None, profile=None, profile_episodes=(1, 1)):
+    print("🚀 EXPERT AI EĞİTİMİ BAŞLIYOR (v2.0)...")
+    
+    df_train = load_training_data()
+    if df_train is None:
+        return
     print(f"📚 Eğitim Seti: {len(df_train)} saat.")
     
     # 3. ORTAM KURULUMU
     # Depo limitini 10 yaptık
     env = EnergyMarketEnv(df_train, initial_balance=10000, max_inventory=10)
-    agent = QLearningAgent()
+    # Yoğun (dense) Q-tablosu: string anahtar yerine tam sayı indeks kullanır
+    if learner == 'online':
+        agent = QLearningAgent(dense=True, max_inventory=env.max_inventory)
+    else:
+        # Toplu öğrenme: 'exact' (sıralı) veya 'batched' (scatter-add, yaklaşık)
+        agent = BatchQLearningAgent(max_inventory=env.max_inventory, update_mode=learner)
     
-    episodes = 500 # İyice öğrenmesi için
-    scores = []
+    callbacks = [ProgressPrinter(episodes, every=50)]
+    if telemetry:
+        callbacks.append(MetricsLogger(telemetry))
+    if profile:
+        callbacks.append(SamplingProfiler(profile, *profile_episodes))
     
-    print(f"🔄 Eğitim başlıyor ({episodes} Tur)...")
-    for e in range(episodes):
-        state = env.reset()
-        done = False
-        
-        while not done:
-            action = agent.act(state)
-            next_state, reward, done, _ = env.step(action)
-            agent.learn(state, action, reward, next_state, done)
-            state = next_state
-        
-        scores.append(env.net_worth)
-        
-        if (e + 1) % 50 == 0:
-            print(f"Tur {e+1}/{episodes} | Kasa: {env.net_worth:.2f} TL | Keşfetme: %{agent.epsilon*100:.1f}")
+    print(f"🔄 Eğitim başlıyor ({episodes} Tur, öğrenme: {learner})...")
+    start_time = time.perf_counter()
+    total_steps, scores = train_agent(agent, env, episodes, callbacks)
 
+    elapsed = time.perf_counter() - start_time
     print("\n🎉 EĞİTİM TAMAMLANDI!")
+    print(f"⏱️ Süre: {elapsed:.1f} sn | {total_steps / elapsed:,.0f} adım/sn")
     
     # 4. KAYDET (Modeli 'models' klasörüne atar)
     models_dir = os.path.join(parent_dir, 'models')
-    brain_path = os.path.join(models_dir, 'expert_trader.pkl')
+    brain_path = os.path.join(models_dir, 'expert_trader.qtb')
     agent.save_brain(brain_path)
     
     # Grafik
@@ -81,4 +158,17 @@ def main():
     print("📊 Grafik kaydedildi.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Q-Learning trader eğitimi")
+    parser.add_argument('--learner', choices=['online', 'exact', 'batched'], default='online',
+                        help="online: adım adım TD | exact: BatchQLearningAgent, online ile birebir aynı sonuç "
+                             "(doğrulama modu, daha hızlı değil) | batched: toplu scatter-add güncelleme "
+                             "(yaklaşık, sıralı TD'den sapar, hızlı)")
+    parser.add_argument('--episodes', type=int, default=500)
+    parser.add_argument('--telemetry', default=None,
+                        help="Tur başına ölçüm günlüğü (.csv veya .jsonl); süre, adım/sn, ortam/ajan süresi, durum sayısı, bellek")
+    parser.add_argument('--profile', default=None, help="Örneklemeli profil çıktısı (katlanmış yığın, alev grafiği için)")
+    parser.add_argument('--profile-episodes', type=int, nargs=2, default=[1, 1], metavar=('İLK', 'SON'),
+                        help="Profili alınacak tur aralığı (1'den başlar, iki uç dahil)")
+    args = parser.parse_args()
+    main(learner=args.learner, episodes=args.episodes, telemetry=args.telemetry,
+         profile=args.profile, profile_episodes=tuple(args.profile_episodes))
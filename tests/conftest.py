@@ -0,0 +1,29 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+# Yolları ayarla (depo kökü ve src; modüller hem "src.x" hem "x" olarak içe aktarılabilsin)
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(root_dir)
+sys.path.append(os.path.join(root_dir, 'src'))
+
+def make_price_frame(n_hours, seed=0, start='2024-01-01'):
+    # load_frame biçiminde yapay PTF serisi: günlük döngü + gürültü (arada sıfır fiyatlı saatler)
+    rng = np.random.default_rng(seed)
+    tarih = pd.date_range(start, periods=n_hours, freq='h')
+    hour = tarih.hour.to_numpy()
+    ptf = 2000 * (1 + 0.3 * np.sin((hour - 6) / 24 * 2 * np.pi)) * rng.lognormal(0, 0.15, n_hours)
+    ptf[rng.random(n_hours) < 0.02] = 0.0
+    return pd.DataFrame({
+        'tarih': tarih,
+        'ptf': np.round(ptf, 2),
+        'hour': hour,
+        'day_of_week': tarih.dayofweek.to_numpy(),
+        'month': tarih.month.to_numpy(),
+    })
+
+@pytest.fixture
+def price_frame():
+    return make_price_frame(24 * 60)
@@ -0,0 +1,59 @@
+import random
+import pickle
+import numpy as np
+import pytest
+
+from agent import QLearningAgent, BatchQLearningAgent
+from features import add_technical_indicators
+from market_env import EnergyMarketEnv
+from parallel_train import run_episodes
+
+def train(agent, df, episodes=3, seed=0):
+    np.random.seed(seed)
+    random.seed(seed)
+    return run_episodes(agent, EnergyMarketEnv(df, 10000, 10), episodes)
+
+def test_exact_batch_agent_matches_online(price_frame):
+    df = add_technical_indicators(price_frame)
+    online = QLearningAgent(dense=True)
+    _, online_scores = train(online, df)
+    # Küçük tampon da büyük tampon da aynı sonucu vermeli (tampon boyu sadece performansı etkiler)
+    for batch_size in (7, 4096):
+        exact = BatchQLearningAgent(update_mode='exact', batch_size=batch_size)
+        _, scores = train(exact, df)
+        assert scores == online_scores
+        np.testing.assert_array_equal(exact.q_table, online.q_table)
+        np.testing.assert_array_equal(exact.visited, online.visited)
+        assert exact.epsilon == online.epsilon
+
+def test_load_brain_maps_qtable_copy_on_write(tmp_path):
+    agent = QLearningAgent(dense=True)
+    agent.q_table[:] = np.arange(agent.q_table.size, dtype=np.float64).reshape(agent.q_table.shape)
+    agent.visited[::2] = True
+    path = str(tmp_path / 'brain.qtb')
+    agent.save_brain(path)
+    with open(path, 'rb') as f:
+        original = f.read()
+
+    loaded = QLearningAgent(dense=True)
+    loaded.load_brain(path)
+    assert isinstance(loaded.q_table, np.memmap) and loaded.q_table.mode == 'c'
+    np.testing.assert_array_equal(loaded.q_table, agent.q_table)
+    np.testing.assert_array_equal(loaded.visited, agent.visited)
+
+    # Öğrenme bellekte kalır, dosya ancak save_brain ile değişir
+    loaded.q_table[0, 1] += 5.0
+    loaded.visited[1] = True
+    with open(path, 'rb') as f:
+        assert f.read() == original
+    loaded.save_brain(path)
+    reloaded = QLearningAgent(dense=True)
+    reloaded.load_brain(path)
+    np.testing.assert_array_equal(reloaded.q_table, loaded.q_table)
+
+def test_load_brain_rejects_pickle(tmp_path):
+    path = str(tmp_path / 'old_brain.pkl')
+    with open(path, 'wb') as f:
+        pickle.dump({'0_0_0_0_0': np.zeros(3)}, f)
+    with pytest.raises(ValueError, match='python src/agent.py'):
+        QLearningAgent(dense=True).load_brain(path)
@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+from backtest import greedy_replay
+from features import add_technical_indicators
+from market_env import market_arrays
+
+def test_greedy_replay_rejects_missing_market_codes(price_frame):
+    # Göstergesiz çerçeve: market_code varsayılanı -1
+    arrays = market_arrays(price_frame)
+    policy = np.zeros(24 * 11 * 12, dtype=np.int64)
+    with pytest.raises(ValueError, match='market_code'):
+        greedy_replay(arrays['ptf'], arrays['market_code'], policy)
+    with pytest.raises(ValueError, match='market_code'):
+        greedy_replay(arrays['ptf'], np.full(len(price_frame), 144), policy)
+
+def test_greedy_replay_accepts_computed_market_codes(price_frame):
+    arrays = market_arrays(add_technical_indicators(price_frame))
+    policy = np.zeros(24 * 11 * 12, dtype=np.int64) # Hep BEKLE
+    net_worth, trades = greedy_replay(arrays['ptf'], arrays['market_code'], policy)
+    assert trades == 0
+    assert np.all(np.asarray(net_worth) == 10000)
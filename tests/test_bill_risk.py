@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from fatura_hesapla import NeuralPriceEngine, daily_residuals, simulate_bill_risk
+
+@pytest.fixture
+def engine_and_residuals(price_frame):
+    engine = NeuralPriceEngine()
+    engine.fit(price_frame.copy())
+    return engine, daily_residuals(engine, price_frame)
+
+def test_risk_paths_independent_of_chunk_size(engine_and_residuals):
+    engine, residuals = engine_and_residuals
+    runs = [simulate_bill_risk(engine, residuals, 2024, 4, [300, 150, 200], 3.0, n_paths=2_300,
+                               chunk_size=chunk_size, seed=7)[1]
+            for chunk_size in (1000, 700, 2_000, 100_000)]
+    # Aynı yollar; maliyetler sadece matris çarpımının parça boyuna bağlı son bit yuvarlamasında farklı olabilir
+    for costs in runs[1:]:
+        np.testing.assert_allclose(costs, runs[0], rtol=1e-12)
+
+def test_risk_seed_changes_paths(engine_and_residuals):
+    engine, residuals = engine_and_residuals
+    _, a = simulate_bill_risk(engine, residuals, 2024, 4, [300, 150, 200], 3.0, n_paths=600, seed=1)
+    _, b = simulate_bill_risk(engine, residuals, 2024, 4, [300, 150, 200], 3.0, n_paths=600, seed=2)
+    assert not np.array_equal(a, b)
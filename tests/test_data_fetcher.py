@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from data_fetcher import fetch_missing, start_stub_server
+from preprocessor import load_arrays, write_store
+
+def test_fetch_missing_fills_gaps_from_stub(tmp_path, price_frame):
+    source = price_frame[['tarih', 'ptf']]
+    server = start_stub_server(source, port=0, fail_every=3) # Her 3. istek 503
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    csv_path, store_dir = str(tmp_path / 'merged_data.csv'), str(tmp_path / 'store')
+    try:
+        # Başta, ortada (iki boşluk) ve sonda eksik saatler
+        keep = np.ones(len(source), dtype=bool)
+        keep[:30] = False
+        keep[200:260] = False
+        keep[700:705] = False
+        keep[-50:] = False
+        partial = source[keep]
+        partial.to_csv(csv_path, index=False)
+        write_store(partial['tarih'].to_numpy(), partial['ptf'].to_numpy(), store_dir)
+
+        start, end = source['tarih'].iloc[0], source['tarih'].iloc[-1] + pd.Timedelta(hours=1)
+        added, failed = fetch_missing(start, end, csv_path, store_dir, base_url=url,
+                                      concurrency=4, chunk_days=1, backoff=0.01)
+        assert failed == []
+        assert added == (~keep).sum()
+        assert server.RequestHandlerClass.state['count'] > 0
+
+        arrays = load_arrays(csv_path, store_dir)
+        np.testing.assert_array_equal(arrays['tarih'], source['tarih'].to_numpy(dtype='datetime64[ns]'))
+        np.testing.assert_array_equal(arrays['ptf'], source['ptf'].to_numpy())
+        saved = pd.read_csv(csv_path, parse_dates=['tarih'])
+        np.testing.assert_array_equal(saved['ptf'].to_numpy(), source['ptf'].to_numpy())
+
+        # İkinci çalıştırma: eksik yok, sunucuya hiç istek gitmez
+        sent = server.RequestHandlerClass.state['count']
+        assert fetch_missing(start, end, csv_path, store_dir, base_url=url) == (0, [])
+        assert server.RequestHandlerClass.state['count'] == sent
+    finally:
+        server.shutdown()
+
+def test_fetched_hours_survive_rebuild_from_sources(tmp_path, price_frame):
+    from data.fix_merge import robust_import
+    source = price_frame[['tarih', 'ptf']].iloc[:24 * 20]
+    data_dir = str(tmp_path)
+    csv_path, store_dir = str(tmp_path / 'merged_data.csv'), str(tmp_path / 'store')
+    export_path = tmp_path / 'ptf_export.csv'
+    source.iloc[:24 * 10].to_csv(export_path, index=False)
+    robust_import(workers=1, data_dir=data_dir)
+
+    server = start_stub_server(source, port=0)
+    try:
+        start, end = source['tarih'].iloc[0], source['tarih'].iloc[-1] + pd.Timedelta(hours=1)
+        added, failed = fetch_missing(start, end, csv_path, store_dir,
+                                      base_url=f"http://127.0.0.1:{server.server_address[1]}/", chunk_days=4)
+    finally:
+        server.shutdown()
+    assert failed == [] and added == 24 * 10
+    assert len(list(tmp_path.glob('ptf_api_*.csv'))) == 3
+
+    # Kaynak dosya değişir: birleşik veri kaynaklardan yeniden kurulur, indirilen saatler kalmalı
+    changed = source.iloc[:24 * 10].assign(ptf=lambda d: d['ptf'] + 1)
+    changed.to_csv(export_path, index=False)
+    robust_import(workers=1, data_dir=data_dir)
+
+    expected = np.concatenate([changed['ptf'].to_numpy(), source['ptf'].to_numpy()[24 * 10:]])
+    arrays = load_arrays(csv_path, store_dir)
+    np.testing.assert_array_equal(arrays['tarih'], source['tarih'].to_numpy(dtype='datetime64[ns]'))
+    np.testing.assert_array_equal(arrays['ptf'], expected)
+    np.testing.assert_array_equal(pd.read_csv(csv_path)['ptf'].to_numpy(), expected)
@@ -0,0 +1,65 @@
+import re
+import builtins
+import numpy as np
+import pandas as pd
+import pytest
+
+import fatura_hesapla
+from conftest import make_price_frame
+from fatura_hesapla import NeuralPriceEngine, calculate_bill, evaluate_batch
+
+@pytest.fixture(scope='module')
+def engine():
+    engine = NeuralPriceEngine()
+    engine.fit(make_price_frame(24 * 60))
+    return engine
+
+def single_bill(engine, answers, monkeypatch, capsys):
+    # Etkileşimli tek müşteri yolu: girdiler sırayla verilir, rapordaki tutarlar okunur
+    monkeypatch.setattr(fatura_hesapla, 'train_neural_model', lambda: engine)
+    answers = iter(str(a) for a in answers)
+    monkeypatch.setattr(builtins, 'input', lambda prompt='': next(answers))
+    capsys.readouterr()
+    calculate_bill()
+    out = capsys.readouterr().out
+    market = float(re.search(r"PİYASA \(Endeksli\) Tahmini: (-?[\d.]+) TL", out).group(1))
+    offer = float(re.search(r"TEKLİF \(Sabit\) Tutarı: +(-?[\d.]+) TL", out).group(1))
+    decision = 'REDDET' if 'TEKLİFİ REDDET' in out else 'KABUL ET'
+    return market, offer, decision
+
+# Aynı dönemde birden fazla satır, iki farklı ay ve iki tüketim biçimi (kWh / toplam + yüzde)
+CUSTOMERS = pd.DataFrame([
+    {'year': 2024, 'month': 4, 't1_kwh': 300, 't2_kwh': 150, 't3_kwh': 200, 'offer_price': 5.0},
+    {'year': 2024, 'month': 4, 'total_kwh': 1000, 't1_pct': 50, 't2_pct': 20, 't3_pct': 30,
+     'offer_price': 2.0, 'yekdem': 400.0, 'margin': 8.0},
+    {'year': 2024, 'month': 5, 'total_kwh': 650, 't1_pct': 2, 't2_pct': 1, 't3_pct': 1, 'offer_price': 6.0},
+    {'year': 2024, 'month': 4, 't1_kwh': 10, 't2_kwh': 0, 't3_kwh': 90, 'offer_price': 2.2, 'margin': 0.0},
+])
+
+def answers_for(row):
+    yekdem = 250.0 if pd.isna(row.get('yekdem', np.nan)) else row['yekdem']
+    margin = 5.0 if pd.isna(row.get('margin', np.nan)) else row['margin']
+    head = [int(row['year']), int(row['month']), yekdem, margin]
+    if not pd.isna(row.get('t1_kwh', np.nan)):
+        return head + ['1', row['t1_kwh'], row['t2_kwh'], row['t3_kwh'], row['offer_price']]
+    return head + ['2', row['total_kwh'], row['t1_pct'], row['t2_pct'], row['t3_pct'], row['offer_price']]
+
+def test_batch_matches_single_customer_path(engine, monkeypatch, capsys):
+    batch = evaluate_batch(CUSTOMERS, engine)
+    assert len(batch) == len(CUSTOMERS)
+    assert set(batch['decision']) == {'KABUL ET', 'REDDET'}
+    for i, row in CUSTOMERS.iterrows():
+        market, offer, decision = single_bill(engine, answers_for(row), monkeypatch, capsys)
+        # Rapor 2 ondalık yazar
+        assert batch['market_cost'].iloc[i] == pytest.approx(market, abs=0.006)
+        assert batch['offer_cost'].iloc[i] == pytest.approx(offer, abs=0.006)
+        assert batch['decision'].iloc[i] == decision
+
+def test_batch_period_column_and_row_order(engine):
+    batch = evaluate_batch(CUSTOMERS, engine)
+    # 'YYYY-MM' dönem sütunu ve satır sırası sonucu değiştirmez
+    by_period = CUSTOMERS.drop(columns=['year', 'month']).assign(
+        period=[f"{y}-{m:02d}" for y, m in zip(CUSTOMERS['year'], CUSTOMERS['month'])])
+    shuffled = evaluate_batch(by_period.iloc[::-1].reset_index(drop=True), engine).iloc[::-1].reset_index(drop=True)
+    for column in ['t1_price', 't2_price', 't3_price', 'market_cost', 'offer_cost', 'decision']:
+        np.testing.assert_array_equal(shuffled[column].to_numpy(), batch[column].to_numpy())
@@ -0,0 +1,47 @@
+import numpy as np
+
+from features import FEATURE_WINDOW, FeatureStream, add_technical_indicators
+
+COLUMNS = ['ma_24', 'price_ratio', 'trend', 'volatility', 'market_code']
+
+def assert_stream_matches_batch(frame):
+    batch = add_technical_indicators(frame)
+    stream = FeatureStream()
+    outputs = [stream.update(ptf, hour) for ptf, hour in zip(frame['ptf'], frame['hour'])]
+    # Toplu fonksiyonun attığı satırlarda (ısınma, 0/0 fiyat oranı) akış None döner
+    streamed = [out for out in outputs if out is not None]
+    assert len(streamed) == len(batch)
+    np.testing.assert_array_equal([out['ptf'] for out in streamed], batch['ptf'].to_numpy())
+
+    for column in COLUMNS:
+        expected = batch[column].to_numpy()
+        actual = np.array([out[column] for out in streamed])
+        if column == 'market_code':
+            np.testing.assert_array_equal(actual, expected)
+        else:
+            np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-6)
+    return outputs
+
+def test_stream_matches_batch_including_warm_up(price_frame):
+    # Sıfır fiyatlı saatler sabit fiyat (volatilite 0) ve price_ratio 0 durumlarını da dener
+    outputs = assert_stream_matches_batch(price_frame)
+    # Isınma: ilk 23 saat özellik yok, toplu fonksiyon da bu satırları atar
+    assert all(out is None for out in outputs[:FEATURE_WINDOW - 1])
+    assert all(out is not None for out in outputs[FEATURE_WINDOW - 1:])
+
+def test_stream_matches_batch_with_zero_price_window(price_frame):
+    # 30 saat sıfır fiyat: tamamen sıfır pencerede ortalama 0, price_ratio 0/0 (toplu: NaN, satır atılır)
+    frame = price_frame.copy()
+    frame.loc[300:329, 'ptf'] = 0.0
+    outputs = assert_stream_matches_batch(frame)
+    dropped = [i for i, out in enumerate(outputs) if out is None and i >= FEATURE_WINDOW - 1]
+    assert dropped == list(range(323, 330))
+
+def test_extend_equals_last_update(price_frame):
+    prices, hours = price_frame['ptf'].to_numpy(), price_frame['hour'].to_numpy()
+    assert FeatureStream().extend(prices[:FEATURE_WINDOW - 1], hours[:FEATURE_WINDOW - 1]) is None
+
+    batch = add_technical_indicators(price_frame.head(200))
+    features = FeatureStream().extend(prices[:200], hours[:200])
+    for column in COLUMNS:
+        assert np.isclose(features[column], batch[column].iloc[-1], rtol=1e-9, atol=1e-6)
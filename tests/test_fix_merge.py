@@ -0,0 +1,47 @@
+import os
+import shutil
+import pandas as pd
+
+from data.fix_merge import robust_import
+
+def write_export(path, start, hours, price):
+    # EPİAŞ dışa aktarım biçimi: Tarih;Saat;PTF (TL/MWh), ondalık virgül
+    tarih = pd.date_range(start, periods=hours, freq='h')
+    pd.DataFrame({
+        'Tarih': tarih.strftime('%d.%m.%Y'),
+        'Saat': tarih.strftime('%H:%M'),
+        'PTF (TL/MWh)': [f"{price + i:.2f}".replace('.', ',') for i in range(hours)],
+    }).to_csv(path, sep=';', index=False)
+
+def merged(data_dir):
+    return pd.read_csv(os.path.join(data_dir, 'merged_data.csv'))
+
+def test_duplicate_hours_same_result_incremental_and_full(tmp_path, capsys):
+    data_dir = str(tmp_path)
+    write_export(tmp_path / 'ptf_b.csv', '2024-01-01', 48, 1000)
+    robust_import(workers=1, data_dir=data_dir)
+
+    # Ad sırasında önce gelen yeni dosya, örtüşen saatlerde öncelikli olmalı (artımlı yol)
+    write_export(tmp_path / 'ptf_a.csv', '2024-01-02', 48, 5000)
+    robust_import(workers=1, data_dir=data_dir)
+    assert 'Artımlı birleştirme' in capsys.readouterr().out
+    incremental = merged(data_dir)
+
+    shutil.rmtree(tmp_path / '.cache')
+    robust_import(workers=1, data_dir=data_dir)
+    full = merged(data_dir)
+
+    pd.testing.assert_frame_equal(incremental, full)
+    assert len(full) == 72
+    assert full['ptf'].iloc[24] == 5000.0 # 2024-01-02 00:00 -> ptf_a.csv
+
+def test_rename_changing_order_rebuilds(tmp_path):
+    data_dir = str(tmp_path)
+    write_export(tmp_path / 'ptf_a.csv', '2024-01-01', 48, 1000)
+    write_export(tmp_path / 'ptf_b.csv', '2024-01-02', 48, 5000)
+    robust_import(workers=1, data_dir=data_dir)
+    assert merged(data_dir)['ptf'].iloc[24] == 1024.0
+
+    os.rename(tmp_path / 'ptf_a.csv', tmp_path / 'ptf_c.csv')
+    robust_import(workers=1, data_dir=data_dir)
+    assert merged(data_dir)['ptf'].iloc[24] == 5000.0
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+import fatura_hesapla
+from fatura_hesapla import NeuralPriceEngine, train_neural_model
+from conftest import make_price_frame
+
+WINDOW_DAYS = 40
+
+@pytest.fixture
+def frame():
+    return make_price_frame(24 * 50)
+
+def days_of(df):
+    return df['tarih'].to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+
+def test_update_slides_window(frame):
+    engine = NeuralPriceEngine()
+    engine.fit(frame.head(24 * WINDOW_DAYS))
+    assert engine.update(frame.head(24 * WINDOW_DAYS)) == 0 # Yeni gün yok: pencere aynı kalır
+    assert engine.updates == 0
+    ratios_before = engine.hourly_ratio_array()
+
+    assert engine.update(frame.head(24 * (WINDOW_DAYS + 5))) == 5
+    assert engine.updates == 1
+    # En eski 5 gün düştü, pencere boyu sabit
+    expected_days = np.unique(days_of(frame))[5:WINDOW_DAYS + 5]
+    np.testing.assert_array_equal(engine.window['days'], expected_days)
+
+    # Oranlar ve günlük toplamlar aynı pencereyi sıfırdan gruplamakla aynı
+    window_df = frame.iloc[24 * 5:24 * (WINDOW_DAYS + 5)]
+    fresh = NeuralPriceEngine.daily_aggregates(window_df)
+    np.testing.assert_array_equal(engine.window['ratio_count'], fresh['ratio_count'])
+    for name in ('daily_mean', 'ratio_sum'):
+        np.testing.assert_allclose(engine.window[name], fresh[name], rtol=1e-12)
+    reference = NeuralPriceEngine()
+    reference._set_window(fresh)
+    np.testing.assert_allclose(engine.hourly_ratio_array(), reference.hourly_ratio_array(), rtol=1e-12)
+    assert not np.allclose(engine.hourly_ratio_array(), ratios_before, rtol=1e-12, atol=0)
+
+def test_train_neural_model_incremental_cache(frame, tmp_path, monkeypatch, capsys):
+    cache_path = str(tmp_path / 'engine.pkl')
+    monkeypatch.setattr(fatura_hesapla, 'TRAIN_WINDOW_HOURS', 24 * WINDOW_DAYS)
+    data = {'df': frame.head(24 * WINDOW_DAYS)}
+    monkeypatch.setattr(fatura_hesapla, 'load_frame', lambda: data['df'])
+
+    first = train_neural_model(cache_path)
+    assert first.updates == 0
+    # Veri aynı: kayıtlı motor olduğu gibi yüklenir
+    assert train_neural_model(cache_path).updates == 0
+    assert 'veri değişmemiş' in capsys.readouterr().out
+
+    # 3 yeni gün: artımlı güncelleme, pencere kayar, önbellek parmak izi yeni veriye geçer
+    data['df'] = frame.head(24 * (WINDOW_DAYS + 3))
+    updated = train_neural_model(cache_path)
+    assert updated.updates == 1
+    assert updated.window['days'][0] == np.unique(days_of(frame))[3]
+    assert updated.history_fingerprint == updated.window_fingerprint(data['df'])
+    fingerprint = NeuralPriceEngine().fingerprint(data['df'].tail(24 * WINDOW_DAYS).reset_index(drop=True))
+    assert NeuralPriceEngine.load(cache_path, fingerprint) is not None
+    assert train_neural_model(cache_path).updates == 1 # Tekrar çağrı: yeni gün yok, kayıtlı motor
+
+    # Pencere içindeki geçmiş düzeltildi (yeni gün yok): artımlı yol kullanılmaz, tam eğitime düşer
+    corrected = data['df'].copy()
+    corrected.loc[corrected.index[-100], 'ptf'] += 50
+    data['df'] = corrected
+    refit = train_neural_model(cache_path)
+    assert refit.updates == 0
+    assert refit.history_fingerprint == refit.window_fingerprint(corrected)
+
+def test_incremental_refit_benchmark_small(frame):
+    import benchmarks.incremental_refit as incremental_refit
+    results = incremental_refit.run(frame, days=2, horizon_days=2)
+    assert len(results) == 2
+    assert np.isfinite(results[['mae_incremental', 'mae_full', 'forecast_gap_pct']].to_numpy()).all()
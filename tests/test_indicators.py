@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from indicators import compute_indicators, parse_spec
+
+def test_how_z_rejects_single_week():
+    with pytest.raises(ValueError):
+        compute_indicators(np.arange(1000.0), parse_spec('how_z:1'))
+
+def test_indicators_match_pandas(price_frame):
+    ptf = price_frame['ptf']
+    results = compute_indicators(ptf.to_numpy(), parse_spec('ma:24,ema:24,std:24,diff:24,rsi:14'))
+    np.testing.assert_allclose(results['ma_24'], ptf.rolling(24).mean(), rtol=1e-9)
+    np.testing.assert_allclose(results['ema_24'], ptf.ewm(span=24, adjust=False).mean(), rtol=1e-9)
+    np.testing.assert_allclose(results['std_24'], ptf.rolling(24).std(), rtol=1e-9)
+    np.testing.assert_allclose(results['diff_24'], ptf.diff(24), rtol=1e-9)
+
+    # RSI: EWM tohumlu Wilder yumuşatması (pandas ewm(alpha=1/n, adjust=False) ile aynı)
+    delta = ptf.diff()
+    gain = delta.clip(lower=0).iloc[1:].ewm(alpha=1 / 14, adjust=False).mean()
+    loss = (-delta).clip(lower=0).iloc[1:].ewm(alpha=1 / 14, adjust=False).mean()
+    expected = (100 - 100 / (1 + gain / loss)).reindex(ptf.index)
+    expected.iloc[:14] = np.nan
+    np.testing.assert_allclose(results['rsi_14'], expected, rtol=1e-9)
+
+def test_how_z_matches_same_hour_history(price_frame):
+    ptf = price_frame['ptf'].to_numpy()
+    z = compute_indicators(ptf, parse_spec('how_z:3'))['how_z_3']
+    t = 3 * 168 + 5
+    lags = ptf[[t - 168, t - 336, t - 504]]
+    assert np.isclose(z[t], (ptf[t] - lags.mean()) / lags.std(ddof=1))
+    assert np.isnan(z[:3 * 168]).all()
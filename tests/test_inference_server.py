@@ -0,0 +1,102 @@
+import asyncio
+import json
+import pickle
+import numpy as np
+import pytest
+
+from agent import QLearningAgent, write_qtable
+from inference_server import PolicyServer, load_policy
+
+@pytest.fixture
+def policy_server(tmp_path, price_frame):
+    agent = QLearningAgent(dense=True)
+    agent.q_table[:, 1] = 1.0 # Ziyaret edilen her durumda AL
+    agent.visited[:] = True
+    brain_path = str(tmp_path / 'brain.qtb')
+    write_qtable(brain_path, agent.q_table, agent.visited)
+    server = PolicyServer(brain_path, max_delay=0)
+    server.warm_up(price_frame)
+    return server
+
+async def exchange(server, raw):
+    # Sunucuyu geçici portta açar, ham baytları gönderir, tüm cevabı okur
+    server.queue = asyncio.Queue()
+    batcher = asyncio.create_task(server._batcher())
+    tcp = await asyncio.start_server(server.handle, '127.0.0.1', 0)
+    port = tcp.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(raw)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout=5)
+        writer.close()
+        return response
+    finally:
+        tcp.close()
+        batcher.cancel()
+
+def post(path, body):
+    data = json.dumps(body).encode()
+    return (f"POST {path} HTTP/1.1\r\nContent-Length: {len(data)}\r\nConnection: close\r\n\r\n").encode() + data
+
+def status_and_body(response):
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+@pytest.mark.parametrize('raw', [
+    b'GARBAGE\r\n\r\n',
+    b'GET /health HTTP/1.1\r\nno-colon-header\r\n\r\n',
+    b'\xff\xfe /x HTTP/1.1\r\n\r\n',
+    b'POST /act HTTP/1.1\r\nContent-Length: abc\r\n\r\n',
+])
+def test_malformed_request_gets_400(policy_server, raw):
+    status, body = status_and_body(asyncio.run(exchange(policy_server, raw)))
+    assert status == 400
+    assert 'error' in body
+
+@pytest.mark.parametrize('portfolio', [
+    {'inventory': 11, 'profitable': 0},
+    {'inventory': -1, 'profitable': 0},
+    {'inventory': 3, 'profitable': 5},
+])
+def test_out_of_range_portfolio_gets_400(policy_server, portfolio):
+    status, body = status_and_body(asyncio.run(exchange(policy_server, post('/act', portfolio))))
+    assert status == 400
+    assert 'olmalı' in body['error']
+
+def test_valid_portfolios(policy_server):
+    body = {'portfolios': [{'inventory': 0, 'profitable': 0}, {'inventory': 10, 'avg_buy_price': 1e9}]}
+    status, payload = status_and_body(asyncio.run(exchange(policy_server, post('/act', body))))
+    assert status == 200
+    assert payload['actions'] == ['BUY', 'BUY']
+
+@pytest.mark.parametrize('body', [
+    {'ptf': [2500.0, 2600.0, 2700.0], 'hour': [10, 11]},
+    {'ptf': [2500.0, 'x'], 'hour': [10, 11]},
+    {'ptf': [2500.0, float('nan')], 'hour': [10, 11]},
+    {'ptf': [2500.0, 2600.0], 'hour': [10, 24]},
+    {'ptf': [[2500.0], [2600.0]], 'hour': [10, 11]},
+    {'ptf': [2500.0]},
+])
+def test_bad_price_body_gets_400_and_keeps_stream(policy_server, body):
+    stream = policy_server.stream
+    before = (list(stream.buffer), stream.index, stream.count, stream.last_price)
+    status, payload = status_and_body(asyncio.run(exchange(policy_server, post('/price', body))))
+    assert status == 400
+    assert 'error' in payload
+    assert (list(stream.buffer), stream.index, stream.count, stream.last_price) == before
+
+def test_unexpected_error_gets_500(policy_server, monkeypatch):
+    def broken():
+        raise ZeroDivisionError('division by zero')
+    monkeypatch.setattr(policy_server, 'metrics', broken)
+    status, payload = status_and_body(asyncio.run(exchange(policy_server, b'GET /metrics HTTP/1.1\r\nConnection: close\r\n\r\n')))
+    assert status == 500
+    assert 'ZeroDivisionError' in payload['error']
+
+def test_load_policy_rejects_pickle(tmp_path):
+    path = str(tmp_path / 'old_brain.pkl')
+    with open(path, 'wb') as f:
+        pickle.dump({'0_0_0_0_0': np.zeros(3)}, f)
+    with pytest.raises(ValueError, match='python src/agent.py'):
+        load_policy(path)
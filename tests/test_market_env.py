@@ -0,0 +1,127 @@
+import numpy as np
+import pytest
+
+from features import add_technical_indicators
+from market_env import EnergyMarketEnv, VectorEnergyMarketEnv
+
+class DataFrameMarketEnv:
+    """İlk (DataFrame + iloc) EnergyMarketEnv mantığı: dizi tabanlı ortamın referansı."""
+    def __init__(self, df, initial_balance=10000, max_inventory=10):
+        self.df = df.reset_index(drop=True)
+        self.initial_balance = initial_balance
+        self.max_inventory = max_inventory
+        self.max_steps = len(df) - 1
+
+    def reset(self):
+        self.current_step = 0
+        self.balance = self.initial_balance
+        self.inventory = 0
+        self.avg_buy_price = 0
+        self.net_worth = self.initial_balance
+        return self._next_observation()
+
+    def _next_observation(self):
+        obs = self.df.iloc[self.current_step]
+        return np.array([
+            obs['ptf'], obs['hour'], obs['day_of_week'], obs['month'],
+            self.balance, self.inventory,
+            obs.get('price_ratio', 1.0), obs.get('trend', 0.0),
+            1 if self.inventory > 0 and obs['ptf'] > self.avg_buy_price else 0
+        ])
+
+    def step(self, action):
+        current_price = self.df.iloc[self.current_step]['ptf']
+        reward = 0
+        if action == 1 and self.inventory < self.max_inventory and self.balance >= current_price:
+            self.balance -= current_price
+            total_cost = (self.inventory * self.avg_buy_price) + current_price
+            self.inventory += 1
+            self.avg_buy_price = total_cost / self.inventory
+        elif action == 2 and self.inventory > 0:
+            self.balance += current_price
+            self.inventory -= 1
+            profit = current_price - self.avg_buy_price
+            reward = profit * 1.5 if profit > 0 else profit * 2.0
+            if self.inventory == 0:
+                self.avg_buy_price = 0
+        self.current_step += 1
+        done = self.current_step >= self.max_steps
+        self.net_worth = self.balance + (self.inventory * current_price)
+        return self._next_observation(), reward, done, {}
+
+def replay(env, actions):
+    # Gözlemler tamponu paylaştığı için kopyalanır
+    history = [(env.reset().copy(), None, None, env.net_worth)]
+    for action in actions:
+        obs, reward, done, _ = env.step(action)
+        history.append((obs.copy(), reward, done, env.net_worth))
+        if done:
+            break
+    return history
+
+@pytest.mark.parametrize('with_indicators', [True, False])
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_array_env_matches_dataframe_env(price_frame, with_indicators, seed):
+    df = add_technical_indicators(price_frame) if with_indicators else price_frame
+    # Küçük kasa: AL reddedilen (bakiye yetersiz) dallar da denensin
+    initial_balance = 10000 if seed else 5000
+    actions = np.random.default_rng(seed).integers(0, 3, len(df)).tolist()
+
+    expected = replay(DataFrameMarketEnv(df, initial_balance, max_inventory=5), actions)
+    actual = replay(EnergyMarketEnv(df, initial_balance, max_inventory=5), actions)
+
+    assert len(actual) == len(expected)
+    for (obs_a, reward_a, done_a, worth_a), (obs_e, reward_e, done_e, worth_e) in zip(actual, expected):
+        np.testing.assert_array_equal(obs_a[:9], obs_e)
+        assert reward_a == reward_e
+        assert done_a == done_e
+        assert worth_a == worth_e
+    if with_indicators:
+        np.testing.assert_array_equal([obs[9] for obs, *_ in actual], df['market_code'].to_numpy()[:len(actual)])
+    else:
+        assert all(obs[9] == -1 for obs, *_ in actual)
+
+def test_observation_buffers_alternate(price_frame):
+    env = EnergyMarketEnv(add_technical_indicators(price_frame))
+    state = env.reset()
+    next_state, *_ = env.step(0)
+    assert state is not next_state
+    # Üçüncü gözlem ilk tamponu yeniden kullanır
+    third, *_ = env.step(0)
+    assert third is state
+
+@pytest.mark.parametrize('initial_balance, max_inventory', [(10000, 10), (5000, 3)])
+def test_vector_env_matches_scalar_env_per_lane(price_frame, initial_balance, max_inventory):
+    df = add_technical_indicators(price_frame)
+    # Farklı başlangıçlı pencereler (ikisi aynı başlangıçta, farklı aksiyonlarla)
+    starts = [0, 0, 37, 250, len(df) - 400]
+    window = 400
+    rng = np.random.default_rng(7)
+    # AL ağırlıklı aksiyonlar: bakiye ve depo limiti yüzünden reddedilen AL'lar da oluşsun
+    actions = rng.choice(3, size=(len(starts), window), p=[0.2, 0.6, 0.2])
+    vector = VectorEnergyMarketEnv(df, n_envs=len(starts), initial_balance=initial_balance,
+                                   max_inventory=max_inventory, window=window, starts=starts)
+    lanes = [EnergyMarketEnv(df.iloc[start:start + window], initial_balance, max_inventory) for start in starts]
+
+    obs = vector.reset().copy()
+    for lane, env in enumerate(lanes):
+        np.testing.assert_array_equal(obs[lane], env.reset())
+    blocked_balance = blocked_inventory = 0
+    for t in range(vector.max_steps):
+        prices = vector._ptf[:, t]
+        blocked_balance += int(np.sum((actions[:, t] == 1) & (vector.balance < prices)))
+        blocked_inventory += int(np.sum((actions[:, t] == 1) & (vector.inventory >= max_inventory)))
+        obs, rewards, dones, _ = vector.step(actions[:, t])
+        for lane, env in enumerate(lanes):
+            lane_obs, reward, done, _ = env.step(int(actions[lane, t]))
+            np.testing.assert_array_equal(obs[lane], lane_obs)
+            assert rewards[lane] == reward
+            assert dones[lane] == done
+            assert vector.balance[lane] == env.balance
+            assert vector.inventory[lane] == env.inventory
+            assert vector.net_worth[lane] == env.net_worth
+    assert dones.all()
+    # Kısıtlı dallar gerçekten denendi
+    assert blocked_inventory > 0
+    if initial_balance == 5000:
+        assert blocked_balance > 0
@@ -0,0 +1,57 @@
+import itertools
+import numpy as np
+import pandas as pd
+import pytest
+
+from market_env import EnergyMarketEnv
+from oracle import solve, replay, HOLD, BUY, SELL
+
+def simulate(prices, actions, initial_balance, max_inventory, strict=False):
+    # EnergyMarketEnv.step kuralları (sadece kasa/envanter); net değer son aksiyon saatinin fiyatıyla.
+    # strict: ortamın yok sayacağı (kısıtı ihlal eden) AL/SAT hata sayılır
+    balance, inventory = initial_balance, 0
+    for price, action in zip(prices, actions):
+        if action == BUY and inventory < max_inventory and balance >= price:
+            balance -= price
+            inventory += 1
+        elif action == SELL and inventory > 0:
+            balance += price
+            inventory -= 1
+        else:
+            assert not strict or action == HOLD, f"Uygulanamayan aksiyon {action}"
+    return balance + inventory * prices[len(actions) - 1]
+
+def brute_force(prices, initial_balance, max_inventory):
+    n_steps = len(prices) - 1
+    return max(simulate(prices, actions, initial_balance, max_inventory)
+               for actions in itertools.product((HOLD, BUY, SELL), repeat=n_steps))
+
+def price_df(prices):
+    tarih = pd.date_range('2024-01-01', periods=len(prices), freq='h')
+    return pd.DataFrame({'tarih': tarih, 'ptf': prices, 'hour': tarih.hour,
+                         'day_of_week': tarih.dayofweek, 'month': tarih.month})
+
+@pytest.mark.parametrize('initial_balance, max_inventory', [
+    (10000, 10), # Kısıt yok
+    (10000, 2),  # Depo limiti bağlayıcı
+    (250, 10),   # Kasa limiti bağlayıcı (en fazla 1-2 birim)
+    (250, 1),
+])
+@pytest.mark.parametrize('seed', range(5))
+def test_solve_matches_brute_force(seed, initial_balance, max_inventory):
+    rng = np.random.default_rng(seed)
+    prices = np.round(rng.uniform(50, 200, size=8), 2)
+    prices[rng.random(8) < 0.15] = 0.0 # Sıfır fiyatlı saatler
+
+    actions, best = solve(prices, initial_balance, max_inventory)
+    assert len(actions) == len(prices) - 1
+    assert best == pytest.approx(brute_force(prices, initial_balance, max_inventory))
+
+    # Geri izlenen aksiyonlar gerçekten bu net değeri üretir (kısıtlar ihlal edilmeden)
+    assert simulate(prices, actions, initial_balance, max_inventory, strict=True) == pytest.approx(best)
+    _, net_worth = replay(price_df(prices), actions, initial_balance, max_inventory)
+    assert net_worth == pytest.approx(best)
+
+def test_solve_rejects_single_price():
+    with pytest.raises(ValueError):
+        solve([100.0])
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+import parallel_train
+from parallel_train import merge_replicas, train_parallel
+
+def test_merge_replicas_averages_over_visiting_replicas():
+    previous = np.full((4, 3), 7.0)
+    q_tables = np.zeros((3, 4, 3))
+    visited = np.zeros((3, 4), dtype=bool)
+    q_tables[0, 0] = [3.0, 6.0, 9.0] # Durum 0: sadece kopya 0
+    visited[0, 0] = True
+    q_tables[0, 1], q_tables[2, 1] = 2.0, 4.0 # Durum 1: kopya 0 ve 2
+    visited[[0, 2], 1] = True
+    q_tables[1, 2] = 5.0 # Durum 2: kopya 1 değer yazmış ama ziyaret dışı sayılmaz
+    q_table, merged_visited = merge_replicas(q_tables, visited, previous)
+
+    np.testing.assert_array_equal(q_table[0], [3.0, 6.0, 9.0])
+    np.testing.assert_array_equal(q_table[1], [3.0, 3.0, 3.0])
+    np.testing.assert_array_equal(q_table[2:], previous[2:])
+    np.testing.assert_array_equal(merged_visited, [True, True, False, False])
+
+def test_shared_mode_error_is_not_hidden_by_cleanup(price_frame, monkeypatch):
+    # İşçi havuzu hata verince ortak bellek kapanışı BufferError ile asıl hatayı örtmemeli
+    class BrokenPool:
+        def __init__(self, *args, **kwargs):
+            raise RuntimeError('havuz açılamadı')
+    monkeypatch.setattr(parallel_train, 'Pool', BrokenPool)
+    with pytest.raises(RuntimeError, match='havuz açılamadı'):
+        train_parallel(price_frame, episodes=2, workers=1, mode='shared')
@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+
+from fatura_hesapla import NeuralPriceEngine, evaluate_profile_matrix, evaluate_profile_stream, is_wide_profile_file
+
+def test_wide_and_long_profiles_give_same_bill(price_frame, tmp_path):
+    engine = NeuralPriceEngine()
+    engine.fit(price_frame.copy())
+    start = price_frame['tarih'].iloc[-1].normalize() + pd.Timedelta(days=1)
+    end = start + pd.Timedelta(days=3)
+
+    # Dönemden biraz taşan saatler (fiyatlanmaz, unpriced_kwh)
+    hours = pd.date_range(start - pd.Timedelta(hours=2), end + pd.Timedelta(hours=2), freq='h', inclusive='left')
+    rng = np.random.default_rng(0)
+    wide = pd.DataFrame({'tarih': hours, 'ev': rng.uniform(0, 2, len(hours)), 'fabrika': rng.uniform(50, 80, len(hours))})
+    wide_path, long_path = tmp_path / 'wide.csv', tmp_path / 'long.csv'
+    wide.to_csv(wide_path, index=False)
+    wide.melt(id_vars='tarih', var_name='customer', value_name='kwh').to_csv(long_path, index=False)
+
+    assert is_wide_profile_file(wide_path)
+    assert not is_wide_profile_file(long_path)
+    matrix = evaluate_profile_matrix(wide_path, engine, start, end, offer_price=3.0)
+    stream = evaluate_profile_stream(long_path, engine, start, end, offer_price=3.0)
+    pd.testing.assert_frame_equal(matrix.sort_values('customer').reset_index(drop=True),
+                                  stream.sort_values('customer').reset_index(drop=True), check_like=True)
+    assert np.allclose(matrix['unpriced_kwh'], wide.iloc[np.r_[0:2, -2:0], 1:].sum().to_numpy())